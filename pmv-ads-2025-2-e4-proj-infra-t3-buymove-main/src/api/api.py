@@ -1,14 +1,14 @@
-import json
 from flask import Flask, jsonify, abort
 
+from json_store import JsonStore
+
 app = Flask(__name__)
 
+# Lido uma vez e indexado por id; relido so quando db.json muda no disco
+carros_store = JsonStore('db.json')
+
 def carregar_carros():
-    try:
-        with open('db.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    return carros_store.all()
 
 @app.route('/api/carros', methods=['GET'])
 def get_carros():
@@ -17,8 +17,7 @@ def get_carros():
 
 @app.route('/api/carros/<int:carro_id>', methods=['GET'])
 def get_carro(carro_id):
-    carros = carregar_carros()
-    carro = next((carro for carro in carros if carro['id'] == carro_id), None)
+    carro = carros_store.get(carro_id)
     if carro is None:
         abort(404, description="Carro não encontrado")
     return jsonify(carro)
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+
+try:  # fcntl so existe em Linux/macOS; no Windows vale apenas a trava entre threads
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Armazenamento em arquivo JSON compartilhado pelos servicos Flask legados (api.py, purchase_intention).
+#
+# - O arquivo base (ex.: db.json) e uma lista de registros com "id"; ele e lido uma vez
+#   para um dicionario id -> registro e relido somente quando o arquivo (ou o log) muda no disco.
+# - Cada escrita vira uma linha no fim de <arquivo>.log em vez de regravar o arquivo inteiro;
+#   a cada COMPACT_EVERY linhas o log e incorporado ao arquivo base (gravado em temporario + rename).
+# - Uma trava (thread + flock, quando disponivel) serializa escritas e compactacoes.
+
+COMPACT_EVERY = 200
+
+
+class JsonStore:
+    def __init__(self, path, key='id', from_snapshot=None, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.log_path = path + '.log'
+        self.key = key
+        # Converte um arquivo base em outro formato (ex.: versao antiga) para a lista de registros
+        self.from_snapshot = from_snapshot
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._records = {}
+        self._stamp = None
+        self._log_lines = 0
+
+    # Leitura
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return list(self._records.values())
+
+    def get(self, record_id):
+        with self._lock:
+            self._refresh()
+            return self._records.get(record_id)
+
+    def __contains__(self, record_id):
+        return self.get(record_id) is not None
+
+    # Escrita
+
+    def put(self, record):
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._append({'op': 'put', 'record': record})
+            self._records[record[self.key]] = record
+            self._maybe_compact()
+        return record
+
+    def delete(self, record_id):
+        with self._lock, self._file_lock():
+            self._refresh()
+            if record_id not in self._records:
+                return False
+            self._append({'op': 'delete', 'id': record_id})
+            del self._records[record_id]
+            self._maybe_compact()
+        return True
+
+    def compact(self):
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._compact()
+
+    # Internos
+
+    def _current_stamp(self):
+        # (mtime, tamanho) do arquivo base e do log: qualquer escrita de outro processo muda um dos dois
+        stamp = []
+        for path in (self.path, self.log_path):
+            try:
+                info = os.stat(path)
+                stamp.append((info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _refresh(self):
+        stamp = self._current_stamp()
+        if stamp == self._stamp:
+            return
+        records = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            snapshot = []
+        if self.from_snapshot is not None:
+            snapshot = self.from_snapshot(snapshot)
+        for record in snapshot:
+            records[record[self.key]] = record
+
+        lines = 0
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Linha incompleta (processo interrompido no meio da escrita): ignorada
+                        continue
+                    lines += 1
+                    if entry['op'] == 'put':
+                        records[entry['record'][self.key]] = entry['record']
+                    else:
+                        records.pop(entry['id'], None)
+        except FileNotFoundError:
+            pass
+
+        self._records = records
+        self._log_lines = lines
+        self._stamp = stamp
+
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_lines += 1
+        self._stamp = self._current_stamp()
+
+    def _maybe_compact(self):
+        if self._log_lines >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self._records.values()), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # O arquivo base ja contem tudo o que estava no log
+        open(self.log_path, 'w').close()
+        self._log_lines = 0
+        self._stamp = self._current_stamp()
+
+    def _file_lock(self):
+        return _FileLock(self.path + '.lock')
+
+
+class _FileLock:
+    # Trava entre processos (ex.: varios workers do gunicorn) durante escrita e compactacao
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from pymongo.errors import ExecutionTimeout
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+from .config import settings
+
+# Controle de admissao, por worker:
+# - rate limit por cliente (IP) e rota com token bucket (RATE_LIMITS) -> 429 + Retry-After
+# - limite de requisicoes em andamento (MAX_IN_FLIGHT_REQUESTS) -> 503 + Retry-After
+# - prazo por rota (QUERY_DEADLINE_MS/QUERY_DEADLINES): cada consulta recebe o tempo que sobra
+#   como maxTimeMS, e o servidor abandona a consulta quando o prazo acaba
+# - GET/HEAD cujo cliente desconectou sao cancelados (nenhuma consulta nova e disparada)
+
+RouteKey = Tuple[str, str]
+
+# Caminhos que nunca sao recusados nem contados (saude, metricas, documentacao, imagens em disco)
+EXEMPT_PREFIXES = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+OVERLOAD_RETRY_AFTER_SECONDS = 1
+
+_deadline: ContextVar[float | None] = ContextVar("query_deadline", default=None)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    capacity: float
+    refill_per_second: float
+
+
+def parse_route_settings(value: str) -> Dict[RouteKey, str]:
+    """``"GET /vehicles=2000, POST /auth/login=10/60"`` -> ``{("GET", "/vehicles"): "2000", ...}``."""
+    parsed: Dict[RouteKey, str] = {}
+    for item in value.split(","):
+        route, _, setting = item.strip().rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        if method and path and setting:
+            parsed[(method.upper(), path.strip())] = setting.strip()
+    return parsed
+
+
+@lru_cache(maxsize=1)
+def rate_limits() -> Dict[RouteKey, RateLimit]:
+    # "10/60": ate 10 requisicoes em rajada, repostas a 10 a cada 60 s
+    limits: Dict[RouteKey, RateLimit] = {}
+    for key, value in parse_route_settings(settings.rate_limits).items():
+        requests, _, period = value.partition("/")
+        limits[key] = RateLimit(float(requests), float(requests) / float(period or 1))
+    return limits
+
+
+@lru_cache(maxsize=1)
+def query_deadlines() -> Dict[RouteKey, int]:
+    return {key: int(value) for key, value in parse_route_settings(settings.query_deadlines).items()}
+
+
+class TokenBuckets:
+    """Token bucket per (client, route), LRU-bounded so unseen clients do not grow memory forever."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        # chave -> (tokens, instante da ultima reposicao)
+        self._buckets: "OrderedDict[Tuple[str, RouteKey], Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str, route: RouteKey, limit: RateLimit) -> float:
+        """Take one token; returns 0 when allowed, otherwise the seconds until the next token."""
+        now = time.monotonic()
+        key = (client, route)
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.refill_per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / limit.refill_per_second
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+buckets = TokenBuckets(settings.rate_limit_max_clients)
+
+
+def client_address(request: Request) -> str:
+    # Atras de proxy, rode o uvicorn com --proxy-headers para request.client ser o IP original
+    return request.client.host if request.client else "unknown"
+
+
+async def apply_route_limits(request: Request) -> None:
+    """App-wide dependency: rate limit and query deadline of the matched route."""
+    route = (request.method, getattr(request.scope.get("route"), "path", request.url.path))
+    limit = rate_limits().get(route)
+    if limit is not None:
+        wait = buckets.acquire(client_address(request), route, limit)
+        if wait > 0:
+            metrics.http_rejected.inc("rate_limited")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas requisicoes, tente novamente em instantes",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+    # Dependencias async rodam na task da requisicao: o prazo vale para o endpoint inteiro
+    budget_ms = query_deadlines().get(route, settings.query_deadline_ms)
+    _deadline.set(time.monotonic() + budget_ms / 1000 if budget_ms > 0 else None)
+
+
+def remaining_ms() -> int | None:
+    """Milliseconds left in the request deadline (None outside requests); 504 once it is over."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    remaining = math.floor((deadline - time.monotonic()) * 1000)
+    if remaining <= 0:
+        raise deadline_exceeded()
+    return remaining
+
+
+def time_limit() -> Dict[str, int]:
+    """``maxTimeMS`` option for commands that take it as a keyword (count_documents, aggregate)."""
+    remaining = remaining_ms()
+    return {} if remaining is None else {"maxTimeMS": remaining}
+
+
+def deadline_exceeded() -> HTTPException:
+    metrics.http_rejected.inc("deadline")
+    return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Tempo limite da consulta excedido")
+
+
+async def execution_timeout_handler(request: Request, exc: ExecutionTimeout) -> JSONResponse:
+    # O servidor interrompeu a consulta no maxTimeMS
+    error = deadline_exceeded()
+    return JSONResponse({"detail": error.detail}, status_code=error.status_code)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware: sheds load above MAX_IN_FLIGHT_REQUESTS and cancels GETs whose client left."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith((*EXEMPT_PREFIXES, settings.media_url_prefix)):
+            await self.app(scope, receive, send)
+            return
+
+        if 0 < settings.max_in_flight_requests <= self.in_flight:
+            metrics.http_rejected.inc("overloaded")
+            response = JSONResponse(
+                {"detail": "Servidor sobrecarregado, tente novamente"},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(OVERLOAD_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            if scope["method"] in ("GET", "HEAD"):
+                await self.run_cancellable(scope, receive, send)
+            else:
+                # Corpos (login, uploads) sao lidos pelo proprio endpoint: sem vigia de desconexao
+                await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def run_cancellable(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Uma task vigia o receive e repassa as mensagens ao app; http.disconnect antes do fim da
+        # resposta cancela o app (consultas seguintes nem saem; a atual para no maxTimeMS)
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        disconnected = False
+        finished = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal finished
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = True
+            await send(message)
+
+        async def watch() -> None:
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not finished:
+                        disconnected = True
+                        handler.cancel()
+                    return
+
+        handler = asyncio.create_task(self.app(scope, messages.get, send_wrapper))
+        watcher = asyncio.create_task(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            scope[metrics.CLIENT_DISCONNECTED] = True
+            metrics.http_disconnects.inc(metrics.route_template(scope))
+        finally:
+            watcher.cancel()
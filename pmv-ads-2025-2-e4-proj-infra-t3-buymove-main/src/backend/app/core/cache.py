@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generic, Set, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    expires_at: float
+    tags: frozenset[Hashable] = field(default_factory=frozenset)
+
+
+class TTLCache(Generic[V]):
+    """
+    Cache em memoria do processo com LRU limitado, TTL por entrada e single-flight.
+
+    - ``max_entries`` limita o numero de entradas (0 desativa o cache)
+    - ``get_or_load`` agrupa misses concorrentes da mesma chave em uma unica carga
+    - entradas podem receber tags para invalidacao precisa (ex.: id do veiculo)
+
+    Cada worker do uvicorn tem a propria instancia, entao o TTL limita por quanto
+    tempo um worker pode servir um dado alterado por outro.
+    """
+
+    def __init__(self, name: str, *, max_entries: int, ttl_seconds: float) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[Hashable, _Entry[V]] = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future[V]] = {}
+        # Incrementado a cada invalidacao: cargas iniciadas antes dela nao sao guardadas
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> V | None:
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _lookup(self, key: Hashable) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(
+        self,
+        key: Hashable,
+        value: V,
+        *,
+        ttl_seconds: float | None = None,
+        tags: Iterable[Hashable] = (),
+    ) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        entry = _Entry(value=value, expires_at=time.monotonic() + ttl, tags=frozenset(tags))
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[V]],
+        *,
+        ttl_seconds: float | None = None,
+        tags: Callable[[V], Iterable[Hashable]] | None = None,
+    ) -> V:
+        if not self.enabled:
+            return await loader()
+
+        cached = self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # A requisicao que carregava foi cancelada (cliente desconectou): esta carrega por conta propria
+                current = asyncio.current_task()
+                if not inflight.cancelled() or (current is not None and current.cancelling()):
+                    raise
+                return await self.get_or_load(key, loader, ttl_seconds=ttl_seconds, tags=tags)
+
+        self.misses += 1
+        generation = self._generation
+        future: asyncio.Future[V] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Evita o aviso de "exception never retrieved" quando ninguem esperava a carga
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            # None nunca e guardado: "nao encontrado" continua indo ao banco
+            if value is not None and generation == self._generation:
+                self.set(key, value, ttl_seconds=ttl_seconds, tags=tags(value) if tags else ())
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, key: Hashable) -> None:
+        self._generation += 1
+        self._inflight.pop(key, None)
+        self._remove(key)
+
+    def invalidate_tags(self, tags: Iterable[Hashable]) -> None:
+        self._generation += 1
+        self._inflight.clear()
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        self._generation += 1
+        self._inflight.clear()
+        for key in [key for key in self._entries if predicate(key)]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._inflight.clear()
+        self._entries.clear()
+        self._tags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Literal
 
 from pydantic import Field
 from pydantic import SecretStr
@@ -33,6 +33,19 @@ class Settings(BaseSettings):
     environment: str = Field(default="development")
     mongodb_uri: str = Field(default="mongodb://localhost:27017", alias="MONGODB_URI")
     mongodb_db: str = Field(default="buymove", alias="MONGODB_DB")
+    # Pool de conexoes por processo (cada worker do uvicorn tem o seu)
+    mongodb_max_pool_size: int = Field(default=100, alias="MONGODB_MAX_POOL_SIZE")
+    mongodb_min_pool_size: int = Field(default=0, alias="MONGODB_MIN_POOL_SIZE")
+    mongodb_max_idle_time_ms: int | None = Field(default=None, alias="MONGODB_MAX_IDLE_TIME_MS")
+    mongodb_wait_queue_timeout_ms: int | None = Field(default=None, alias="MONGODB_WAIT_QUEUE_TIMEOUT_MS")
+    # Ex.: "zstd,snappy,zlib" (zstd e snappy exigem os pacotes zstandard/python-snappy)
+    mongodb_compressors: str = Field(default="", alias="MONGODB_COMPRESSORS")
+    # Leituras anonimas do catalogo (lista, detalhe, lote e recomendacoes); login e escritas ficam no primario
+    catalog_read_preference: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = (
+        Field(default="primary", alias="CATALOG_READ_PREFERENCE")
+    )
+    # Atraso maximo aceito de um secundario, em segundos (minimo 90 pelo driver; -1 desliga o limite)
+    catalog_max_staleness_seconds: int = Field(default=-1, alias="CATALOG_MAX_STALENESS_SECONDS")
     jwt_secret: SecretStr = Field(default=SecretStr("change-me"), alias="JWT_SECRET")
     jwt_algorithm: str = Field(default="HS256", alias="JWT_ALGORITHM")
     access_token_expire_minutes: int = Field(default=60 * 24, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
@@ -45,6 +58,45 @@ class Settings(BaseSettings):
         ],
         alias="CORS_ORIGINS",
     )
+    cache_enabled: bool = Field(default=True, alias="CACHE_ENABLED")
+    cache_max_entries: int = Field(default=2048, alias="CACHE_MAX_ENTRIES")
+    cache_ttl_seconds: float = Field(default=30.0, alias="CACHE_TTL_SECONDS")
+    auth_token_cache_size: int = Field(default=10000, alias="AUTH_TOKEN_CACHE_SIZE")
+    user_cache_ttl_seconds: float = Field(default=15.0, alias="USER_CACHE_TTL_SECONDS")
+    password_hash_executor: Literal["thread", "process", "inline"] = Field(
+        default="thread", alias="PASSWORD_HASH_EXECUTOR"
+    )
+    password_hash_workers: int = Field(default=4, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_pending: int = Field(default=64, alias="PASSWORD_HASH_MAX_PENDING")
+    recommendation_index_enabled: bool = Field(default=True, alias="RECOMMENDATION_INDEX_ENABLED")
+    recommendation_index_refresh_seconds: float = Field(default=300.0, alias="RECOMMENDATION_INDEX_REFRESH_SECONDS")
+    export_batch_size: int = Field(default=1000, alias="EXPORT_BATCH_SIZE")
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+    http_cache_max_age_seconds: int = Field(default=0, alias="HTTP_CACHE_MAX_AGE_SECONDS")
+    compression_enabled: bool = Field(default=True, alias="COMPRESSION_ENABLED")
+    compression_minimum_size: int = Field(default=1024, alias="COMPRESSION_MINIMUM_SIZE")
+    encoded_body_cache_entries: int = Field(default=512, alias="ENCODED_BODY_CACHE_ENTRIES")
+    # verify: so confere os indices ao subir; apply: cria os que faltam (dev); skip: nenhuma consulta extra
+    startup_index_check: Literal["verify", "apply", "skip"] = Field(default="verify", alias="STARTUP_INDEX_CHECK")
+    # Fotos enviadas: originais e variantes WebP em disco local, enderecados pelo sha256 do arquivo
+    media_root: Path = Field(default=BACKEND_DIR / "media", alias="MEDIA_ROOT")
+    media_url_prefix: str = Field(default="/media", alias="MEDIA_URL_PREFIX")
+    media_max_upload_bytes: int = Field(default=10 * 1024 * 1024, alias="MEDIA_MAX_UPLOAD_BYTES")
+    image_workers: int = Field(default=2, alias="IMAGE_WORKERS")
+    image_max_pending: int = Field(default=8, alias="IMAGE_MAX_PENDING")
+    # Controle de admissao (core/admission.py). Rotas no formato "METODO /template=valor", separadas por virgula
+    # RATE_LIMITS: "rajada/periodo em segundos" por cliente (IP); rotas fora da lista nao tem limite.
+    # Vazio por padrao (valores sugeridos no .env.example): clientes atras do mesmo NAT dividem o limite
+    rate_limits: str = Field(default="", alias="RATE_LIMITS")
+    rate_limit_max_clients: int = Field(default=10000, alias="RATE_LIMIT_MAX_CLIENTS")
+    # Requisicoes simultaneas por worker antes de responder 503 (0 desliga)
+    max_in_flight_requests: int = Field(default=256, alias="MAX_IN_FLIGHT_REQUESTS")
+    # Prazo de cada requisicao para as consultas ao Mongo (maxTimeMS), padrao e por rota (0 desliga)
+    query_deadline_ms: int = Field(default=5000, alias="QUERY_DEADLINE_MS")
+    query_deadlines: str = Field(
+        default="GET /vehicles=2000,GET /vehicles/facets=3000,GET /vehicles/{vehicle_id}=1000,GET /favorites=2000",
+        alias="QUERY_DEADLINES",
+    )
 
 
 @lru_cache
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from typing import Any, Dict
 
 from fastapi import FastAPI
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
 
+from ..services import media_service, recommendation_index
+from . import indexes
 from .config import settings
+from .metrics import mongo_listener, pool_listener, pool_max_size
+from .mongo_monitoring import command_counter
+from .security import shutdown_password_executor
 
 # Cliente global reutilizado pela aplicação inteira
 _client: AsyncIOMotorClient | None = None
@@ -22,10 +30,25 @@ def get_client() -> AsyncIOMotorClient:
         _client = AsyncIOMotorClient(
             settings.mongodb_uri,
             uuidRepresentation="standard",
+            event_listeners=[command_counter, mongo_listener, pool_listener],
+            **pool_options(),
         )
+        pool_max_size.set(settings.mongodb_max_pool_size)
     return _client
 
 
+def pool_options() -> Dict[str, Any]:
+    """Pool and wire options from the settings (unset values keep the driver defaults)."""
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "maxIdleTimeMS": settings.mongodb_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongodb_wait_queue_timeout_ms,
+        "compressors": settings.mongodb_compressors or None,
+    }
+    return {name: value for name, value in options.items() if value is not None}
+
+
 def get_database() -> AsyncIOMotorDatabase:
     """
     Retorna a instância do banco configurado em MONGODB_DB.
@@ -51,45 +74,73 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:  # type: ignore[overrid
 
     - Inicializa o client do MongoDB usando MONGODB_URI
     - Faz um ping para testar a conexão
-    - Garante criação dos índices
+    - Confere os índices (STARTUP_INDEX_CHECK=verify, apply ou skip)
     - Fecha o client ao encerrar a aplicação
     """
     client = get_client()
     db = client[settings.mongodb_db]
 
-    # (Opcional mas útil) testar conexão com o banco
-    try:
-        await db.command("ping")
+    # Ping e conferencia dos indices numa unica rodada; criar indices e tarefa do comando de
+    # migracao (scripts.manage migrate-indexes), nao de cada worker que sobe (exceto os unicos)
+    checks = [db.command("ping")]
+    if settings.startup_index_check != "skip":
+        checks.append(indexes.diff(db))
+    ping, *report = await asyncio.gather(*checks, return_exceptions=True)
+    if isinstance(ping, Exception):
+        print("❌ Erro ao conectar ao MongoDB:", repr(ping))
+    else:
         print(f"✅ Conectado ao MongoDB: {settings.mongodb_uri}, db={settings.mongodb_db}")
-    except Exception as exc:  # noqa: BLE001
-        print("❌ Erro ao conectar ao MongoDB:", repr(exc))
-
-    # Garante que os índices necessários existem
-    await ensure_indexes(db)
+        await check_indexes(db, report[0] if report else None)
 
     # Se você quiser usar request.app.state.db em dependências, pode expor aqui:
     app.state.db = db  # opcional, mas conveniente
 
+    # Indice de recomendacoes carrega em segundo plano; ate ficar pronto vale a regra antiga
+    index_task = (
+        asyncio.create_task(recommendation_index.maintain(db)) if settings.recommendation_index_enabled else None
+    )
+
     try:
         yield
     finally:  # pragma: no cover - defensive cleanup
+        if index_task is not None:
+            index_task.cancel()
+        shutdown_password_executor()
+        media_service.shutdown_image_executor()
         await close_client()
 
 
-async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
-    """
-    Cria índices importantes nas coleções usadas pela aplicação.
-    Executa de forma idempotente (criar índice que já existe não quebra).
-    """
-    await db.users.create_index("email", unique=True)
-    await db.users.create_index("document", unique=False, sparse=True)
-
-    await db.vehicles.create_index([("brand", 1)])
-    await db.vehicles.create_index([("model", 1)])
-    await db.vehicles.create_index([("location", 1)])
-    await db.vehicles.create_index([("price", 1)])
-
-    await db.favorites.create_index(
-        [("user_id", 1), ("vehicle_id", 1)],
-        unique=True,
-    )
+async def check_indexes(db: AsyncIOMotorDatabase, report: indexes.IndexDiff | BaseException | None) -> None:
+    if isinstance(report, BaseException):
+        print("⚠️ Nao foi possivel conferir os indices:", repr(report))
+        return
+    if report is None or report.ok:
+        return
+    if settings.startup_index_check == "apply":
+        pending = report.as_dict()
+        await indexes.apply(db)
+        print("✅ Indices criados/atualizados:", ", ".join(pending["missing"] + pending["changed"]))
+        return
+
+    # create_user e add_favorite dependem dos indices unicos (DuplicateKeyError/upsert): os que
+    # faltam sao criados ja (colecao vazia ou pequena num banco novo); os demais ficam com a migracao
+    if report.unique_changed:
+        raise RuntimeError(
+            "Indices unicos diferentes do esperado: "
+            + ", ".join(f"{spec.collection}.{spec.name}" for spec in report.unique_changed)
+            + " - rode python -m scripts.manage migrate-indexes"
+        )
+    try:
+        created = await indexes.ensure_unique(db, report)
+    except PyMongoError as exc:
+        # Ex.: duplicados ja gravados impedem o indice unico; subir assim deixaria gravar mais
+        raise RuntimeError(f"Nao foi possivel criar os indices unicos: {exc!r}") from exc
+    if created:
+        print("✅ Indices unicos criados:", ", ".join(f"{spec.collection}.{spec.name}" for spec in created))
+    remaining = [f"{spec.collection}.{spec.name}" for spec in report.missing + report.changed if spec not in created]
+    if remaining:
+        print(
+            "⚠️ Indices ausentes ou diferentes:",
+            ", ".join(remaining),
+            "- rode python -m scripts.manage migrate-indexes",
+        )
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import gzip
+import zlib
+from contextvars import ContextVar
+from typing import Any, Dict, Literal
+
+import msgpack
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+try:  # brotli e opcional (pip install .[brotli]); sem ele o servidor so oferece gzip
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+# Negociacao de formato e compressao de todas as respostas:
+# - Accept: application/msgpack troca o corpo JSON por MessagePack (mesma estrutura, datas em ISO 8601)
+# - Accept-Encoding: br (se instalado) ou gzip, somente acima de COMPRESSION_MINIMUM_SIZE
+# O formato escolhido fica num ContextVar lido por quem serializa (utils.responses, ETags).
+
+WireFormat = Literal["json", "msgpack"]
+ContentEncoding = Literal["identity", "gzip", "br"]
+
+MEDIA_TYPES: Dict[WireFormat, str] = {"json": "application/json", "msgpack": "application/msgpack"}
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+# Tipos que valem a pena comprimir (imagens e afins ja vem comprimidos)
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/x-ndjson", "text/")
+GZIP_LEVEL = 6
+# Qualidade 4: taxa proxima do gzip 9 com custo de CPU parecido com o gzip 6
+BROTLI_QUALITY = 4
+
+_format: ContextVar[WireFormat] = ContextVar("wire_format", default="json")
+_encoding: ContextVar[ContentEncoding] = ContextVar("content_encoding", default="identity")
+
+
+def current_format() -> WireFormat:
+    return _format.get()
+
+
+def current_encoding() -> ContentEncoding:
+    return _encoding.get()
+
+
+def media_type() -> str:
+    return MEDIA_TYPES[current_format()]
+
+
+def parse_qualities(header: str) -> Dict[str, float]:
+    """``"a/b;q=0.5, c/d"`` -> ``{"a/b": 0.5, "c/d": 1.0}`` (lowercase, parameters other than q dropped)."""
+    qualities: Dict[str, float] = {}
+    for part in header.split(","):
+        name, *params = [piece.strip() for piece in part.split(";")]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = max(qualities.get(name.lower(), 0.0), quality)
+    return qualities
+
+
+def negotiate_format(accept: str | None) -> WireFormat:
+    # MessagePack so quando pedido explicitamente e com peso >= ao do JSON (*/* continua JSON)
+    if not accept:
+        return "json"
+    qualities = parse_qualities(accept)
+    msgpack_q = max(qualities.get(name, 0.0) for name in MSGPACK_TYPES)
+    json_q = qualities.get("application/json", 0.0)
+    return "msgpack" if msgpack_q > 0 and msgpack_q >= json_q else "json"
+
+
+def negotiate_encoding(accept_encoding: str | None) -> ContentEncoding:
+    if not accept_encoding or not settings.compression_enabled:
+        return "identity"
+    qualities = parse_qualities(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    candidates = [("br", qualities.get("br", wildcard))] if brotli is not None else []
+    candidates.append(("gzip", qualities.get("gzip", wildcard)))
+    name, quality = max(candidates, key=lambda item: item[1])
+    return name if quality > 0 else "identity"  # type: ignore[return-value]
+
+
+def pack(content: Any) -> bytes:
+    """MessagePack of JSON-compatible data (``dump_python(mode="json")``/``jsonable_encoder`` output)."""
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def compress(body: bytes, encoding: ContentEncoding) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def should_compress(headers: Headers, size: int | None) -> bool:
+    """Whether a response with ``headers`` (and known body ``size``) is worth compressing."""
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    if not content_type.startswith(COMPRESSIBLE_TYPES):
+        return False
+    return size is None or size >= settings.compression_minimum_size
+
+
+class _StreamCompressor:
+    """Incremental compressor for streamed bodies (e.g. GET /vehicles/export), flushed per chunk."""
+
+    def __init__(self, encoding: ContentEncoding) -> None:
+        self._brotli = brotli.Compressor(quality=BROTLI_QUALITY) if encoding == "br" else None
+        self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if encoding == "gzip" else None
+
+    def chunk(self, data: bytes, *, last: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if last else self._brotli.flush())
+        assert self._zlib is not None
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def add_vary(headers: MutableHeaders, *names: str) -> None:
+    current = [value.strip() for value in headers.get("vary", "").split(",") if value.strip()]
+    for name in names:
+        if name.lower() not in {value.lower() for value in current}:
+            current.append(name)
+    headers["Vary"] = ", ".join(current)
+
+
+class ContentNegotiationMiddleware:
+    """ASGI middleware: picks format/encoding per request and compresses bodies not encoded upstream."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding"))
+        tokens = (
+            _format.set(negotiate_format(request_headers.get("accept"))),
+            _encoding.set(encoding),
+        )
+        start: Message | None = None
+        compressor: _StreamCompressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            if passthrough or compressor is not None:
+                await send_body(message)
+                return
+
+            headers = MutableHeaders(scope=start)
+            add_vary(headers, "Accept", "Accept-Encoding")
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoding == "identity" or not should_compress(headers, None if more else len(body)):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            if more:
+                del headers["Content-Length"]
+                compressor = _StreamCompressor(encoding)
+                await send(start)
+                await send_body(message)
+                return
+            compressed = compress(body, encoding)
+            headers["Content-Length"] = str(len(compressed))
+            passthrough = True
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        async def send_body(message: Message) -> None:
+            if compressor is None:
+                await send(message)
+                return
+            more = message.get("more_body", False)
+            data = compressor.chunk(message.get("body", b""), last=not more)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _encoding.reset(tokens[1])
+            _format.reset(tokens[0])
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+
+# Definicao unica dos indices da aplicacao. Quem cria/remove e o comando de migracao
+# (python -m scripts.manage migrate-indexes); o lifespan dos workers so confere, exceto os
+# unicos que faltarem (ensure_unique): sem eles o banco aceita e-mails e favoritos duplicados.
+
+IndexKeys = Tuple[Tuple[str, int], ...]
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: IndexKeys
+    unique: bool = False
+    sparse: bool = False
+
+    @property
+    def name(self) -> str:
+        # Mesmo nome gerado pelo driver ("updated_at_-1__id_-1"), para casar com indices ja existentes
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    @property
+    def options(self) -> Dict[str, bool]:
+        return {"unique": self.unique, "sparse": self.sparse}
+
+    def model(self) -> IndexModel:
+        # background e ignorado a partir do MongoDB 4.2 (builds ja nao bloqueiam a colecao inteira)
+        return IndexModel(list(self.keys), name=self.name, background=True, **self.options)
+
+
+INDEXES: Tuple[IndexSpec, ...] = (
+    IndexSpec("users", (("email", 1),), unique=True),
+    IndexSpec("users", (("document", 1),), sparse=True),
+    IndexSpec("vehicles", (("model", 1),)),
+    IndexSpec("vehicles", (("price", 1),)),
+    # Ordenacao do catalogo e paginacao por cursor (keyset) em (updated_at, _id); location_norm e price
+    # no fim do indice deixam o prefixo de localizacao e a faixa de preco serem filtrados sem ler documentos
+    IndexSpec("vehicles", (("updated_at", -1), ("_id", -1), ("location_norm", 1), ("price", 1))),
+    # sort=popular (contador mantido por favorite_service)
+    IndexSpec("vehicles", (("favorite_count", -1), ("_id", -1), ("location_norm", 1), ("price", 1))),
+    # Igualdade -> ordenacao -> faixa (ESR): marca e cor ja chegam ordenadas para as duas ordenacoes
+    IndexSpec("vehicles", (("brand_norm", 1), ("updated_at", -1), ("_id", -1), ("price", 1))),
+    IndexSpec("vehicles", (("brand_norm", 1), ("favorite_count", -1), ("_id", -1), ("price", 1))),
+    IndexSpec("vehicles", (("color_norm", 1), ("updated_at", -1), ("_id", -1))),
+    # Indice invertido da busca textual (search_service)
+    IndexSpec("search_postings", (("term", 1), ("impact", -1))),
+    # Remocao por veiculo e busca restrita aos veiculos filtrados (vehicle_id $in + term $in)
+    IndexSpec("search_postings", (("vehicle_id", 1), ("term", 1))),
+    # Contadores de faceta consultados por escopo (GET /vehicles/facets)
+    IndexSpec("vehicle_facets", (("scope", 1),)),
+    IndexSpec("favorites", (("user_id", 1), ("vehicle_id", 1)), unique=True),
+    # Listagem paginada dos favoritos do usuario (mais recentes primeiro)
+    IndexSpec("favorites", (("user_id", 1), ("created_at", -1), ("_id", -1))),
+    # Job de co-favoritos: janela incremental, remocoes pendentes e matriz de pares
+    IndexSpec("favorites", (("created_at", 1),)),
+    IndexSpec("favorite_removals", (("removed_at", 1),)),
+    IndexSpec("favorite_removals", (("user_id", 1), ("removed_at", 1))),
+    IndexSpec("favorite_pairs", (("a", 1), ("b", 1)), unique=True),
+    IndexSpec("favorite_pairs", (("a", 1), ("count", -1), ("b", 1))),
+)
+
+
+@dataclass
+class IndexDiff:
+    missing: List[IndexSpec] = field(default_factory=list)
+    # Mesmo nome, opcoes diferentes (ex.: unique): precisa ser recriado
+    changed: List[IndexSpec] = field(default_factory=list)
+    # Indices que existem no banco mas nao estao em INDEXES (ex.: brand_1 e location_1 antigos)
+    extra: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.changed
+
+    @property
+    def unique_missing(self) -> List[IndexSpec]:
+        return [spec for spec in self.missing if spec.unique]
+
+    @property
+    def unique_changed(self) -> List[IndexSpec]:
+        return [spec for spec in self.changed if spec.unique]
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {
+            "missing": [f"{spec.collection}.{spec.name}" for spec in self.missing],
+            "changed": [f"{spec.collection}.{spec.name}" for spec in self.changed],
+            "extra": [f"{collection}.{name}" for collection, name in self.extra],
+        }
+
+
+def by_collection(specs: Tuple[IndexSpec, ...] | List[IndexSpec] = INDEXES) -> Dict[str, List[IndexSpec]]:
+    grouped: Dict[str, List[IndexSpec]] = defaultdict(list)
+    for spec in specs:
+        grouped[spec.collection].append(spec)
+    return dict(grouped)
+
+
+async def existing_indexes(db: AsyncIOMotorDatabase, collection: str) -> Dict[str, Dict[str, Any]]:
+    return {index["name"]: index async for index in db[collection].list_indexes()}
+
+
+async def diff(db: AsyncIOMotorDatabase) -> IndexDiff:
+    """Compare ``INDEXES`` with ``list_indexes`` of every managed collection (one concurrent pass)."""
+    grouped = by_collection()
+    collections = list(grouped)
+    current = await asyncio.gather(*(existing_indexes(db, name) for name in collections))
+
+    result = IndexDiff()
+    for collection, existing in zip(collections, current):
+        declared = {spec.name: spec for spec in grouped[collection]}
+        for name, spec in declared.items():
+            index = existing.get(name)
+            if index is None:
+                result.missing.append(spec)
+            elif tuple(index["key"].items()) != spec.keys or any(
+                bool(index.get(option, False)) != value for option, value in spec.options.items()
+            ):
+                result.changed.append(spec)
+        result.extra.extend((collection, name) for name in existing if name != "_id_" and name not in declared)
+    return result
+
+
+async def apply(db: AsyncIOMotorDatabase, *, drop_extra: bool = False, dry_run: bool = False) -> IndexDiff:
+    """Create missing indexes, rebuild changed ones and optionally drop undeclared ones."""
+    result = await diff(db)
+    if dry_run:
+        return result
+
+    async def migrate(collection: str, specs: List[IndexSpec]) -> None:
+        target = db[collection]
+        drops = [spec.name for spec in specs if spec in result.changed]
+        if drop_extra:
+            drops.extend(name for extra_collection, name in result.extra if extra_collection == collection)
+        for name in drops:
+            await target.drop_index(name)
+        pending = [spec.model() for spec in specs if spec in result.missing or spec in result.changed]
+        if pending:
+            # Um createIndexes por colecao; o servidor constroi os indices do lote numa unica varredura
+            await target.create_indexes(pending)
+
+    touched = by_collection([*result.missing, *result.changed])
+    if drop_extra:
+        for collection, _ in result.extra:
+            touched.setdefault(collection, [])
+    await asyncio.gather(*(migrate(collection, specs) for collection, specs in touched.items()))
+    return result
+
+
+async def ensure_unique(db: AsyncIOMotorDatabase, result: IndexDiff) -> List[IndexSpec]:
+    """Create the missing unique indexes of ``result`` (only those); returns the created specs."""
+    specs = result.unique_missing
+    await asyncio.gather(
+        *(
+            db[collection].create_indexes([spec.model() for spec in grouped])
+            for collection, grouped in by_collection(specs).items()
+        )
+    )
+    return specs
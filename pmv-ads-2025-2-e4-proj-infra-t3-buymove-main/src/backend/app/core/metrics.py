@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Metricas no formato texto do Prometheus, sem dependencias externas.
+# Cada worker do uvicorn exporta os proprios numeros (o Prometheus agrega por instancia).
+#
+# - MetricsMiddleware: latencia por rota, requisicoes em andamento e contagem por status
+# - MongoMetricsListener: cada comando do Mongo e atribuido a requisicao em curso
+#   (o Motor executa o driver copiando o contexto da task, entao o ContextVar chega ao listener)
+# - MongoPoolListener: conexoes abertas/em uso por servidor e espera para obter uma conexao do pool
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# Comandos fora de uma requisicao (lifespan, jobs em segundo plano)
+BACKGROUND_ROUTE = "background"
+# Requisicoes que nao casaram com nenhuma rota: um rotulo so, para nao explodir a cardinalidade
+UNMATCHED_ROUTE = "unmatched"
+# Marcado no escopo quando o cliente desconectou antes da resposta (status 499, como no nginx)
+CLIENT_DISCONNECTED = "client_disconnected"
+CLIENT_CLOSED_STATUS = 499
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def _format(self, values: LabelValues, extra: Dict[str, str] | None = None) -> str:
+        pairs = [*zip(self.labels, values), *(extra or {}).items()]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._format(labels)} {format_value(value)}" for labels, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), *, buckets: Iterable[float]) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por rotulo: contagem por bucket (nao acumulada; o ultimo e o +Inf), soma e total
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format(labels, {'le': format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format(labels)} {format_value(total[0])}")
+            lines.append(f"{self.name}_count{self._format(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: List[_Metric] = []
+        # Funcoes chamadas a cada coleta para exportar estado de outros modulos (caches, indices)
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric: Any) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter("http_requests_total", "Requisicoes HTTP respondidas.", ("method", "route", "status"))
+)
+http_latency = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Latencia das requisicoes HTTP ate o fim da resposta.",
+        ("method", "route"),
+        buckets=LATENCY_BUCKETS,
+    )
+)
+http_in_flight = registry.register(Gauge("http_requests_in_flight", "Requisicoes HTTP em andamento."))
+http_rejected = registry.register(
+    Counter(
+        "http_requests_rejected_total",
+        "Requisicoes recusadas pelo controle de admissao (rate_limited, overloaded, deadline).",
+        ("reason",),
+    )
+)
+http_disconnects = registry.register(
+    Counter("http_client_disconnects_total", "Requisicoes canceladas porque o cliente desconectou.", ("route",))
+)
+request_commands = registry.register(
+    Histogram(
+        "http_request_mongo_commands",
+        "Comandos enviados ao MongoDB por requisicao.",
+        ("method", "route"),
+        buckets=COMMAND_BUCKETS,
+    )
+)
+request_mongo_time = registry.register(
+    Histogram(
+        "http_request_mongo_seconds",
+        "Tempo gasto em comandos do MongoDB por requisicao.",
+        ("method", "route"),
+        buckets=LATENCY_BUCKETS,
+    )
+)
+mongo_commands = registry.register(
+    Counter("mongo_commands_total", "Comandos do MongoDB por rota de origem.", ("route", "command", "outcome"))
+)
+mongo_time = registry.register(
+    Counter("mongo_command_seconds_total", "Tempo acumulado dos comandos do MongoDB.", ("route", "command"))
+)
+recommendation_index_failures = registry.register(
+    Counter("recommendation_index_rebuild_failures_total", "Montagens do indice de recomendacoes que falharam.")
+)
+
+
+@dataclass
+class RequestStats:
+    scope: Scope
+    commands: int = 0
+    mongo_seconds: float = 0.0
+    # Consultas disparadas com asyncio.gather terminam em threads diferentes do executor
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def route(self) -> str:
+        return route_template(self.scope)
+
+
+_request: ContextVar[RequestStats | None] = ContextVar("request_metrics", default=None)
+
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """Counts and times every command, attributing it to the request being served."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, "failure")
+
+    def _record(self, event: Any, outcome: str) -> None:
+        seconds = event.duration_micros / 1_000_000
+        stats = _request.get()
+        route = stats.route if stats is not None else BACKGROUND_ROUTE
+        if stats is not None:
+            with stats.lock:
+                stats.commands += 1
+                stats.mongo_seconds += seconds
+        mongo_commands.inc(route, event.command_name, outcome)
+        mongo_time.inc(route, event.command_name, amount=seconds)
+
+
+mongo_listener = MongoMetricsListener()
+
+pool_connections = registry.register(
+    Gauge("mongo_pool_connections", "Conexoes abertas no pool, por servidor.", ("address",))
+)
+pool_checked_out = registry.register(
+    Gauge("mongo_pool_checked_out", "Conexoes do pool em uso, por servidor.", ("address",))
+)
+pool_max_size = registry.register(Gauge("mongo_pool_max_size", "Limite de conexoes por servidor (maxPoolSize)."))
+pool_checkout_wait = registry.register(
+    Histogram(
+        "mongo_pool_checkout_seconds",
+        "Espera para obter uma conexao do pool.",
+        ("address",),
+        buckets=CHECKOUT_BUCKETS,
+    )
+)
+pool_checkout_failures = registry.register(
+    Counter(
+        "mongo_pool_checkout_failures_total",
+        "Falhas ao obter conexao (ex.: timeout da fila).",
+        ("address", "reason"),
+    )
+)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Pool occupancy and checkout wait per server; utilisation is checked_out / max_size."""
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pool_connections.set(0, address(event.address))
+        pool_checked_out.set(0, address(event.address))
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        pool_connections.inc(address(event.address))
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        pool_connections.dec(address(event.address))
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        pool_checkout_failures.inc(address(event.address), str(event.reason))
+        pool_checkout_wait.observe(event.duration or 0.0, address(event.address))
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        pool_checked_out.inc(address(event.address))
+        pool_checkout_wait.observe(event.duration or 0.0, address(event.address))
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        pool_checked_out.dec(address(event.address))
+
+
+pool_listener = MongoPoolListener()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and Mongo usage per route template."""
+
+    def __init__(self, app: ASGIApp, *, exclude: Iterable[str] = ("/metrics",)) -> None:
+        self.app = app
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            _request.reset(token)
+            if scope.get(CLIENT_DISCONNECTED):
+                status_code = CLIENT_CLOSED_STATUS
+            route = route_template(scope)
+            method = scope["method"]
+            http_requests.inc(method, route, str(status_code))
+            http_latency.observe(elapsed, method, route)
+            request_commands.observe(stats.commands, method, route)
+            request_mongo_time.observe(stats.mongo_seconds, method, route)
+
+
+def route_template(scope: Scope) -> str:
+    # O FastAPI grava a rota encontrada no escopo ("/vehicles/{vehicle_id}" em vez do caminho real)
+    # antes de rodar dependencias e endpoint, entao os comandos do Mongo ja saem com o rotulo certo
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def cache_collector(stats: Callable[[], Iterable[Dict[str, Any]]]) -> Callable[[], List[str]]:
+    """Export ``TTLCache.stats()``-shaped dicts as gauges labelled by cache name."""
+
+    fields = {
+        "entries": ("cache_entries", "gauge", "Entradas em cache."),
+        "hits": ("cache_hits_total", "counter", "Leituras atendidas pelo cache."),
+        "misses": ("cache_misses_total", "counter", "Leituras que foram ao banco."),
+        "evictions": ("cache_evictions_total", "counter", "Entradas descartadas pelo limite de tamanho."),
+        "coalesced": ("cache_coalesced_total", "counter", "Cargas concorrentes agrupadas (single-flight)."),
+    }
+
+    def collect() -> List[str]:
+        snapshot = list(stats())
+        lines: List[str] = []
+        for field, (name, kind, help_text) in fields.items():
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+            lines.extend(
+                f'{name}{{cache="{escape(str(cache["name"]))}"}} {format_value(cache[field])}'
+                for cache in snapshot
+                if field in cache
+            )
+        return lines
+
+    return collect
+
+
+def address(value: Tuple[str, int | None]) -> str:
+    host, port = value
+    return f"{host}:{port}" if port is not None else host
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
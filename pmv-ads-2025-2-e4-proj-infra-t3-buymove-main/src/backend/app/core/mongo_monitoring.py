@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List
+
+from pymongo import monitoring
+
+# Contagem dos comandos enviados ao Mongo dentro de um trecho de codigo.
+# O Motor executa o driver em threads copiando o contexto da task, entao o
+# ContextVar acompanha a requisicao ate os eventos do CommandListener.
+#
+# Uso em testes (o app deve rodar na mesma task, ex.: httpx.ASGITransport):
+#
+#     with assert_max_commands(2):
+#         await client.post("/favorites", json={...})
+
+IGNORED_COMMANDS = frozenset({"endSessions"})
+
+
+@dataclass
+class CommandLog:
+    commands: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+
+_current: ContextVar[CommandLog | None] = ContextVar("mongo_command_log", default=None)
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Appends every started command to the active CommandLog, if any."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        log = _current.get()
+        if log is not None and event.command_name not in IGNORED_COMMANDS:
+            log.commands.append(event.command_name)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+command_counter = CommandCounter()
+
+
+@contextmanager
+def count_commands() -> Iterator[CommandLog]:
+    log = CommandLog()
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_commands(limit: int) -> Iterator[CommandLog]:
+    """Fail when the block sends more than ``limit`` commands to MongoDB."""
+    with count_commands() as log:
+        yield log
+    if len(log) > limit:
+        raise AssertionError(f"Esperado no maximo {limit} comandos no Mongo, enviados {len(log)}: {log.commands}")
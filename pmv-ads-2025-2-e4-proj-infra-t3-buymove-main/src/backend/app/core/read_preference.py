@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    _ServerMode,
+)
+
+from .config import settings
+
+# Roteamento de leitura por operacao: o cliente continua no primario (padrao do driver) e so as
+# leituras do catalogo usam esta preferencia, via collection.with_options(read_preference=...)
+
+_READ_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+@lru_cache
+def catalog_read_preference() -> _ServerMode:
+    """Read preference of anonymous catalog reads (CATALOG_READ_PREFERENCE / CATALOG_MAX_STALENESS_SECONDS)."""
+    mode = _READ_MODES.get(settings.catalog_read_preference)
+    if mode is None:
+        return Primary()
+    return mode(max_staleness=settings.catalog_max_staleness_seconds)
@@ -1,16 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Callable, TypeVar
 
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from .cache import TTLCache
 from .config import settings
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Tokens ja verificados (chave = sha256 do token), validos ate o exp do proprio token
+verified_tokens: TTLCache[str] = TTLCache(
+    "verified_tokens",
+    max_entries=settings.auth_token_cache_size,
+    ttl_seconds=settings.access_token_expire_minutes * 60,
+)
+
+T = TypeVar("T")
+
+# bcrypt leva dezenas de ms por chamada: roda fora do event loop, em um pool com fila limitada
+_password_executor: Executor | None = None
+_password_pending = 0
+
 
 def create_access_token(subject: str, expires_minutes: int | None = None) -> str:
     expire_delta = timedelta(minutes=expires_minutes or settings.access_token_expire_minutes)
@@ -21,14 +41,23 @@ def create_access_token(subject: str, expires_minutes: int | None = None) -> str
 
 
 def decode_token(token: str) -> str:
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = verified_tokens.get(digest)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, settings.jwt_secret.get_secret_value(), algorithms=[settings.jwt_algorithm])
-        subject: str | None = payload.get("sub")
-        if subject is None:
-            raise credentials_exception()
-        return subject
     except JWTError as exc:  # pragma: no cover - defensive
         raise credentials_exception() from exc
+    subject: str | None = payload.get("sub")
+    if subject is None:
+        raise credentials_exception()
+
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        verified_tokens.set(digest, subject, ttl_seconds=expires_at - time.time())
+    return subject
 
 
 def credentials_exception() -> HTTPException:
@@ -45,3 +74,53 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
+
+
+def get_password_executor() -> Executor | None:
+    global _password_executor
+    if settings.password_hash_executor == "inline":
+        return None
+    if _password_executor is None:
+        if settings.password_hash_executor == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+        else:
+            _password_executor = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                thread_name_prefix="password-hash",
+            )
+    return _password_executor
+
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+
+async def run_password_task(func: Callable[..., T], *args: str) -> T:
+    """Run a bcrypt call in the password pool, failing fast with 503 when the queue is full."""
+    global _password_pending
+    executor = get_password_executor()
+    if executor is None:
+        return func(*args)
+
+    if _password_pending >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servico de autenticacao sobrecarregado, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args))
+    finally:
+        _password_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_task(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_task(hash_password, password)
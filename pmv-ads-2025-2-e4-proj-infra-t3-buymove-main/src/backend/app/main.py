@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from pymongo.errors import ExecutionTimeout
 
+from .core import admission, encoding, metrics
 from .core.config import settings
 from .core.database import lifespan
-from .routers import auth, favorites, users, vehicles
+from .core.security import verified_tokens
+from .routers import auth, favorites, media, users, vehicles
+from .services import recommendation_index, user_service, vehicle_cache
+from .utils.responses import NegotiatedResponse, encoded_bodies
 
 app = FastAPI(
     title=settings.app_name,
@@ -13,7 +18,15 @@ app = FastAPI(
     lifespan=lifespan,
     docs_url="/docs",
     redoc_url="/redoc",
+    # JSON ou MessagePack conforme o Accept (rotas que devolvem modelos; json_response negocia sozinho)
+    default_response_class=NegotiatedResponse,
+    # Rate limit e prazo das consultas de cada rota
+    dependencies=[Depends(admission.apply_route_limits)],
 )
+app.add_exception_handler(ExecutionTimeout, admission.execution_timeout_handler)
+
+# Por dentro do CORS: os 503 de sobrecarga tambem levam os cabecalhos de CORS
+app.add_middleware(admission.AdmissionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,10 +36,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Formato (Accept) e compressao (Accept-Encoding) de todas as respostas
+app.add_middleware(encoding.ContentNegotiationMiddleware)
+
+if settings.metrics_enabled:
+    # Por fora do CORS: a latencia medida inclui todo o processamento da requisicao
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.registry.collectors.append(metrics.cache_collector(lambda: all_cache_stats()))
+    metrics.registry.collectors.append(
+        lambda: [
+            "# HELP recommendation_index_vehicles Veiculos no indice de recomendacoes em memoria.",
+            "# TYPE recommendation_index_vehicles gauge",
+            f"recommendation_index_vehicles {recommendation_index.stats()['vehicles']}",
+            "# HELP recommendation_index_ready 1 quando o indice de recomendacoes esta montado e em uso.",
+            "# TYPE recommendation_index_ready gauge",
+            f"recommendation_index_ready {int(recommendation_index.ready())}",
+        ]
+    )
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(vehicles.router)
 app.include_router(favorites.router)
+app.include_router(media.router)
 
 
 @app.get("/health", tags=["health"])
@@ -34,6 +66,25 @@ async def healthcheck() -> dict[str, str]:
     return {"status": "ok", "environment": settings.environment}
 
 
+@app.get("/health/cache", tags=["health"])
+async def cache_stats() -> dict[str, list[dict[str, object]]]:
+    return {
+        "caches": all_cache_stats(),
+        "indexes": [recommendation_index.stats()],
+    }
+
+
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def all_cache_stats() -> list[dict[str, object]]:
+    return [*vehicle_cache.stats(), verified_tokens.stats(), user_service.user_cache.stats(), encoded_bodies.stats()]
+
+
 @app.get("/", tags=["health"])
 async def root() -> dict[str, str]:
     return {"message": "buyMove API ready"}
@@ -2,16 +2,26 @@ from __future__ import annotations
 
 from datetime import datetime
 
+from typing import List
+
 from pydantic import Field
 
 from ..utils.object_id import MongoBaseModel, PyObjectId
-from .vehicle import VehiclePublic
+from .vehicle import VehicleView
 
 
 class FavoriteCreate(MongoBaseModel):
     vehicle_id: str
 
 
+class FavoriteStatusRequest(MongoBaseModel):
+    vehicle_ids: List[str] = Field(max_length=200)
+
+
+class FavoriteStatusResponse(MongoBaseModel):
+    favorited: List[str]
+
+
 class FavoriteInDB(MongoBaseModel):
     id: PyObjectId | None = Field(default=None, alias="_id")
     user_id: PyObjectId
@@ -23,4 +33,10 @@ class FavoritePublic(MongoBaseModel):
     id: str
     vehicle_id: str
     created_at: datetime
-    vehicle: VehiclePublic | None = None
+    vehicle: VehicleView | None = None
+
+
+class FavoriteListResponse(MongoBaseModel):
+    items: List[FavoritePublic]
+    next_cursor: str | None = None
+    has_more: bool = False
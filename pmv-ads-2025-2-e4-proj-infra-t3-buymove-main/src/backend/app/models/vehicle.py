@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import Any, List, Tuple, Union
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr, SerializeAsAny
 
 from ..utils.object_id import MongoBaseModel, PyObjectId
 
@@ -48,9 +48,22 @@ class VehicleUpdate(MongoBaseModel):
     features: List[str] | None = None
 
 
+class VehicleMedia(MongoBaseModel):
+    """Uploaded photo: content hash, original size and the URLs of its WebP variants."""
+
+    hash: str
+    width: int
+    height: int
+    card: str
+    gallery: str
+    full: str
+
+
 class VehicleInDB(VehicleBase):
     id: PyObjectId | None = Field(default=None, alias="_id")
     seller_id: PyObjectId | None = None
+    favorite_count: int = 0
+    media: List[VehicleMedia] = Field(default_factory=list)
     created_at: datetime
     updated_at: datetime
 
@@ -58,10 +71,74 @@ class VehicleInDB(VehicleBase):
 class VehiclePublic(VehicleBase):
     id: str
     seller_id: str | None = None
+    favorite_count: int = 0
+    media: List[VehicleMedia] = Field(default_factory=list)
     created_at: datetime
     updated_at: datetime
 
 
+class ProjectedVehicle(MongoBaseModel):
+    """Base of the partial representations; carries the item version outside the serialized fields."""
+
+    # (updated_at, favorite_count) lidos junto com qualquer projecao: versao do item para o ETag
+    _version: Tuple[Any, int] = PrivateAttr(default=(None, 0))
+
+
+class VehicleSummary(ProjectedVehicle):
+    """Lean representation used by catalog cards (view=summary)."""
+
+    id: str
+    title: str
+    brand: str
+    model: str
+    year: int
+    price: float
+    mileage: int
+    location: str | None = None
+    fuel_type: str | None = None
+    transmission: str | None = None
+    favorite_count: int = 0
+    thumbnail: str | None = None
+
+
+class VehicleFieldset(ProjectedVehicle):
+    """Base of the models generated for ``?fields=``; only ``id`` is always present."""
+
+    id: str
+
+
+# Itens de listas podem vir em qualquer uma das representacoes; SerializeAsAny
+# serializa cada item pelo seu tipo real (ex.: modelos gerados para ?fields=).
+VehicleView = SerializeAsAny[Union[VehiclePublic, VehicleSummary, VehicleFieldset]]
+
+
 class VehicleListResponse(MongoBaseModel):
-    items: List[VehiclePublic]
+    items: List[VehicleView]
+    total: int | None = None
+    next_cursor: str | None = None
+    has_more: bool = False
+
+
+class VehicleBatchResponse(MongoBaseModel):
+    items: List[VehicleView]
+    missing: List[str] = Field(default_factory=list)
+
+
+class FacetCount(MongoBaseModel):
+    value: str | int
+    count: int
+
+
+class PriceRangeCount(MongoBaseModel):
+    min: float
+    max: float | None = None
+    count: int
+
+
+class VehicleFacets(MongoBaseModel):
     total: int
+    brands: List[FacetCount] = Field(default_factory=list)
+    colors: List[FacetCount] = Field(default_factory=list)
+    doors: List[FacetCount] = Field(default_factory=list)
+    locations: List[FacetCount] = Field(default_factory=list)
+    price_ranges: List[PriceRangeCount] = Field(default_factory=list)
@@ -1,4 +1,4 @@
-from . import auth, favorites, users, vehicles
+from . import auth, favorites, media, users, vehicles
 
-__all__ = ["auth", "favorites", "users", "vehicles"]
+__all__ = ["auth", "favorites", "media", "users", "vehicles"]
 
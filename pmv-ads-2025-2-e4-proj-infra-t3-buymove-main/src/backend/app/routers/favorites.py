@@ -1,23 +1,45 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Response, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from ..dependencies.auth import get_current_active_user
 from ..dependencies.database import get_db
-from ..models.favorite import FavoriteCreate, FavoritePublic
+from ..models.favorite import (
+    FavoriteCreate,
+    FavoriteListResponse,
+    FavoritePublic,
+    FavoriteStatusRequest,
+    FavoriteStatusResponse,
+)
 from ..models.user import UserInDB
 from ..services import favorite_service
+from ..services.vehicle_views import ViewName
+from ..utils.responses import json_response
 
 router = APIRouter(prefix="/favorites", tags=["favorites"])
 
 
-@router.get("", response_model=list[FavoritePublic])
+@router.get("", response_model=FavoriteListResponse)
 async def list_favorites(
+    page_size: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Cursor opaco retornado em next_cursor"),
+    view: ViewName = Query(default="summary", description="summary (campos do card) ou full"),
+    fields: Optional[str] = Query(default=None, description="Campos separados por virgula; substitui view"),
     current_user: UserInDB = Depends(get_current_active_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
-) -> list[FavoritePublic]:
-    return await favorite_service.list_favorites(db, str(current_user.id))
+) -> Response:
+    favorites = await favorite_service.list_favorites(
+        db,
+        str(current_user.id),
+        page_size=page_size,
+        cursor=cursor,
+        view=view,
+        fields=fields,
+    )
+    return json_response(favorites, FavoriteListResponse)
 
 
 @router.post("", response_model=FavoritePublic, status_code=status.HTTP_201_CREATED)
@@ -25,8 +47,18 @@ async def add_favorite(
     payload: FavoriteCreate,
     current_user: UserInDB = Depends(get_current_active_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
-) -> FavoritePublic:
-    return await favorite_service.add_favorite(db, str(current_user.id), payload)
+) -> Response:
+    favorite = await favorite_service.add_favorite(db, str(current_user.id), payload)
+    return json_response(favorite, FavoritePublic, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/status", response_model=FavoriteStatusResponse)
+async def favorite_status(
+    payload: FavoriteStatusRequest,
+    current_user: UserInDB = Depends(get_current_active_user),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+) -> FavoriteStatusResponse:
+    return await favorite_service.favorite_status(db, str(current_user.id), payload.vehicle_ids)
 
 
 @router.delete("/{vehicle_id}", status_code=status.HTTP_204_NO_CONTENT, response_class=Response, response_model=None)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse
+
+from ..core.config import settings
+from ..services import media_service
+
+router = APIRouter(prefix=settings.media_url_prefix, tags=["media"])
+
+
+@router.get("/{digest}/{variant}.webp", response_class=FileResponse)
+async def get_media_variant(digest: str, variant: str) -> FileResponse:
+    path = media_service.variant_file(digest, variant)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Imagem nao encontrada")
+    # A URL carrega o hash do original: o arquivo nunca muda, o cliente pode guardar para sempre
+    return FileResponse(
+        path,
+        media_type="image/webp",
+        headers={"Cache-Control": media_service.IMMUTABLE_CACHE_CONTROL},
+    )
@@ -1,22 +1,36 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional
 
-from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from ..dependencies.auth import get_current_active_user
 from ..dependencies.database import get_db
 from ..models.user import UserInDB
-from ..models.vehicle import VehicleCreate, VehicleListResponse, VehiclePublic, VehicleUpdate
-from ..services import vehicle_service
+from ..models.vehicle import (
+    VehicleBatchResponse,
+    VehicleCreate,
+    VehicleFacets,
+    VehicleListResponse,
+    VehiclePublic,
+    VehicleUpdate,
+    VehicleView,
+)
+from ..services import co_favorite_service, export_service, vehicle_service
+from ..services.export_service import ExportFormat
+from ..services.vehicle_service import ListSort
+from ..services.vehicle_views import ViewName
+from ..utils import http_cache
+from ..utils.responses import json_response
 
 router = APIRouter(prefix="/vehicles", tags=["vehicles"])
 
 
 @router.get("", response_model=VehicleListResponse)
 async def list_vehicles(
+    request: Request,
     q: Optional[str] = Query(default=None, description="Busca por texto"),
     brand: Optional[str] = Query(default=None),
     color: Optional[str] = Query(default=None),
@@ -26,9 +40,60 @@ async def list_vehicles(
     max_price: Optional[float] = Query(default=None, ge=0),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=12, ge=1, le=60),
+    cursor: Optional[str] = Query(default=None, description="Cursor opaco retornado em next_cursor"),
+    include_total: Optional[bool] = Query(default=None, description="Calcula o total (padrao: somente sem cursor)"),
+    sort: ListSort = Query(default="recent", description="recent (atualizados primeiro) ou popular (mais favoritados)"),
+    view: ViewName = Query(default="summary", description="summary (campos do card) ou full"),
+    fields: Optional[str] = Query(default=None, description="Campos separados por virgula; substitui view"),
     db: AsyncIOMotorDatabase = Depends(get_db),
-) -> VehicleListResponse:
-    items, total = await vehicle_service.list_vehicles(
+) -> Response:
+    params = {
+        "q": q,
+        "brand": brand,
+        "color": color,
+        "doors": doors,
+        "location": location,
+        "min_price": min_price,
+        "max_price": max_price,
+        "page": page,
+        "page_size": page_size,
+        "cursor": cursor,
+        "include_total": include_total,
+        "sort": sort,
+    }
+    response = await vehicle_service.list_vehicles(db, **params, view=view, fields=fields)
+    # O ETag sai das proprias linhas do corpo (toda projecao le updated_at/favorite_count): a pagina
+    # cacheada decide o 304 e nenhuma consulta extra e feita por resposta
+    validators = vehicle_service.list_validators(response)
+    if http_cache.is_not_modified(request, validators):
+        return http_cache.not_modified(validators)
+    return json_response(response, VehicleListResponse, headers=http_cache.cache_headers(validators))
+
+
+@router.get(":batch", response_model=VehicleBatchResponse)
+async def get_vehicles_batch(
+    ids: List[str] = Query(description="Ids separados por virgula ou repetidos (ids=a&ids=b), ate 100"),
+    view: ViewName = Query(default="summary", description="summary (campos do card) ou full"),
+    fields: Optional[str] = Query(default=None, description="Campos separados por virgula; substitui view"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+) -> Response:
+    vehicle_ids = [part.strip() for value in ids for part in value.split(",") if part.strip()]
+    response = await vehicle_service.get_vehicles(db, vehicle_ids, view=view, fields=fields)
+    return json_response(response, VehicleBatchResponse)
+
+
+@router.get("/facets", response_model=VehicleFacets)
+async def get_facets(
+    q: Optional[str] = Query(default=None, description="Busca por texto"),
+    brand: Optional[str] = Query(default=None),
+    color: Optional[str] = Query(default=None),
+    doors: Optional[int] = Query(default=None, ge=2, le=6),
+    location: Optional[str] = Query(default=None),
+    min_price: Optional[float] = Query(default=None, ge=0),
+    max_price: Optional[float] = Query(default=None, ge=0),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+) -> VehicleFacets:
+    return await vehicle_service.get_facets(
         db,
         q=q,
         brand=brand,
@@ -37,15 +102,47 @@ async def list_vehicles(
         location=location,
         min_price=min_price,
         max_price=max_price,
-        page=page,
-        page_size=page_size,
     )
-    return VehicleListResponse(items=items, total=total)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_vehicles(
+    format: ExportFormat = Query(default="ndjson", description="ndjson ou csv"),
+    after: Optional[str] = Query(default=None, description="Retoma a exportacao apos este id"),
+    brand: Optional[str] = Query(default=None),
+    color: Optional[str] = Query(default=None),
+    doors: Optional[int] = Query(default=None, ge=2, le=6),
+    location: Optional[str] = Query(default=None),
+    min_price: Optional[float] = Query(default=None, ge=0),
+    max_price: Optional[float] = Query(default=None, ge=0),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+) -> StreamingResponse:
+    query = export_service.export_query(
+        after=after,
+        brand=brand,
+        color=color,
+        doors=doors,
+        location=location,
+        min_price=min_price,
+        max_price=max_price,
+    )
+    return StreamingResponse(
+        export_service.stream_export(db, query, format),
+        media_type=export_service.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="vehicles.{format}"'},
+    )
 
 
 @router.get("/{vehicle_id}", response_model=VehiclePublic)
-async def get_vehicle(vehicle_id: str, db: AsyncIOMotorDatabase = Depends(get_db)) -> VehiclePublic:
-    return await vehicle_service.get_vehicle(db, vehicle_id)
+async def get_vehicle(request: Request, vehicle_id: str, db: AsyncIOMotorDatabase = Depends(get_db)) -> Response:
+    if http_cache.is_conditional(request):
+        current = await vehicle_service.current_vehicle_validators(db, vehicle_id)
+        if current is not None and http_cache.is_not_modified(request, current):
+            return http_cache.not_modified(current)
+
+    vehicle = await vehicle_service.get_vehicle(db, vehicle_id)
+    validators = vehicle_service.vehicle_validators(vehicle)
+    return json_response(vehicle, VehiclePublic, headers=http_cache.cache_headers(validators))
 
 
 @router.post("", response_model=VehiclePublic, status_code=status.HTTP_201_CREATED)
@@ -53,9 +150,10 @@ async def create_vehicle(
     payload: VehicleCreate,
     current_user: UserInDB = Depends(get_current_active_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
-) -> VehiclePublic:
+) -> Response:
     owner_id = str(current_user.id) if current_user.id else None
-    return await vehicle_service.create_vehicle(db, payload, owner_id=owner_id)
+    vehicle = await vehicle_service.create_vehicle(db, payload, owner_id=owner_id)
+    return json_response(vehicle, VehiclePublic, status_code=status.HTTP_201_CREATED)
 
 
 @router.patch("/{vehicle_id}", response_model=VehiclePublic)
@@ -64,9 +162,9 @@ async def update_vehicle(
     payload: VehicleUpdate,
     current_user: UserInDB = Depends(get_current_active_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
-) -> VehiclePublic:
-    await ensure_vehicle_permission(db, vehicle_id, current_user)
-    return await vehicle_service.update_vehicle(db, vehicle_id, payload)
+) -> Response:
+    vehicle = await vehicle_service.update_vehicle(db, vehicle_id, payload, actor=current_user)
+    return json_response(vehicle, VehiclePublic)
 
 
 @router.delete("/{vehicle_id}", status_code=status.HTTP_204_NO_CONTENT, response_class=Response, response_model=None)
@@ -75,29 +173,44 @@ async def delete_vehicle(
     current_user: UserInDB = Depends(get_current_active_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
 ) -> Response:
-    await ensure_vehicle_permission(db, vehicle_id, current_user)
-    await vehicle_service.delete_vehicle(db, vehicle_id)
+    await vehicle_service.delete_vehicle(db, vehicle_id, actor=current_user)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@router.get("/{vehicle_id}/recommendations", response_model=list[VehiclePublic])
-async def fetch_recommendations(vehicle_id: str, db: AsyncIOMotorDatabase = Depends(get_db)) -> list[VehiclePublic]:
-    return await vehicle_service.get_recommendations(db, vehicle_id)
+@router.post("/{vehicle_id}/images", response_model=VehiclePublic, status_code=status.HTTP_201_CREATED)
+async def upload_vehicle_image(
+    vehicle_id: str,
+    file: UploadFile = File(description="Foto JPEG, PNG ou WebP"),
+    current_user: UserInDB = Depends(get_current_active_user),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+) -> Response:
+    vehicle = await vehicle_service.add_vehicle_image(db, vehicle_id, file, actor=current_user)
+    return json_response(vehicle, VehiclePublic, status_code=status.HTTP_201_CREATED)
 
 
-async def ensure_vehicle_permission(db: AsyncIOMotorDatabase, vehicle_id: str, user: UserInDB) -> None:
-    """Validate that the user can mutate the vehicle."""
-    if not ObjectId.is_valid(vehicle_id):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador invalido")
+@router.get("/{vehicle_id}/recommendations", response_model=list[VehicleView])
+async def fetch_recommendations(
+    request: Request,
+    vehicle_id: str,
+    view: ViewName = Query(default="summary", description="summary (campos do card) ou full"),
+    fields: Optional[str] = Query(default=None, description="Campos separados por virgula; substitui view"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+) -> Response:
+    items = await vehicle_service.get_recommendations(db, vehicle_id, view=view, fields=fields)
+    validators = vehicle_service.recommendation_validators(items)
+    if http_cache.is_not_modified(request, validators):
+        return http_cache.not_modified(validators)
+    return json_response(items, list[VehicleView], headers=http_cache.cache_headers(validators))
 
-    vehicle = await db.vehicles.find_one({"_id": ObjectId(vehicle_id)})
-    if not vehicle:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Veiculo nao encontrado")
 
-    seller_id = vehicle.get("seller_id")
-    is_admin = "admin" in user.roles
-    if seller_id is None or is_admin:
-        return
+@router.get("/{vehicle_id}/also-favorited", response_model=list[VehicleView])
+async def fetch_also_favorited(
+    vehicle_id: str,
+    limit: int = Query(default=6, ge=1, le=20),
+    view: ViewName = Query(default="summary", description="summary (campos do card) ou full"),
+    fields: Optional[str] = Query(default=None, description="Campos separados por virgula; substitui view"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+) -> Response:
+    items = await co_favorite_service.also_favorited(db, vehicle_id, limit=limit, view=view, fields=fields)
+    return json_response(items, list[VehicleView])
 
-    if not user.id or str(seller_id) != str(user.id):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Sem permissao")
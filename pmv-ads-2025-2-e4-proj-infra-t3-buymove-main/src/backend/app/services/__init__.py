@@ -1,4 +1,20 @@
-from . import favorite_service, user_service, vehicle_service
+from . import (
+    co_favorite_service,
+    export_service,
+    facet_service,
+    favorite_service,
+    search_service,
+    user_service,
+    vehicle_service,
+)
 
-__all__ = ["favorite_service", "user_service", "vehicle_service"]
+__all__ = [
+    "co_favorite_service",
+    "export_service",
+    "facet_service",
+    "favorite_service",
+    "search_service",
+    "user_service",
+    "vehicle_service",
+]
 
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne, UpdateOne
+
+from ..utils.object_id import MongoBaseModel
+from . import vehicle_views
+from .vehicle_service import serialize_item
+from .vehicle_views import ViewName
+
+# "Quem favoritou este tambem favoritou": job em lote que mantem a matriz esparsa
+# de co-ocorrencia item x item em favorite_pairs ({a, b, count}, nas duas direcoes)
+# e guarda os TOP_NEIGHBOURS vizinhos de cada veiculo em vehicle_co_favorites.
+#
+# Cada execucao leva as contagens do estado dos favoritos no watermark anterior
+# para o estado em "cutoff": so os usuarios com favoritos criados ou removidos
+# nesse intervalo sao relidos. As remocoes ficam em favorite_removals ate o job
+# processa-las, assim o estado de qualquer instante pode ser reconstruido.
+
+JOB_ID = "co_favorites"
+TOP_NEIGHBOURS = 20
+# Favoritos mais novos que isso ficam para a proxima execucao (escritas ainda em voo)
+SETTLE_SECONDS = 5.0
+# Pares acumulados em memoria antes de gravar um lote no banco
+PAIR_BUFFER = 2_000_000
+# So os favoritos mais recentes de cada usuario formam pares: limita o custo de contas com
+# milhares de favoritos (ate ~2 * N * alterados pares por usuario) e o peso delas na matriz
+MAX_PAIRED_FAVORITES = 500
+WRITE_BATCH = 1000
+NEIGHBOUR_BATCH = 100
+
+Snapshot = Set[ObjectId]
+
+
+class PairAccumulator:
+    """Buffers signed co-occurrence pairs as packed ``a << 32 | b`` int64 keys."""
+
+    def __init__(self) -> None:
+        self.codes: Dict[ObjectId, int] = {}
+        self.ids: List[ObjectId] = []
+        self.size = 0
+        self._keys: List[np.ndarray] = []
+        self._signs: List[np.ndarray] = []
+
+    def add_user(self, before: Snapshot, after: Snapshot) -> None:
+        """Record the pair delta of one user going from ``before`` to ``after``."""
+        added = after - before
+        if added:
+            self._emit(after, added, 1)
+        dropped = before - after
+        if dropped:
+            self._emit(before, dropped, -1)
+
+    def _emit(self, items: Snapshot, changed: Snapshot, sign: int) -> None:
+        # Todos os pares ordenados (x, y) de items com x != y e x ou y entre os alterados:
+        # (alterado, qualquer) + (nao alterado, alterado), sem montar a matriz items x items
+        count = len(items)
+        if count < 2:
+            return
+        codes = np.fromiter((self._code(item) for item in items), dtype=np.int64, count=count)
+        flags = np.fromiter((item in changed for item in items), dtype=bool, count=count)
+        touched, others = codes[flags], codes[~flags]
+        left, right = np.repeat(touched, count), np.tile(codes, touched.size)
+        keep = left != right
+        keys = np.concatenate(
+            (
+                (left[keep] << 32) | right[keep],
+                (np.repeat(others, touched.size) << 32) | np.tile(touched, others.size),
+            )
+        )
+        self._keys.append(keys)
+        self._signs.append(np.full(keys.size, sign, dtype=np.int64))
+        self.size += keys.size
+
+    def drain(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Net delta per pair accumulated so far (zeros dropped); empties the buffer."""
+        if not self._keys:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        keys, inverse = np.unique(np.concatenate(self._keys), return_inverse=True)
+        deltas = np.bincount(inverse, weights=np.concatenate(self._signs)).astype(np.int64)
+        self._keys, self._signs, self.size = [], [], 0
+        nonzero = deltas != 0
+        return keys[nonzero], deltas[nonzero]
+
+    def _code(self, vehicle_id: ObjectId) -> int:
+        code = self.codes.get(vehicle_id)
+        if code is None:
+            code = self.codes[vehicle_id] = len(self.ids)
+            self.ids.append(vehicle_id)
+        return code
+
+
+async def refresh(db: AsyncIOMotorDatabase, *, full: bool = False, batch_size: int = 1000) -> Dict[str, int]:
+    """Bring the co-favorite counts up to date; ``full`` recomputes from scratch."""
+    state = await db.batch_jobs.find_one({"_id": JOB_ID})
+    watermark = None if full or not state else _utc(state.get("watermark"))
+    cutoff = _utc(datetime.now(timezone.utc) - timedelta(seconds=SETTLE_SECONDS))
+    if watermark is None:
+        await asyncio.gather(db.favorite_pairs.delete_many({}), db.vehicle_co_favorites.delete_many({}))
+
+    accumulator = PairAccumulator()
+    touched: Set[ObjectId] = set()
+    users = 0
+    async for favorites, removals in changed_users(db, watermark, cutoff, batch_size=batch_size):
+        accumulator.add_user(snapshot(favorites, removals, watermark), snapshot(favorites, removals, cutoff))
+        users += 1
+        if accumulator.size >= PAIR_BUFFER:
+            touched |= await write_pairs(db, accumulator)
+    touched |= await write_pairs(db, accumulator)
+    await store_neighbours(db, touched)
+
+    await db.batch_jobs.update_one(
+        {"_id": JOB_ID},
+        {"$set": {"watermark": cutoff, "finished_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    # Estados futuros so precisam das remocoes posteriores ao novo watermark
+    await db.favorite_removals.delete_many({"removed_at": {"$lte": cutoff}})
+    return {"users": users, "vehicles": len(touched)}
+
+
+async def changed_users(
+    db: AsyncIOMotorDatabase,
+    watermark: datetime | None,
+    cutoff: datetime,
+    *,
+    batch_size: int,
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Yield ``(favorites, removals)`` of every user whose favorites changed after ``watermark``."""
+    favorite_projection = {"_id": 0, "user_id": 1, "vehicle_id": 1, "created_at": 1}
+    removal_projection = {"_id": 0, "user_id": 1, "vehicle_id": 1, "created_at": 1, "removed_at": 1}
+    removed_after = watermark or cutoff
+
+    if watermark is None:
+        # Carga completa: percorre os favoritos em ordem de usuario pelo indice (user_id, vehicle_id)
+        removals = await db.favorite_removals.find({"removed_at": {"$gt": cutoff}}, removal_projection).to_list(
+            length=None
+        )
+        by_user = group_by_user(removals)
+        current: ObjectId | None = None
+        favorites: List[Dict[str, Any]] = []
+        cursor = db.favorites.find({"created_at": {"$lte": cutoff}}, favorite_projection).sort([("user_id", 1)])
+        async for favorite in cursor.batch_size(batch_size):
+            if favorite["user_id"] != current:
+                if favorites:
+                    yield favorites, by_user.pop(current, [])
+                current, favorites = favorite["user_id"], []
+            favorites.append(favorite)
+        if favorites:
+            yield favorites, by_user.pop(current, [])
+        for user_removals in by_user.values():
+            yield [], user_removals
+        return
+
+    added, removed = await asyncio.gather(
+        db.favorites.distinct("user_id", {"created_at": {"$gt": watermark, "$lte": cutoff}}),
+        db.favorite_removals.distinct("user_id", {"removed_at": {"$gt": removed_after}}),
+    )
+    users = sorted({*added, *removed})
+    for start in range(0, len(users), batch_size):
+        chunk = users[start : start + batch_size]
+        favorites, removals = await asyncio.gather(
+            db.favorites.find({"user_id": {"$in": chunk}, "created_at": {"$lte": cutoff}}, favorite_projection).to_list(
+                length=None
+            ),
+            db.favorite_removals.find(
+                {"user_id": {"$in": chunk}, "removed_at": {"$gt": removed_after}},
+                removal_projection,
+            ).to_list(length=None),
+        )
+        favorites_by_user, removals_by_user = group_by_user(favorites), group_by_user(removals)
+        for user_id in chunk:
+            yield favorites_by_user.get(user_id, []), removals_by_user.get(user_id, [])
+
+
+def group_by_user(documents: List[Dict[str, Any]]) -> Dict[ObjectId, List[Dict[str, Any]]]:
+    grouped: Dict[ObjectId, List[Dict[str, Any]]] = {}
+    for document in documents:
+        grouped.setdefault(document["user_id"], []).append(document)
+    return grouped
+
+
+def snapshot(favorites: List[Dict[str, Any]], removals: List[Dict[str, Any]], moment: datetime | None) -> Snapshot:
+    """Up to MAX_PAIRED_FAVORITES most recent vehicles the user had favorited at ``moment`` (None = before any run)."""
+    if moment is None:
+        return set()
+    # vehicle_id -> created_at; o corte depende so do estado no instante, entao as diferencas
+    # entre execucoes continuam somando exatamente as contagens do estado atual
+    active = {doc["vehicle_id"]: _utc(doc["created_at"]) for doc in favorites if _utc(doc["created_at"]) <= moment}
+    for doc in removals:
+        if _utc(doc["created_at"]) <= moment < _utc(doc["removed_at"]):
+            active.setdefault(doc["vehicle_id"], _utc(doc["created_at"]))
+    if len(active) <= MAX_PAIRED_FAVORITES:
+        return set(active)
+    recent = sorted(active.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    return {vehicle_id for vehicle_id, _ in recent[:MAX_PAIRED_FAVORITES]}
+
+
+async def write_pairs(db: AsyncIOMotorDatabase, accumulator: PairAccumulator) -> Set[ObjectId]:
+    keys, deltas = accumulator.drain()
+    if not keys.size:
+        return set()
+    ids = accumulator.ids
+    left, right = (keys >> 32).tolist(), (keys & 0xFFFFFFFF).tolist()
+    operations = [
+        UpdateOne({"a": ids[a], "b": ids[b]}, {"$inc": {"count": delta}}, upsert=True)
+        for a, b, delta in zip(left, right, deltas.tolist())
+    ]
+    for start in range(0, len(operations), WRITE_BATCH):
+        await db.favorite_pairs.bulk_write(operations[start : start + WRITE_BATCH], ordered=False)
+    return {ids[a] for a in set(left)}
+
+
+async def store_neighbours(db: AsyncIOMotorDatabase, vehicles: Set[ObjectId]) -> None:
+    """Rewrite the top-N list of each vehicle whose pair counts changed."""
+    pending = sorted(vehicles)
+    now = datetime.now(timezone.utc)
+    for start in range(0, len(pending), NEIGHBOUR_BATCH):
+        chunk = pending[start : start + NEIGHBOUR_BATCH]
+        await db.favorite_pairs.delete_many({"a": {"$in": chunk}, "count": {"$lte": 0}})
+        tops = await asyncio.gather(
+            *(
+                db.favorite_pairs.find({"a": vehicle_id}, {"_id": 0, "b": 1, "count": 1})
+                .sort([("count", -1), ("b", 1)])
+                .limit(TOP_NEIGHBOURS)
+                .to_list(length=TOP_NEIGHBOURS)
+                for vehicle_id in chunk
+            )
+        )
+        replaced = [
+            ReplaceOne(
+                {"_id": vehicle_id},
+                {
+                    "neighbours": [{"vehicle_id": pair["b"], "count": pair["count"]} for pair in top],
+                    "updated_at": now,
+                },
+                upsert=True,
+            )
+            for vehicle_id, top in zip(chunk, tops)
+            if top
+        ]
+        if replaced:
+            await db.vehicle_co_favorites.bulk_write(replaced, ordered=False)
+        emptied = [vehicle_id for vehicle_id, top in zip(chunk, tops) if not top]
+        if emptied:
+            await db.vehicle_co_favorites.delete_many({"_id": {"$in": emptied}})
+
+
+async def also_favorited(
+    db: AsyncIOMotorDatabase,
+    vehicle_id: str,
+    *,
+    limit: int = 6,
+    view: ViewName = "full",
+    fields: str | None = None,
+) -> List[MongoBaseModel]:
+    """Vehicles most often favorited together with ``vehicle_id`` (one aggregation)."""
+    if not ObjectId.is_valid(vehicle_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador invalido")
+    projection = vehicle_views.resolve_view(view, fields)
+
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": {"_id": ObjectId(vehicle_id)}},
+        {"$unwind": "$neighbours"},
+        # $lookup sem pipeline (qualquer versao do MongoDB); a projecao da view vem depois do $limit
+        {
+            "$lookup": {
+                "from": "vehicles",
+                "localField": "neighbours.vehicle_id",
+                "foreignField": "_id",
+                "as": "vehicle",
+            }
+        },
+        # Veiculos removidos depois do job somem aqui, por isso o limite vem depois do $unwind
+        {"$unwind": "$vehicle"},
+        {"$limit": limit},
+        {"$replaceRoot": {"newRoot": "$vehicle"}},
+    ]
+    if projection.projection:
+        pipeline.append(projection.project_stage())
+
+    cursor = db.vehicle_co_favorites.aggregate(pipeline)
+    documents = await cursor.to_list(length=limit)
+    return [serialize_item(document, projection) for document in documents]
+
+
+def _utc(value: datetime | None) -> datetime | None:
+    # O Mongo devolve datas "naive" em UTC; as comparacoes do job usam esse formato
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
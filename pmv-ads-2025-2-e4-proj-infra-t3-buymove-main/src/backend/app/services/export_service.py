@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List, Literal
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from ..core.config import settings
+from ..models.vehicle import VehicleBase, VehiclePublic
+from .vehicle_service import build_filters, merge_filters, serialize_vehicle
+
+# Exportacao do catalogo inteiro em uma unica passada pelo indice de _id.
+# Cada lote do cursor vira um pedaco da resposta: a memoria fica constante
+# e quem cair no meio retoma com after=<ultimo id recebido>.
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# Colunas novas entram sempre no fim: planilhas e importadores leem o CSV por posicao
+CSV_COLUMNS: List[str] = [
+    "id",
+    *VehicleBase.model_fields,
+    "seller_id",
+    "created_at",
+    "updated_at",
+    "favorite_count",
+    "media",  # URLs da variante card de cada foto enviada
+]
+LIST_SEPARATOR = "|"
+MEDIA_TYPES: Dict[str, str] = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def export_query(
+    *,
+    after: str | None = None,
+    brand: str | None = None,
+    color: str | None = None,
+    doors: int | None = None,
+    location: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+) -> Dict[str, Any]:
+    query = build_filters(
+        brand=brand,
+        color=color,
+        doors=doors,
+        location=location,
+        min_price=min_price,
+        max_price=max_price,
+    )
+    if after is not None:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador invalido")
+        query = merge_filters(query, {"_id": {"$gt": ObjectId(after)}})
+    return query
+
+
+async def stream_export(
+    db: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    export_format: ExportFormat,
+    *,
+    batch_size: int | None = None,
+) -> AsyncIterator[bytes]:
+    """Yield the matching vehicles in ``_id`` order, one chunk per cursor batch."""
+    batch_size = batch_size or settings.export_batch_size
+    encode = encode_ndjson if export_format == "ndjson" else encode_csv
+    if export_format == "csv":
+        yield encode_csv_rows([CSV_COLUMNS])
+
+    cursor = db.vehicles.find(query).sort([("_id", 1)]).batch_size(batch_size)
+    batch: List[VehiclePublic] = []
+    try:
+        async for document in cursor:
+            batch.append(serialize_vehicle(document))
+            if len(batch) >= batch_size:
+                yield encode(batch)
+                batch = []
+        if batch:
+            yield encode(batch)
+    finally:
+        # Cliente desconectado no meio: libera o cursor no servidor
+        await cursor.close()
+
+
+def encode_ndjson(vehicles: List[VehiclePublic]) -> bytes:
+    return b"".join(vehicle.model_dump_json(by_alias=True).encode() + b"\n" for vehicle in vehicles)
+
+
+def encode_csv(vehicles: List[VehiclePublic]) -> bytes:
+    rows = []
+    for vehicle in vehicles:
+        data = vehicle.model_dump(mode="json", by_alias=True)
+        data["media"] = [media["card"] for media in data["media"]]
+        rows.append([csv_value(data.get(column)) for column in CSV_COLUMNS])
+    return encode_csv_rows(rows)
+
+
+def encode_csv_rows(rows: List[List[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(str(item) for item in value)
+    return value
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from ..core import admission
+from ..models.vehicle import FacetCount, PriceRangeCount, VehicleFacets
+from ..utils.text import fold_text
+
+# Contadores de facetas mantidos incrementalmente pelas escritas em vehicle_service.
+# Cada documento de vehicle_facets conta quantos veiculos tem um valor de faceta
+# dentro de um "escopo": o catalogo inteiro ("") ou um unico filtro ("brand=toyota").
+
+FACET_FIELDS: Tuple[str, ...] = ("brand", "color", "doors", "location")
+PRICE_EDGES: Tuple[float, ...] = (0, 30000, 50000, 80000, 120000, 200000, 500000)
+TOTAL_FACET = "total"
+PRICE_FACET = "price"
+
+CounterKey = Tuple[str, str, str]
+
+
+def facet_key(value: Any) -> str:
+    if isinstance(value, bool) or value is None:
+        return ""
+    if isinstance(value, (int, float)):
+        return str(int(value))
+    return fold_text(str(value))
+
+
+def price_bucket(price: Any) -> int | None:
+    if not isinstance(price, (int, float)) or price < 0:
+        return None
+    return bisect_right(PRICE_EDGES, price) - 1
+
+
+def scope_for(field: str | None = None, value: Any = None) -> str:
+    return f"{field}={facet_key(value)}" if field else ""
+
+
+def facet_values(document: Dict[str, Any]) -> Dict[str, Tuple[str, Any]]:
+    """Facet key and display label of each facet field present in ``document``."""
+    values: Dict[str, Tuple[str, Any]] = {}
+    for field in FACET_FIELDS:
+        value = document.get(field)
+        key = facet_key(value)
+        if key:
+            values[field] = (key, value)
+    bucket = price_bucket(document.get("price"))
+    if bucket is not None:
+        values[PRICE_FACET] = (str(bucket), bucket)
+    return values
+
+
+def counter_entries(document: Dict[str, Any] | None) -> Dict[CounterKey, Any]:
+    if not document:
+        return {}
+    values = facet_values(document)
+    scopes = [""] + [f"{field}={key}" for field, (key, _) in values.items() if field in FACET_FIELDS]
+
+    entries: Dict[CounterKey, Any] = {}
+    for scope in scopes:
+        entries[(scope, TOTAL_FACET, "")] = None
+        for field, (key, label) in values.items():
+            entries[(scope, field, key)] = label
+    return entries
+
+
+async def update_counters(
+    db: AsyncIOMotorDatabase,
+    before: Dict[str, Any] | None,
+    after: Dict[str, Any] | None,
+) -> None:
+    """Apply the counter delta of a vehicle going from ``before`` to ``after`` (None = absent)."""
+    removed = counter_entries(before)
+    added = counter_entries(after)
+
+    deltas: Counter[CounterKey] = Counter()
+    for key in removed:
+        deltas[key] -= 1
+    for key in added:
+        deltas[key] += 1
+
+    operations = [
+        UpdateOne(
+            {"_id": "|".join(key)},
+            {
+                "$inc": {"count": delta},
+                "$setOnInsert": {"scope": key[0], "facet": key[1], "key": key[2], "label": added.get(key)},
+            },
+            upsert=True,
+        )
+        for key, delta in deltas.items()
+        if delta
+    ]
+    if operations:
+        await db.vehicle_facets.bulk_write(operations, ordered=False)
+
+
+async def counter_facets(db: AsyncIOMotorDatabase, scope: str) -> VehicleFacets:
+    documents = await db.vehicle_facets.find({"scope": scope, "count": {"$gt": 0}}).to_list(length=None)
+    counts: Dict[str, List[Tuple[Any, int]]] = {}
+    total = 0
+    for doc in documents:
+        if doc["facet"] == TOTAL_FACET:
+            total = doc["count"]
+        else:
+            counts.setdefault(doc["facet"], []).append((doc.get("label"), doc["count"]))
+    return build_facets(total, counts)
+
+
+async def aggregate_facets(db: AsyncIOMotorDatabase, query: Dict[str, Any]) -> VehicleFacets:
+    """Compute every facet of ``query`` with a single ``$facet`` aggregation."""
+    facets: Dict[str, List[Dict[str, Any]]] = {
+        field: [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}] for field in FACET_FIELDS
+    }
+    facets[PRICE_FACET] = [
+        {"$match": {"price": {"$gte": 0}}},
+        {
+            "$bucket": {
+                "groupBy": "$price",
+                "boundaries": [*PRICE_EDGES, float("inf")],
+                "output": {"count": {"$sum": 1}},
+            }
+        },
+    ]
+    facets[TOTAL_FACET] = [{"$count": "count"}]
+
+    pipeline: List[Dict[str, Any]] = [{"$match": query}] if query else []
+    pipeline.append({"$facet": facets})
+    result = (await db.vehicles.aggregate(pipeline, **admission.time_limit()).to_list(length=1))[0]
+
+    counts: Dict[str, List[Tuple[Any, int]]] = {}
+    for field in FACET_FIELDS:
+        merged: Dict[str, Tuple[Any, int]] = {}
+        for row in result[field]:
+            key = facet_key(row["_id"])
+            if not key:
+                continue
+            label, count = merged.get(key, (row["_id"], 0))
+            merged[key] = (label, count + row["count"])
+        counts[field] = list(merged.values())
+    counts[PRICE_FACET] = [(PRICE_EDGES.index(row["_id"]), row["count"]) for row in result[PRICE_FACET]]
+    total = result[TOTAL_FACET][0]["count"] if result[TOTAL_FACET] else 0
+    return build_facets(total, counts)
+
+
+def build_facets(total: int, counts: Dict[str, List[Tuple[Any, int]]]) -> VehicleFacets:
+    def ranked(field: str) -> List[FacetCount]:
+        values = sorted(counts.get(field, []), key=lambda item: (-item[1], str(item[0])))
+        return [FacetCount(value=label, count=count) for label, count in values]
+
+    price_ranges = [
+        PriceRangeCount(
+            min=PRICE_EDGES[bucket],
+            max=PRICE_EDGES[bucket + 1] if bucket + 1 < len(PRICE_EDGES) else None,
+            count=count,
+        )
+        for bucket, count in sorted(counts.get(PRICE_FACET, []))
+    ]
+    return VehicleFacets(
+        total=total,
+        brands=ranked("brand"),
+        colors=ranked("color"),
+        doors=ranked("doors"),
+        locations=ranked("location"),
+        price_ranges=price_ranges,
+    )
+
+
+async def rebuild_counters(db: AsyncIOMotorDatabase, *, batch_size: int = 1000) -> int:
+    """Recompute every counter from the vehicles collection."""
+    projection = {field: 1 for field in (*FACET_FIELDS, "price")}
+    counts: Counter[CounterKey] = Counter()
+    labels: Dict[CounterKey, Any] = {}
+    vehicles = 0
+    async for vehicle in db.vehicles.find({}, projection).batch_size(batch_size):
+        vehicles += 1
+        for key, label in counter_entries(vehicle).items():
+            counts[key] += 1
+            labels.setdefault(key, label)
+
+    await db.vehicle_facets.delete_many({})
+    documents: Iterable[Dict[str, Any]] = (
+        {"_id": "|".join(key), "scope": key[0], "facet": key[1], "key": key[2], "label": labels[key], "count": count}
+        for key, count in counts.items()
+    )
+    batch: List[Dict[str, Any]] = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await db.vehicle_facets.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.vehicle_facets.insert_many(batch, ordered=False)
+    return vehicles
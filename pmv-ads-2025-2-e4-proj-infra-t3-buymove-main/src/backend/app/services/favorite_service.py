@@ -1,79 +1,174 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List
 
 from bson import ObjectId
 from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
-
-from ..models.favorite import FavoriteCreate, FavoritePublic
-from ..services.vehicle_service import serialize_vehicle
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..core import admission
+from ..models.favorite import FavoriteCreate, FavoriteListResponse, FavoritePublic, FavoriteStatusResponse
+from ..services import vehicle_cache, vehicle_views
+from ..services.vehicle_service import serialize_item
+from ..services.vehicle_views import VehicleProjection, ViewName
+from ..utils.dates import utc_now
 from ..utils.object_id import object_id_to_str
+from ..utils.pagination import keyset_cursor, keyset_filter
 
 
 async def add_favorite(db: AsyncIOMotorDatabase, user_id: str, payload: FavoriteCreate) -> FavoritePublic:
+    """Favorite a vehicle (idempotent) and bump its ``favorite_count``.
+
+    The favorite upsert and the counter ``$inc`` are two writes on different collections, with no
+    transaction: if the second one fails the count drifts until ``scripts.manage recount-favorites`` runs.
+    """
     if not ObjectId.is_valid(payload.vehicle_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ve?culo inv?lido")
 
-    vehicle = await db.vehicles.find_one({"_id": ObjectId(payload.vehicle_id)})
+    key = {"user_id": ObjectId(user_id), "vehicle_id": ObjectId(payload.vehicle_id)}
+    # _id gerado aqui: se o documento devolvido tem esse _id, foi esta chamada que inseriu
+    candidate = ObjectId()
+    try:
+        favorite = await db.favorites.find_one_and_update(
+            key,
+            {"$setOnInsert": {"_id": candidate, "created_at": utc_now()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Upsert concorrente do mesmo par: o indice unico garante um unico favorito
+        favorite = await db.favorites.find_one(key)
+
+    if favorite["_id"] != candidate:
+        # Ja favoritado: contador intacto
+        vehicle = await db.vehicles.find_one({"_id": key["vehicle_id"]})
+        if not vehicle:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ve?culo n?o encontrado")
+        return serialize_favorite(favorite, vehicle)
+
+    # O $inc confirma que o veiculo existe e ja devolve o documento atualizado
+    vehicle = await change_favorite_count(db, key["vehicle_id"], 1)
     if not vehicle:
+        await db.favorites.delete_one({"_id": candidate})
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ve?culo n?o encontrado")
+    return serialize_favorite(favorite, vehicle)
+
+
+async def list_favorites(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    *,
+    page_size: int = 20,
+    cursor: str | None = None,
+    view: ViewName = "full",
+    fields: str | None = None,
+) -> FavoriteListResponse:
+    projection = vehicle_views.resolve_view(view, fields)
+    match: Dict[str, Any] = {"user_id": ObjectId(user_id)}
+    if cursor:
+        match = {"$and": [match, keyset_filter(cursor, "created_at")]}
+
+    # $match/$sort/$limit usam o indice (user_id, created_at, _id); o $lookup so roda na pagina.
+    # $lookup por localField/foreignField sem pipeline funciona em qualquer MongoDB (3.2+); a
+    # projecao vem depois, ainda no servidor: campos fora da view nao saem do banco
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": match},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": page_size + 1},
+        {"$lookup": {"from": "vehicles", "localField": "vehicle_id", "foreignField": "_id", "as": "vehicle"}},
+        {"$unwind": {"path": "$vehicle", "preserveNullAndEmptyArrays": True}},
+    ]
+    if projection.projection:
+        pipeline.extend(projection.embedded_stages("vehicle", keep=("user_id", "vehicle_id", "created_at")))
+
+    documents = await db.favorites.aggregate(pipeline, **admission.time_limit()).to_list(length=page_size + 1)
+    has_more = len(documents) > page_size
+    documents = documents[:page_size]
+
+    return FavoriteListResponse(
+        items=[serialize_favorite(doc, doc.get("vehicle"), projection) for doc in documents],
+        next_cursor=keyset_cursor(documents[-1], "created_at") if has_more else None,
+        has_more=has_more,
+    )
 
-    document = {
-        "user_id": ObjectId(user_id),
-        "vehicle_id": ObjectId(payload.vehicle_id),
-        "created_at": datetime.now(timezone.utc),
-    }
 
-    existing = await db.favorites.find_one(
-        {"user_id": document["user_id"], "vehicle_id": document["vehicle_id"]}
-    )
-    if existing:
-        return serialize_favorite(existing, vehicle)
-
-    result = await db.favorites.insert_one(document)
-    stored = await db.favorites.find_one({"_id": result.inserted_id})
-    return serialize_favorite(stored, vehicle)
-
-
-async def list_favorites(db: AsyncIOMotorDatabase, user_id: str) -> List[FavoritePublic]:
-    cursor = db.favorites.aggregate(
-        [
-            {"$match": {"user_id": ObjectId(user_id)}},
-            {"$sort": {"created_at": -1}},
-            {
-                "$lookup": {
-                    "from": "vehicles",
-                    "localField": "vehicle_id",
-                    "foreignField": "_id",
-                    "as": "vehicle",
-                }
-            },
-            {"$unwind": {"path": "$vehicle", "preserveNullAndEmptyArrays": True}},
-        ]
-    )
-    documents = await cursor.to_list(length=None)
-    return [serialize_favorite(doc, doc.get("vehicle")) for doc in documents]
+async def favorite_status(db: AsyncIOMotorDatabase, user_id: str, vehicle_ids: List[str]) -> FavoriteStatusResponse:
+    """Subset of ``vehicle_ids`` favorited by the user (covered by the (user_id, vehicle_id) index)."""
+    if not all(ObjectId.is_valid(vehicle_id) for vehicle_id in vehicle_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Veiculo invalido")
+    requested = list(dict.fromkeys(ObjectId(vehicle_id) for vehicle_id in vehicle_ids))
+    if not requested:
+        return FavoriteStatusResponse(favorited=[])
+
+    documents = await db.favorites.find(
+        {"user_id": ObjectId(user_id), "vehicle_id": {"$in": requested}},
+        {"_id": 0, "vehicle_id": 1},
+        max_time_ms=admission.remaining_ms(),
+    ).to_list(length=len(requested))
+    favorited = {doc["vehicle_id"] for doc in documents}
+    return FavoriteStatusResponse(favorited=[str(vehicle_id) for vehicle_id in requested if vehicle_id in favorited])
 
 
 async def remove_favorite(db: AsyncIOMotorDatabase, user_id: str, vehicle_id: str) -> None:
+    """Remove a favorite and decrement ``favorite_count`` (same drift caveat as ``add_favorite``)."""
     if not ObjectId.is_valid(vehicle_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ve?culo inv?lido")
 
-    result = await db.favorites.delete_one(
-        {"user_id": ObjectId(user_id), "vehicle_id": ObjectId(vehicle_id)}
+    removed = await db.favorites.find_one_and_delete(
+        {"user_id": ObjectId(user_id), "vehicle_id": ObjectId(vehicle_id)},
+        projection={"_id": 0, "user_id": 1, "vehicle_id": 1, "created_at": 1},
     )
-    if result.deleted_count == 0:
+    if not removed:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Favorito n?o encontrado")
+    await change_favorite_count(db, removed["vehicle_id"], -1)
+    # O job de co-favoritos (co_favorite_service) desconta a remocao na proxima execucao
+    await db.favorite_removals.insert_one({**removed, "removed_at": utc_now()})
 
 
-def serialize_favorite(document: dict | None, vehicle_document: dict | None) -> FavoritePublic:
+async def change_favorite_count(db: AsyncIOMotorDatabase, vehicle_id: ObjectId, delta: int) -> dict | None:
+    """Atomically apply ``delta`` to the vehicle's favorite_count; returns the updated vehicle."""
+    vehicle = await db.vehicles.find_one_and_update(
+        {"_id": vehicle_id},
+        {"$inc": {"favorite_count": delta}},
+        return_document=ReturnDocument.AFTER,
+    )
+    vehicle_cache.invalidate_counters(str(vehicle_id))
+    return vehicle
+
+
+async def recount_favorites(db: AsyncIOMotorDatabase, *, batch_size: int = 1000) -> int:
+    """Recompute every favorite_count from the favorites collection (backfill/repair)."""
+    await db.vehicles.update_many({}, {"$set": {"favorite_count": 0}})
+    counts = db.favorites.aggregate([{"$group": {"_id": "$vehicle_id", "count": {"$sum": 1}}}])
+    operations: List[UpdateOne] = []
+    vehicles = 0
+    async for row in counts:
+        operations.append(UpdateOne({"_id": row["_id"]}, {"$set": {"favorite_count": row["count"]}}))
+        vehicles += 1
+        if len(operations) >= batch_size:
+            await db.vehicles.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await db.vehicles.bulk_write(operations, ordered=False)
+    vehicle_cache.clear()
+    return vehicles
+
+
+def serialize_favorite(
+    document: dict | None,
+    vehicle_document: dict | None,
+    projection: VehicleProjection = vehicle_views.FULL,
+) -> FavoritePublic:
     if not document:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Favorito n?o encontrado")
     data = object_id_to_str(document)
     data["vehicle_id"] = str(document["vehicle_id"])
+    # O documento bruto do $lookup e serializado separadamente logo abaixo
+    data.pop("vehicle", None)
     favorite = FavoritePublic.model_validate(data)
-    if vehicle_document:
-        favorite.vehicle = serialize_vehicle(vehicle_document)
+    # Veiculo removido: a projecao do $lookup vazio ainda pode deixar {"images": null, ...}, sem _id
+    if vehicle_document and "_id" in vehicle_document:
+        favorite.vehicle = serialize_item(vehicle_document, projection)
     return favorite
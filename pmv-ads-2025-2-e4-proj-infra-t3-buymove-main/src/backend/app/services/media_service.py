@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+
+from ..core.config import settings
+
+# Fotos dos anuncios, enderecadas pelo sha256 do arquivo enviado:
+#   MEDIA_ROOT/originals/ab/<hash>             original, como chegou
+#   MEDIA_ROOT/variants/ab/<hash>/<nome>.webp  variantes redimensionadas (card, gallery, full)
+# O conteudo de uma URL nunca muda, entao as variantes saem com cache imutavel.
+# O redimensionamento (Pillow, CPU) roda num pool de processos, fora do event loop.
+
+# nome -> (largura maxima, altura maxima, qualidade WebP)
+VARIANTS: Dict[str, Tuple[int, int, int]] = {
+    "card": (480, 360, 70),
+    "gallery": (1280, 960, 78),
+    "full": (2048, 1536, 82),
+}
+ACCEPTED_TYPES = ("image/jpeg", "image/png", "image/webp")
+ACCEPTED_FORMATS = ("JPEG", "PNG", "WEBP")
+# Limite de pixels do original (protege o pool contra "bombas" de descompressao)
+MAX_IMAGE_PIXELS = 50_000_000
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+READ_CHUNK_BYTES = 1024 * 1024
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+_image_executor: ProcessPoolExecutor | None = None
+_image_pending = 0
+
+
+def original_path(digest: str) -> Path:
+    return settings.media_root / "originals" / digest[:2] / digest
+
+
+def variant_dir(digest: str) -> Path:
+    return settings.media_root / "variants" / digest[:2] / digest
+
+
+def variant_url(digest: str, variant: str) -> str:
+    return f"{settings.media_url_prefix}/{digest}/{variant}.webp"
+
+
+def variant_file(digest: str, variant: str) -> Path | None:
+    """Path of a stored variant, or None for names that are not a digest/variant (no path traversal)."""
+    if variant not in VARIANTS or not DIGEST_PATTERN.match(digest):
+        return None
+    path = variant_dir(digest) / f"{variant}.webp"
+    return path if path.is_file() else None
+
+
+def save_original(data: bytes) -> str:
+    """Hash and store an upload (runs in a thread); returns its sha256."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = original_path(digest)
+    # Mesmo hash = mesmo conteudo: se ja existe, nada a fazer; senao grava em temporario e renomeia
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+    return digest
+
+
+def render_variants(source: str, target: str) -> Tuple[int, int]:
+    """Process pool task: validate the original and write the missing WebP variants; returns its size."""
+    # Pillow so e carregado nos processos do pool
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(source) as opened:
+            if opened.format not in ACCEPTED_FORMATS:
+                raise ValueError(f"formato nao suportado: {opened.format}")
+            image = ImageOps.exif_transpose(opened)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as exc:
+        # Excecoes do Pillow nem sempre atravessam o pool (pickle): vira ValueError com a mensagem
+        raise ValueError(str(exc)) from None
+
+    target_dir = Path(target)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for name, (max_width, max_height, quality) in VARIANTS.items():
+        path = target_dir / f"{name}.webp"
+        if path.exists():
+            continue
+        variant = image.copy()
+        variant.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+        temporary = target_dir / f".{name}.{uuid.uuid4().hex}.tmp"
+        variant.save(temporary, "WEBP", quality=quality, method=4)
+        os.replace(temporary, path)
+    return image.size
+
+
+def get_image_executor() -> ProcessPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ProcessPoolExecutor(max_workers=settings.image_workers)
+    return _image_executor
+
+
+def shutdown_image_executor() -> None:
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=False, cancel_futures=True)
+        _image_executor = None
+
+
+async def read_upload(upload: UploadFile) -> bytes:
+    """Read an uploaded image, rejecting other content types and files over MEDIA_MAX_UPLOAD_BYTES."""
+    if upload.content_type not in ACCEPTED_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Tipo de arquivo nao suportado (aceitos: {', '.join(ACCEPTED_TYPES)})",
+        )
+    chunks = []
+    size = 0
+    while chunk := await upload.read(READ_CHUNK_BYTES):
+        size += len(chunk)
+        if size > settings.media_max_upload_bytes:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Arquivo muito grande")
+        chunks.append(chunk)
+    if not size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Arquivo vazio")
+    return b"".join(chunks)
+
+
+async def store_image(data: bytes) -> Dict[str, Any]:
+    """Store the original by content hash and render its variants; returns the ``media`` entry."""
+    global _image_pending
+    if _image_pending >= settings.image_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Processamento de imagens sobrecarregado, tente novamente",
+            headers={"Retry-After": "5"},
+        )
+    _image_pending += 1
+    try:
+        digest = await asyncio.to_thread(save_original, data)
+        width, height = await asyncio.get_running_loop().run_in_executor(
+            get_image_executor(), render_variants, str(original_path(digest)), str(variant_dir(digest))
+        )
+    except ValueError as exc:
+        # Nao e imagem valida: o original nao fica ocupando disco
+        await asyncio.to_thread(original_path(digest).unlink, missing_ok=True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Imagem invalida") from exc
+    finally:
+        _image_pending -= 1
+
+    return {
+        "hash": digest,
+        "width": width,
+        "height": height,
+        **{name: variant_url(digest, name) for name in VARIANTS},
+    }
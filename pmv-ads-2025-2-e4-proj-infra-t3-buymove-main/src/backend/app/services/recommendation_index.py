@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from ..core import metrics
+from ..core.config import settings
+from ..utils.text import fold_text
+
+# Indice de recomendacoes em memoria: cada veiculo vira uma coluna de matrizes
+# NumPy (atributos numericos + codigos das categorias) e os vizinhos mais
+# proximos saem de uma conta vetorizada sobre o catalogo inteiro, sem consultas.
+# Cada worker mantem o proprio indice: as escritas locais sao aplicadas na hora
+# e o rebuild periodico traz as dos outros workers.
+
+# Peso de cada atributo na distancia. Numericos entram padronizados (desvio padrao do catalogo)
+NUMERIC_FEATURES: Dict[str, float] = {"price": 3.0, "year": 1.5, "mileage": 1.0}
+CATEGORICAL_FEATURES: Dict[str, float] = {"brand": 2.0, "fuel_type": 0.75, "transmission": 0.75, "doors": 0.25}
+FEATURE_FIELDS: Tuple[str, ...] = (*NUMERIC_FEATURES, *CATEGORICAL_FEATURES)
+
+# Preco e quilometragem variam em ordens de grandeza: a escala log aproxima carros "parecidos"
+LOG_FEATURES = frozenset({"price", "mileage"})
+MISSING = -1
+
+
+class RecommendationIndex:
+    """
+    Dense feature matrices of the catalog with swap-remove updates.
+
+    As matrizes sao guardadas por atributo (uma linha por atributo, uma coluna por
+    veiculo): cada passo da distancia percorre um vetor contiguo em float32.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.ids: List[ObjectId] = []
+        self.positions: Dict[ObjectId, int] = {}
+        self.numeric = np.full((len(NUMERIC_FEATURES), capacity), np.nan, dtype=np.float32)
+        self.categorical = np.full((len(CATEGORICAL_FEATURES), capacity), MISSING, dtype=np.int32)
+        self.vocabularies: List[Dict[str, int]] = [{} for _ in CATEGORICAL_FEATURES]
+        self._scale: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, vehicle_id: object) -> bool:
+        return vehicle_id in self.positions
+
+    def upsert(self, document: Dict[str, Any]) -> None:
+        vehicle_id = document["_id"]
+        row = self.positions.get(vehicle_id)
+        if row is None:
+            row = len(self.ids)
+            if row == self.numeric.shape[1]:
+                self._grow()
+            self.ids.append(vehicle_id)
+            self.positions[vehicle_id] = row
+        self.numeric[:, row] = self._numeric_row(document)
+        self.categorical[:, row] = self._categorical_row(document)
+        self._scale = None
+
+    def remove(self, vehicle_id: ObjectId) -> None:
+        row = self.positions.pop(vehicle_id, None)
+        if row is None:
+            return
+        # A ultima coluna ocupa o lugar da removida para as matrizes continuarem densas
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            self.positions[moved] = row
+            self.numeric[:, row] = self.numeric[:, last]
+            self.categorical[:, row] = self.categorical[:, last]
+        self.ids.pop()
+        self._scale = None
+
+    def nearest(self, vehicle_id: ObjectId, k: int) -> List[ObjectId] | None:
+        """The ``k`` closest vehicles, or None when ``vehicle_id`` is not indexed."""
+        row = self.positions.get(vehicle_id)
+        if row is None:
+            return None
+        k = min(k, len(self.ids) - 1)
+        if k <= 0:
+            return []
+
+        distances = self.distances(row)
+        distances[row] = np.inf
+        candidates = np.argpartition(distances, k - 1)[:k]
+        ordered = candidates[np.argsort(distances[candidates], kind="stable")]
+        return [self.ids[index] for index in ordered]
+
+    def distances(self, row: int) -> np.ndarray:
+        size = len(self.ids)
+        total = np.zeros(size, dtype=np.float32)
+        difference = np.empty(size, dtype=np.float32)
+        for values, scale, weight in zip(self.numeric[:, :size], self.scale(), NUMERIC_FEATURES.values()):
+            np.subtract(values, values[row], out=difference)
+            difference *= 1 / scale
+            np.square(difference, out=difference)
+            # Valor ausente (em qualquer um dos lados) conta como um desvio padrao de diferenca
+            np.nan_to_num(difference, copy=False, nan=1.0)
+            difference *= weight
+            total += difference
+
+        for codes, weight in zip(self.categorical[:, :size], CATEGORICAL_FEATURES.values()):
+            base = codes[row]
+            if base == MISSING:
+                total += weight
+            else:
+                np.add(total, np.float32(weight), out=total, where=codes != base)
+        return total
+
+    def scale(self) -> np.ndarray:
+        if self._scale is None:
+            numeric = self.numeric[:, : len(self.ids)].astype(np.float64)
+            present = ~np.isnan(numeric)
+            counts = np.maximum(present.sum(axis=1), 1)
+            mean = np.where(present, numeric, 0.0).sum(axis=1) / counts
+            variance = np.where(present, np.square(numeric - mean[:, None]), 0.0).sum(axis=1) / counts
+            scale = np.sqrt(variance)
+            scale[scale == 0] = 1.0
+            self._scale = scale
+        return self._scale
+
+    def _grow(self) -> None:
+        size = len(self.ids)
+        capacity = self.numeric.shape[1] * 2
+        numeric = np.full((self.numeric.shape[0], capacity), np.nan, dtype=np.float32)
+        numeric[:, :size] = self.numeric[:, :size]
+        categorical = np.full((self.categorical.shape[0], capacity), MISSING, dtype=np.int32)
+        categorical[:, :size] = self.categorical[:, :size]
+        self.numeric, self.categorical = numeric, categorical
+
+    def _numeric_row(self, document: Dict[str, Any]) -> List[float]:
+        row = []
+        for field in NUMERIC_FEATURES:
+            value = document.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                row.append(np.nan)
+            elif field in LOG_FEATURES:
+                row.append(float(np.log1p(value)))
+            else:
+                row.append(float(value))
+        return row
+
+    def _categorical_row(self, document: Dict[str, Any]) -> List[int]:
+        row = []
+        for field, vocabulary in zip(CATEGORICAL_FEATURES, self.vocabularies):
+            value = document.get(field)
+            key = fold_text(str(value)) if value is not None and value != "" else ""
+            row.append(vocabulary.setdefault(key, len(vocabulary)) if key else MISSING)
+        return row
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "vehicles": len(self.ids),
+            "capacity": int(self.numeric.shape[1]),
+            "categories": {field: len(vocabulary) for field, vocabulary in zip(CATEGORICAL_FEATURES, self.vocabularies)},
+        }
+
+
+index = RecommendationIndex()
+_ready = False
+# Escritas vistas enquanto um rebuild le o catalogo; sao reaplicadas no indice novo
+_pending: List[Tuple[str, Any]] | None = None
+
+
+def ready() -> bool:
+    return settings.recommendation_index_enabled and _ready
+
+
+def upsert(document: Dict[str, Any]) -> None:
+    if not settings.recommendation_index_enabled:
+        return
+    features = {"_id": document["_id"], **{field: document.get(field) for field in FEATURE_FIELDS}}
+    index.upsert(features)
+    if _pending is not None:
+        _pending.append(("upsert", features))
+
+
+def remove(vehicle_id: ObjectId) -> None:
+    if not settings.recommendation_index_enabled:
+        return
+    index.remove(vehicle_id)
+    if _pending is not None:
+        _pending.append(("remove", vehicle_id))
+
+
+def nearest(vehicle_id: ObjectId, k: int) -> List[ObjectId] | None:
+    return index.nearest(vehicle_id, k) if ready() else None
+
+
+async def rebuild(db: AsyncIOMotorDatabase, *, batch_size: int = 1000) -> int:
+    """Load every vehicle into a fresh index and swap it in."""
+    global index, _ready, _pending
+    _pending = []
+    try:
+        fresh = RecommendationIndex()
+        projection = {field: 1 for field in FEATURE_FIELDS}
+        async for vehicle in db.vehicles.find({}, projection).batch_size(batch_size):
+            fresh.upsert(vehicle)
+        for operation, value in _pending:
+            if operation == "upsert":
+                fresh.upsert(value)
+            else:
+                fresh.remove(value)
+        index = fresh
+        _ready = True
+    finally:
+        _pending = None
+    return len(index)
+
+
+async def maintain(db: AsyncIOMotorDatabase) -> None:
+    """Background task started by the lifespan: first build, then periodic refreshes."""
+    while True:
+        try:
+            await rebuild(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            # recommendation_index_ready continua 0 ate a primeira montagem; depois o indice anterior segue em uso
+            metrics.recommendation_index_failures.inc()
+            print("❌ Erro ao montar o indice de recomendacoes:", repr(exc))
+        if settings.recommendation_index_refresh_seconds <= 0:
+            return
+        await asyncio.sleep(settings.recommendation_index_refresh_seconds)
+
+
+def stats() -> Dict[str, Any]:
+    return {"name": "recommendation_index", "ready": ready(), **index.stats()}
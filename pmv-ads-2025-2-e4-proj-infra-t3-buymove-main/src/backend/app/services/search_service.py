@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+
+from ..core import admission, indexes
+from ..utils.text import tokenize
+
+# Indice invertido proprio para o parametro q de GET /vehicles.
+# Cada termo guarda uma lista de postings com o "impacto" BM25 ja calculado,
+# assim a busca le no maximo POSTINGS_PER_TERM entradas por termo, independente
+# do tamanho do catalogo. Com filtros seletivos (ate FILTERED_CANDIDATES veiculos) a busca
+# le apenas os postings desses veiculos: ranking e total ficam exatos.
+
+SEARCH_FIELDS: Dict[str, float] = {
+    "title": 3.0,
+    "brand": 2.0,
+    "model": 2.0,
+    "version": 1.0,
+    "description": 1.0,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+POSTINGS_PER_TERM = 1000
+MAX_CANDIDATES = 1000
+FILTERED_CANDIDATES = 5000
+PREFIX_EXPANSIONS = 5
+MIN_PREFIX_LENGTH = 3
+STATS_ID = "vehicles"
+INDEX_COLLECTIONS = ("search_postings", "search_terms", "search_stats")
+# rebuild_index monta o indice novo nestas colecoes e so depois troca pelas atuais
+STAGING_SUFFIX = "_rebuild"
+
+
+@dataclass
+class SearchResult:
+    ranked: List[Tuple[ObjectId, float]]
+    # False quando os postings de algum termo ou o ranking foram cortados: o total e so um limite inferior
+    complete: bool = True
+
+
+def has_terms(q: str | None) -> bool:
+    """Whether ``q`` has any searchable term left after dropping stopwords."""
+    return bool(tokenize(q))
+
+
+def term_frequencies(document: Dict[str, Any]) -> Dict[str, float]:
+    """Weighted term frequencies of the searchable fields of a vehicle."""
+    frequencies: Counter[str] = Counter()
+    for field, weight in SEARCH_FIELDS.items():
+        value = document.get(field)
+        if isinstance(value, str):
+            for token in tokenize(value):
+                frequencies[token] += weight
+    return dict(frequencies)
+
+
+def bm25_impact(frequency: float, length: float, average_length: float) -> float:
+    norm = 1 - BM25_B + BM25_B * (length / average_length if average_length else 1.0)
+    return frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+
+
+def bm25_idf(documents: int, document_frequency: int) -> float:
+    return math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+async def index_vehicle(db: AsyncIOMotorDatabase, document: Dict[str, Any]) -> None:
+    frequencies = term_frequencies(document)
+    if not frequencies:
+        return
+
+    length = sum(frequencies.values())
+    stats = await db.search_stats.find_one_and_update(
+        {"_id": STATS_ID},
+        {"$inc": {"documents": 1, "total_length": length}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    average_length = stats["total_length"] / max(stats["documents"], 1)
+
+    await db.search_postings.insert_many(
+        [
+            {
+                "term": term,
+                "vehicle_id": document["_id"],
+                "tf": frequency,
+                "length": length,
+                "impact": bm25_impact(frequency, length, average_length),
+            }
+            for term, frequency in frequencies.items()
+        ],
+        ordered=False,
+    )
+    await db.search_terms.bulk_write(
+        [UpdateOne({"_id": term}, {"$inc": {"df": 1}}, upsert=True) for term in frequencies],
+        ordered=False,
+    )
+
+
+async def unindex_vehicle(db: AsyncIOMotorDatabase, vehicle_id: ObjectId) -> None:
+    postings = await db.search_postings.find(
+        {"vehicle_id": vehicle_id},
+        {"term": 1, "length": 1},
+    ).to_list(length=None)
+    if not postings:
+        return
+
+    await db.search_postings.delete_many({"vehicle_id": vehicle_id})
+    await db.search_terms.bulk_write(
+        [UpdateOne({"_id": posting["term"]}, {"$inc": {"df": -1}}) for posting in postings],
+        ordered=False,
+    )
+    await db.search_stats.update_one(
+        {"_id": STATS_ID},
+        {"$inc": {"documents": -1, "total_length": -postings[0]["length"]}},
+    )
+
+
+async def reindex_vehicle(db: AsyncIOMotorDatabase, document: Dict[str, Any]) -> None:
+    await unindex_vehicle(db, document["_id"])
+    await index_vehicle(db, document)
+
+
+async def search(
+    db: AsyncIOMotorDatabase,
+    q: str,
+    *,
+    limit: int = MAX_CANDIDATES,
+    within: Sequence[ObjectId] | None = None,
+) -> SearchResult:
+    """Rank vehicles by BM25 relevance; ``within`` restricts (and makes exact) the search to those ids."""
+    terms = list(dict.fromkeys(tokenize(q)))
+    if not terms:
+        return SearchResult([])
+
+    # O ultimo termo tambem e expandido por prefixo para a busca enquanto o usuario digita
+    last = terms[-1]
+    # Consultas com o prazo da requisicao (GET /vehicles?q=): o servidor abandona a busca no maxTimeMS
+    max_time_ms = admission.remaining_ms()
+    lookups = [
+        db.search_terms.find({"_id": {"$in": terms}, "df": {"$gt": 0}}, max_time_ms=max_time_ms).to_list(
+            length=len(terms)
+        )
+    ]
+    if len(last) >= MIN_PREFIX_LENGTH:
+        lookups.append(
+            db.search_terms.find({"_id": {"$regex": f"^{re.escape(last)}"}, "df": {"$gt": 0}}, max_time_ms=max_time_ms)
+            .limit(PREFIX_EXPANSIONS)
+            .to_list(length=PREFIX_EXPANSIONS)
+        )
+    stats, *term_lists = await asyncio.gather(db.search_stats.find_one({"_id": STATS_ID}), *lookups)
+    if not stats or stats.get("documents", 0) <= 0:
+        return SearchResult([])
+
+    document_frequencies = {doc["_id"]: doc["df"] for docs in term_lists for doc in docs}
+    if not document_frequencies or within is not None and not within:
+        return SearchResult([])
+
+    if within is not None:
+        # Todos os postings dos veiculos filtrados (indice vehicle_id + term): nada fica de fora
+        found = await db.search_postings.find(
+            {"vehicle_id": {"$in": list(within)}, "term": {"$in": list(document_frequencies)}},
+            {"_id": 0, "term": 1, "vehicle_id": 1, "impact": 1},
+            max_time_ms=admission.remaining_ms(),
+        ).to_list(length=None)
+        postings = [(posting["term"], posting) for posting in found]
+        complete = True
+        limit = len(within)
+    else:
+        term_postings = await asyncio.gather(
+            *(
+                db.search_postings.find(
+                    {"term": term}, {"_id": 0, "vehicle_id": 1, "impact": 1}, max_time_ms=admission.remaining_ms()
+                )
+                .sort([("impact", -1)])
+                .limit(POSTINGS_PER_TERM)
+                .to_list(length=POSTINGS_PER_TERM)
+                for term in document_frequencies
+            )
+        )
+        postings = [
+            (term, posting) for term, term_list in zip(document_frequencies, term_postings) for posting in term_list
+        ]
+        complete = all(len(term_list) < POSTINGS_PER_TERM for term_list in term_postings)
+
+    idfs = {term: bm25_idf(stats["documents"], frequency) for term, frequency in document_frequencies.items()}
+    scores: Dict[ObjectId, float] = {}
+    for term, posting in postings:
+        vehicle_id = posting["vehicle_id"]
+        scores[vehicle_id] = scores.get(vehicle_id, 0.0) + idfs[term] * posting["impact"]
+
+    ranked = sorted(scores.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    return SearchResult(ranked[:limit], complete and len(ranked) <= limit)
+
+
+async def rebuild_index(db: AsyncIOMotorDatabase, *, batch_size: int = 1000) -> int:
+    """Build the inverted index into staging collections and swap them in with renameCollection.
+
+    Searches keep reading the previous index until the swap. Vehicles written while the rebuild
+    runs are indexed into the old collections and lost by the swap, so run it with writes paused.
+    """
+    projection = {field: 1 for field in SEARCH_FIELDS}
+    staging = {name: db[f"{name}{STAGING_SUFFIX}"] for name in INDEX_COLLECTIONS}
+    # Sobras de uma reconstrucao interrompida
+    await asyncio.gather(*(collection.drop() for collection in staging.values()))
+    await staging["search_postings"].create_indexes(
+        [spec.model() for spec in indexes.by_collection()["search_postings"]]
+    )
+
+    documents = 0
+    total_length = 0.0
+    async for vehicle in db.vehicles.find({}, projection):
+        frequencies = term_frequencies(vehicle)
+        if frequencies:
+            documents += 1
+            total_length += sum(frequencies.values())
+    average_length = total_length / max(documents, 1)
+
+    document_frequencies: Counter[str] = Counter()
+    batch: List[Dict[str, Any]] = []
+    async for vehicle in db.vehicles.find({}, projection).batch_size(batch_size):
+        frequencies = term_frequencies(vehicle)
+        length = sum(frequencies.values())
+        document_frequencies.update(frequencies.keys())
+        batch.extend(
+            {
+                "term": term,
+                "vehicle_id": vehicle["_id"],
+                "tf": frequency,
+                "length": length,
+                "impact": bm25_impact(frequency, length, average_length),
+            }
+            for term, frequency in frequencies.items()
+        )
+        if len(batch) >= batch_size:
+            await staging["search_postings"].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await staging["search_postings"].insert_many(batch, ordered=False)
+
+    if document_frequencies:
+        await staging["search_terms"].insert_many(
+            [{"_id": term, "df": frequency} for term, frequency in document_frequencies.items()],
+            ordered=False,
+        )
+    else:
+        await db.create_collection(staging["search_terms"].name)
+    await staging["search_stats"].insert_one({"_id": STATS_ID, "documents": documents, "total_length": total_length})
+
+    # Cada rename e atomico; entre eles uma busca pode combinar postings novos com df antigo (so o score varia)
+    for name, collection in staging.items():
+        await collection.rename(name, dropTarget=True)
+    return documents
@@ -1,36 +1,45 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-
 from bson import ObjectId
 from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
 
-from ..core.security import hash_password, verify_password
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.security import hash_password_async, verify_password_async
 from ..models.user import UserCreate, UserInDB, UserPublic
+from ..utils.dates import utc_now
 from ..utils.object_id import object_id_to_str
 
+# Usuarios resolvidos por get_current_user. Nao ha invalidacao: cada worker tem sua copia e uma troca
+# de papel/senha feita direto no banco so e vista apos USER_CACHE_TTL_SECONDS (limite de defasagem)
+user_cache: TTLCache[UserInDB] = TTLCache(
+    "users",
+    max_entries=settings.cache_max_entries if settings.cache_enabled else 0,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
 
-async def create_user(db: AsyncIOMotorDatabase, payload: UserCreate) -> UserPublic:
-    existing = await db.users.find_one({"email": payload.email.lower()})
-    if existing:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="E-mail já cadastrado")
 
-    now = datetime.now(timezone.utc)
+async def create_user(db: AsyncIOMotorDatabase, payload: UserCreate) -> UserPublic:
+    now = utc_now()
     document = payload.model_dump()
     password = document.pop("password")
     document.update(
         {
             "email": payload.email.lower(),
-            "hashed_password": hash_password(password),
+            "hashed_password": await hash_password_async(password),
             "created_at": now,
             "updated_at": now,
         }
     )
 
-    result = await db.users.insert_one(document)
-    stored = await db.users.find_one({"_id": result.inserted_id})
-    return serialize_user(stored)
+    # O indice unico de email detecta o cadastro duplicado no proprio insert
+    try:
+        result = await db.users.insert_one(document)
+    except DuplicateKeyError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="E-mail já cadastrado") from exc
+    return serialize_user({**document, "_id": result.inserted_id})
 
 
 async def get_user_by_email(db: AsyncIOMotorDatabase, email: str) -> UserInDB | None:
@@ -48,7 +57,10 @@ async def get_user_by_email(db: AsyncIOMotorDatabase, email: str) -> UserInDB |
 async def get_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> UserInDB | None:
     if not ObjectId.is_valid(user_id):
         return None
+    return await user_cache.get_or_load(str(ObjectId(user_id)), lambda: load_user(db, user_id))
+
 
+async def load_user(db: AsyncIOMotorDatabase, user_id: str) -> UserInDB | None:
     raw = await db.users.find_one({"_id": ObjectId(user_id)})
     if not raw:
         return None
@@ -64,7 +76,7 @@ async def authenticate_user(db: AsyncIOMotorDatabase, email: str, password: str)
     user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
 
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from collections.abc import Hashable
+from typing import Any, Dict, List, Tuple
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..models.vehicle import VehicleListResponse, VehiclePublic
+from ..utils.object_id import MongoBaseModel
+from ..utils.text import fold_text, tokenize
+from .search_service import SEARCH_FIELDS
+
+# Caches das leituras do catalogo. As escritas em vehicle_service chamam
+# invalidate_vehicle com o documento antes/depois da alteracao.
+
+_max_entries = settings.cache_max_entries if settings.cache_enabled else 0
+
+details: TTLCache[VehiclePublic] = TTLCache(
+    "vehicle_detail", max_entries=_max_entries, ttl_seconds=settings.cache_ttl_seconds
+)
+lists: TTLCache[VehicleListResponse] = TTLCache(
+    "vehicle_list", max_entries=_max_entries, ttl_seconds=settings.cache_ttl_seconds
+)
+recommendations: TTLCache[List[MongoBaseModel]] = TTLCache(
+    "vehicle_recommendations", max_entries=_max_entries, ttl_seconds=settings.cache_ttl_seconds
+)
+
+FILTER_PARAMS = ("q", "brand", "color", "doors", "location", "min_price", "max_price")
+# Filtros comparados sem acentos/maiusculas (campos *_norm); "Sao Paulo" e "são paulo" dividem a chave
+TEXT_FILTERS = ("brand", "color", "location")
+FALLBACK_TAG = "recommendations:fallback"
+# Vizinhos do indice dependem do catalogo inteiro: qualquer escrita invalida
+INDEX_TAG = "recommendations:index"
+
+
+def list_key(**params: Any) -> Tuple[Tuple[str, Any], ...]:
+    """Normalized key of a list request (filters + pagination), ignoring unset params."""
+    normalized = []
+    for name, value in sorted(params.items()):
+        if value is None or value == "":
+            continue
+        if isinstance(value, str) and name in TEXT_FILTERS:
+            value = fold_text(value)
+            if not value:
+                continue
+        elif isinstance(value, str) and name in FILTER_PARAMS:
+            value = value.strip()
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+def brand_tag(brand: Any) -> str:
+    return f"brand:{fold_text(brand) if isinstance(brand, str) else ''}"
+
+
+def matches_filters(document: Dict[str, Any], key: Tuple[Tuple[str, Any], ...]) -> bool:
+    """Whether ``document`` can be part of the list cached under ``key`` (mirrors build_filters)."""
+    params = dict(key)
+    for field in TEXT_FILTERS:
+        expected = params.get(field)
+        if expected is None:
+            continue
+        value = document.get(field)
+        folded = fold_text(value) if isinstance(value, str) else ""
+        # Localizacao casa por prefixo; marca e cor pelo valor inteiro
+        matched = folded.startswith(expected) if field == "location" else folded == expected
+        if not matched:
+            return False
+
+    doors = params.get("doors")
+    if doors is not None and document.get("doors") != doors:
+        return False
+
+    price = document.get("price")
+    min_price, max_price = params.get("min_price"), params.get("max_price")
+    if min_price is not None or max_price is not None:
+        if not isinstance(price, (int, float)):
+            return False
+        if min_price is not None and price < min_price:
+            return False
+        if max_price is not None and price > max_price:
+            return False
+
+    q = params.get("q")
+    if q:
+        query_terms = tokenize(q)
+        document_terms: set[str] = set()
+        for field in SEARCH_FIELDS:
+            value = document.get(field)
+            if isinstance(value, str):
+                document_terms.update(tokenize(value))
+        if not query_terms:
+            return False
+        last = query_terms[-1]
+        return bool(document_terms & set(query_terms)) or any(term.startswith(last) for term in document_terms)
+    return True
+
+
+def invalidate_vehicle(before: Dict[str, Any] | None, after: Dict[str, Any] | None) -> None:
+    """Drop every cached read that a write from ``before`` to ``after`` may have changed."""
+    documents = [doc for doc in (before, after) if doc]
+    if not documents:
+        return
+    vehicle_id = str(documents[0]["_id"])
+
+    details.invalidate(vehicle_id)
+    # Qualquer lista cujos filtros aceitam o veiculo (antes ou depois) pode mudar de ordem, pagina ou total
+    lists.invalidate_tags([vehicle_id])
+    lists.invalidate_where(
+        lambda key: isinstance(key, tuple) and any(matches_filters(doc, key) for doc in documents)
+    )
+    recommendations.invalidate_tags(
+        [vehicle_id, FALLBACK_TAG, INDEX_TAG, *{brand_tag(doc.get("brand")) for doc in documents}]
+    )
+
+
+def invalidate_counters(vehicle_id: str) -> None:
+    """Drop cached reads that show the vehicle's counters (e.g. favorite_count)."""
+    details.invalidate(vehicle_id)
+    lists.invalidate_tags([vehicle_id])
+    recommendations.invalidate_tags([vehicle_id])
+    # Listas ordenadas por popularidade mudam de ordem mesmo sem conter o veiculo
+    lists.invalidate_where(lambda key: isinstance(key, tuple) and ("sort", "popular") in key)
+
+
+def item_tags(items: List[MongoBaseModel]) -> List[Hashable]:
+    return [item.id for item in items]
+
+
+def clear() -> None:
+    for cache in (details, lists, recommendations):
+        cache.clear()
+
+
+def stats() -> List[Dict[str, Any]]:
+    return [cache.stats() for cache in (details, lists, recommendations)]
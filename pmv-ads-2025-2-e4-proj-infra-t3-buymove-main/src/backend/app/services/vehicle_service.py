@@ -1,15 +1,39 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, List, Literal, Tuple
 
 from bson import ObjectId
-from fastapi import HTTPException, status
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from pymongo import ReturnDocument
-
-from ..models.vehicle import VehicleCreate, VehiclePublic, VehicleUpdate
-from ..utils.object_id import object_id_to_str
+from fastapi import HTTPException, UploadFile, status
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.read_preferences import Primary
+
+from ..core import admission
+from ..core.read_preference import catalog_read_preference
+from ..models.user import UserInDB
+from ..models.vehicle import (
+    VehicleBatchResponse,
+    VehicleCreate,
+    VehicleFacets,
+    VehicleListResponse,
+    VehiclePublic,
+    VehicleUpdate,
+)
+from ..utils.dates import utc_now
+from ..utils.http_cache import Validators, make_etag
+from ..utils.object_id import MongoBaseModel, object_id_to_str
+from ..utils.pagination import cursor_offset, keyset_cursor, keyset_filter, offset_cursor
+from ..utils.text import fold_text
+from . import facet_service, media_service, recommendation_index, search_service, vehicle_cache, vehicle_views
+from .vehicle_views import VehicleProjection, ViewName
+
+# Ordenacoes do catalogo: campo do keyset (sempre desempatado por _id decrescente)
+ListSort = Literal["recent", "popular"]
+SORT_FIELDS: Dict[str, str] = {"recent": "updated_at", "popular": "favorite_count"}
+MAX_BATCH_IDS = 100
+# Copias normalizadas (fold_text) dos campos filtrados por texto: igualdade e prefixo usam indice
+NORMALIZED_FIELDS: Dict[str, str] = {"brand": "brand_norm", "color": "color_norm", "location": "location_norm"}
 
 
 async def list_vehicles(
@@ -24,9 +48,54 @@ async def list_vehicles(
     max_price: float | None = None,
     page: int = 1,
     page_size: int = 12,
-) -> tuple[List[VehiclePublic], int]:
+    cursor: str | None = None,
+    include_total: bool | None = None,
+    sort: ListSort = "recent",
+    view: ViewName = "full",
+    fields: str | None = None,
+) -> VehicleListResponse:
+    projection = vehicle_views.resolve_view(view, fields)
+    params = {
+        "q": q,
+        "brand": brand,
+        "color": color,
+        "doors": doors,
+        "location": location,
+        "min_price": min_price,
+        "max_price": max_price,
+    }
+    pagination = {
+        "page": page,
+        "page_size": page_size,
+        "cursor": cursor,
+        "include_total": include_total,
+        "sort": sort,
+    }
+    return await vehicle_cache.lists.get_or_load(
+        vehicle_cache.list_key(**params, **pagination, view=projection.key),
+        lambda: load_vehicle_list(db, **params, **pagination, projection=projection),
+        tags=lambda response: vehicle_cache.item_tags(response.items),
+    )
+
+
+async def load_vehicle_list(
+    db: AsyncIOMotorDatabase,
+    *,
+    q: str | None,
+    brand: str | None,
+    color: str | None,
+    doors: int | None,
+    location: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    page: int,
+    page_size: int,
+    cursor: str | None,
+    include_total: bool | None,
+    sort: ListSort = "recent",
+    projection: VehicleProjection = vehicle_views.FULL,
+) -> VehicleListResponse:
     query = build_filters(
-        q=q,
         brand=brand,
         color=color,
         doors=doors,
@@ -34,24 +103,111 @@ async def list_vehicles(
         min_price=min_price,
         max_price=max_price,
     )
+    # q so com stopwords ("de", "com") nao vira busca vazia: cai na listagem normal
+    if search_service.has_terms(q):
+        return await search_vehicles(
+            db, q, query, page=page, page_size=page_size, cursor=cursor, projection=projection
+        )
 
-    total = await db.vehicles.count_documents(query)
-    skip = max(page - 1, 0) * page_size
-
-    cursor = (
-        db.vehicles.find(query)
-        .sort([("updated_at", -1)])
+    # Sem cursor o total continua sendo calculado por padrao (compatibilidade com a paginacao por pagina)
+    if include_total is None:
+        include_total = cursor is None
+    total = await catalog(db).count_documents(query, **admission.time_limit()) if include_total else None
+
+    sort_field = SORT_FIELDS[sort]
+    skip = 0
+    if cursor:
+        query = merge_filters(query, keyset_filter(cursor, sort_field))
+    else:
+        skip = max(page - 1, 0) * page_size
+
+    # O campo da ordenacao sempre e lido porque o proximo cursor depende dele
+    fetch = {**projection.projection, sort_field: 1} if projection.projection else None
+
+    # Busca um item a mais para saber se existe proxima pagina sem precisar contar
+    documents = (
+        await catalog(db)
+        .find(query, fetch, max_time_ms=admission.remaining_ms())
+        .sort([(sort_field, -1), ("_id", -1)])
         .skip(skip)
-        .limit(page_size)
+        .limit(page_size + 1)
+        .to_list(length=page_size + 1)
+    )
+    has_more = len(documents) > page_size
+    documents = documents[:page_size]
+
+    return VehicleListResponse(
+        items=[serialize_item(doc, projection) for doc in documents],
+        total=total,
+        next_cursor=keyset_cursor(documents[-1], sort_field) if has_more else None,
+        has_more=has_more,
     )
-    documents = await cursor.to_list(length=page_size)
-    items = [serialize_vehicle(doc) for doc in documents]
-    return items, total
+
+
+async def search_vehicles(
+    db: AsyncIOMotorDatabase,
+    q: str,
+    query: Dict[str, Any],
+    *,
+    page: int = 1,
+    page_size: int = 12,
+    cursor: str | None = None,
+    projection: VehicleProjection = vehicle_views.FULL,
+) -> VehicleListResponse:
+    """Full-text search ordered by relevance; ``total`` is None when the candidate set was truncated."""
+    ordered_ids, complete = await search_candidates(db, q, query)
+    if not ordered_ids:
+        return VehicleListResponse(items=[], total=0 if complete else None)
+
+    offset = cursor_offset(cursor) if cursor else max(page - 1, 0) * page_size
+    page_ids = ordered_ids[offset : offset + page_size]
+    documents = await catalog(db).find(
+        {"_id": {"$in": page_ids}}, projection.projection, max_time_ms=admission.remaining_ms()
+    ).to_list(length=page_size)
+    by_id = {doc["_id"]: doc for doc in documents}
+
+    has_more = offset + page_size < len(ordered_ids)
+    return VehicleListResponse(
+        items=[serialize_item(by_id[vehicle_id], projection) for vehicle_id in page_ids if vehicle_id in by_id],
+        total=len(ordered_ids) if complete else None,
+        next_cursor=offset_cursor(offset + page_size) if has_more else None,
+        has_more=has_more,
+    )
+
+
+async def search_candidates(
+    db: AsyncIOMotorDatabase, q: str, query: Dict[str, Any]
+) -> Tuple[List[ObjectId], bool]:
+    """Ids matching ``q`` and the filters, by relevance, and whether that list is complete."""
+    if not query:
+        result = await search_service.search(db, q)
+        return [vehicle_id for vehicle_id, _ in result.ranked], result.complete
+
+    # Filtro seletivo: a busca corre so entre os veiculos filtrados, sem perder quem esta fora
+    # dos primeiros postings de cada termo (ranking e total exatos)
+    limit = search_service.FILTERED_CANDIDATES
+    filtered = await catalog(db).find(query, {"_id": 1}, max_time_ms=admission.remaining_ms()).limit(
+        limit + 1
+    ).to_list(length=limit + 1)
+    if len(filtered) <= limit:
+        result = await search_service.search(db, q, within=[doc["_id"] for doc in filtered])
+        return [vehicle_id for vehicle_id, _ in result.ranked], result.complete
+
+    # Filtro amplo: os melhores candidatos da busca sao filtrados depois (total vira limite inferior)
+    result = await search_service.search(db, q)
+    if not result.ranked:
+        return [], result.complete
+    matching = await catalog(db).find(
+        merge_filters(query, {"_id": {"$in": [vehicle_id for vehicle_id, _ in result.ranked]}}),
+        {"_id": 1},
+        max_time_ms=admission.remaining_ms(),
+    ).to_list(length=None)
+    matching_ids = {doc["_id"] for doc in matching}
+    return [vehicle_id for vehicle_id, _ in result.ranked if vehicle_id in matching_ids], result.complete
 
 
 def build_filters(
     *,
-    q: str | None,
     brand: str | None,
     color: str | None,
     doors: int | None,
@@ -59,20 +215,19 @@ def build_filters(
     min_price: float | None,
     max_price: float | None,
 ) -> Dict[str, Any]:
+    # O parametro q nao vira filtro aqui: ele e resolvido pelo indice de busca (search_service).
+    # Marca e cor casam o valor inteiro e localizacao o inicio ("belo" -> "Belo Horizonte - MG"),
+    # sempre sem acentos/maiusculas, sobre os campos *_norm dos indices compostos
     clauses: List[Dict[str, Any]] = []
 
-    if q:
-        regex = {"$regex": q, "$options": "i"}
-        clauses.append({"$or": [{"title": regex}, {"description": regex}, {"brand": regex}, {"model": regex}]})
+    if fold_text(brand):
+        clauses.append({"brand_norm": fold_text(brand)})
 
-    if brand:
-        clauses.append({"brand": {"$regex": brand, "$options": "i"}})
+    if fold_text(color):
+        clauses.append({"color_norm": fold_text(color)})
 
-    if color:
-        clauses.append({"color": {"$regex": color, "$options": "i"}})
-
-    if location:
-        clauses.append({"location": {"$regex": location, "$options": "i"}})
+    if fold_text(location):
+        clauses.append({"location_norm": {"$regex": f"^{re.escape(fold_text(location))}"}})
 
     if doors is not None:
         clauses.append({"doors": int(doors)})
@@ -85,6 +240,86 @@ def build_filters(
     if price_range:
         clauses.append({"price": price_range})
 
+    return merge_filters(*clauses)
+
+
+async def get_facets(
+    db: AsyncIOMotorDatabase,
+    *,
+    q: str | None = None,
+    brand: str | None = None,
+    color: str | None = None,
+    doors: int | None = None,
+    location: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+) -> VehicleFacets:
+    selected = {
+        field: value
+        for field, value in (("brand", brand), ("color", color), ("doors", doors), ("location", location))
+        if value is not None and value != ""
+    }
+    # Sem filtro ou com um unico filtro de faceta os contadores respondem sem tocar em vehicles
+    # (localizacao filtra por prefixo e os contadores guardam o valor inteiro: vai para a agregacao)
+    searching = search_service.has_terms(q)
+    if not searching and min_price is None and max_price is None and len(selected) <= 1 and "location" not in selected:
+        field, value = next(iter(selected.items()), (None, None))
+        return await facet_service.counter_facets(db, facet_service.scope_for(field, value))
+
+    query = build_filters(
+        brand=brand,
+        color=color,
+        doors=doors,
+        location=location,
+        min_price=min_price,
+        max_price=max_price,
+    )
+    if searching:
+        ordered_ids, _ = await search_candidates(db, q, query)
+        query = merge_filters(query, {"_id": {"$in": ordered_ids}})
+    return await facet_service.aggregate_facets(db, query)
+
+
+def catalog(db: AsyncIOMotorDatabase) -> AsyncIOMotorCollection:
+    """``vehicles`` for anonymous catalog reads, routed by CATALOG_READ_PREFERENCE (may lag the primary)."""
+    preference = catalog_read_preference()
+    if preference == Primary():
+        return db.vehicles
+    return db.vehicles.with_options(read_preference=preference)
+
+
+def normalized_fields(document: Dict[str, Any]) -> Dict[str, str]:
+    """Shadow ``*_norm`` values for the text fields present in ``document``."""
+    return {
+        target: fold_text(document[source]) if isinstance(document[source], str) else ""
+        for source, target in NORMALIZED_FIELDS.items()
+        if source in document
+    }
+
+
+async def backfill_normalized_fields(db: AsyncIOMotorDatabase, *, batch_size: int = 1000) -> int:
+    """Fill or fix the ``*_norm`` fields of existing vehicles; returns how many changed."""
+    projection = {field: 1 for pair in NORMALIZED_FIELDS.items() for field in pair}
+    operations: List[UpdateOne] = []
+    changed = 0
+    async for vehicle in db.vehicles.find({}, projection).batch_size(batch_size):
+        expected = normalized_fields({source: vehicle.get(source) for source in NORMALIZED_FIELDS})
+        if any(vehicle.get(target) != value for target, value in expected.items()):
+            operations.append(UpdateOne({"_id": vehicle["_id"]}, {"$set": expected}))
+        if len(operations) >= batch_size:
+            await db.vehicles.bulk_write(operations, ordered=False)
+            changed += len(operations)
+            operations = []
+    if operations:
+        await db.vehicles.bulk_write(operations, ordered=False)
+        changed += len(operations)
+    if changed:
+        vehicle_cache.clear()
+    return changed
+
+
+def merge_filters(*filters: Dict[str, Any]) -> Dict[str, Any]:
+    clauses = [item for item in filters if item]
     if not clauses:
         return {}
     if len(clauses) == 1:
@@ -95,22 +330,119 @@ def build_filters(
 async def get_vehicle(db: AsyncIOMotorDatabase, vehicle_id: str) -> VehiclePublic:
     if not ObjectId.is_valid(vehicle_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador inv?lido")
-    raw = await db.vehicles.find_one({"_id": ObjectId(vehicle_id)})
+    return await vehicle_cache.details.get_or_load(str(ObjectId(vehicle_id)), lambda: load_vehicle(db, vehicle_id))
+
+
+async def load_vehicle(db: AsyncIOMotorDatabase, vehicle_id: str) -> VehiclePublic:
+    raw = await catalog(db).find_one({"_id": ObjectId(vehicle_id)}, max_time_ms=admission.remaining_ms())
     if not raw:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ve?culo n?o encontrado")
     return serialize_vehicle(raw)
 
 
+ItemVersion = Tuple[str, Any, int]
+
+
+def item_version(vehicle_id: str, updated_at: Any, favorite_count: int | None) -> ItemVersion:
+    # favorite_count muda sem mexer em updated_at (favorite_service), entao entra na versao
+    return (vehicle_id, updated_at, favorite_count or 0)
+
+
+def item_versions(items: List[MongoBaseModel]) -> List[ItemVersion]:
+    """Version of each item, from the same rows as the response body (no extra query)."""
+    return [
+        item_version(item.id, item.updated_at, item.favorite_count)
+        if isinstance(item, VehiclePublic)
+        else item_version(item.id, *item._version)
+        for item in items
+    ]
+
+
+def list_validators(response: VehicleListResponse) -> Validators:
+    versions = item_versions(response.items)
+    return Validators(make_etag("list", versions, response.total, response.next_cursor, response.has_more))
+
+
+def recommendation_validators(items: List[MongoBaseModel]) -> Validators:
+    return Validators(make_etag("recommendations", item_versions(items)))
+
+
+def vehicle_validators(vehicle: VehiclePublic) -> Validators:
+    version = item_version(vehicle.id, vehicle.updated_at, vehicle.favorite_count)
+    return Validators(make_etag("vehicle", version), vehicle.updated_at)
+
+
+async def current_vehicle_validators(db: AsyncIOMotorDatabase, vehicle_id: str) -> Validators | None:
+    """Validators of a vehicle from the cache or one projected read, without loading the document."""
+    if not ObjectId.is_valid(vehicle_id):
+        return None
+    cached = vehicle_cache.details.get(str(ObjectId(vehicle_id)))
+    if cached is not None:
+        return vehicle_validators(cached)
+    document = await catalog(db).find_one(
+        {"_id": ObjectId(vehicle_id)}, {"updated_at": 1, "favorite_count": 1}, max_time_ms=admission.remaining_ms()
+    )
+    if document is None:
+        return None
+    version = item_version(str(document["_id"]), document.get("updated_at"), document.get("favorite_count"))
+    return Validators(make_etag("vehicle", version), document.get("updated_at"))
+
+
+async def get_vehicles(
+    db: AsyncIOMotorDatabase,
+    ids: List[str],
+    *,
+    view: ViewName = "full",
+    fields: str | None = None,
+) -> VehicleBatchResponse:
+    """Fetch several vehicles with one ``$in`` query, in the requested order."""
+    if not all(ObjectId.is_valid(vehicle_id) for vehicle_id in ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador invalido")
+    requested = list(dict.fromkeys(str(ObjectId(vehicle_id)) for vehicle_id in ids))
+    if len(requested) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximo de {MAX_BATCH_IDS} ids por requisicao",
+        )
+    projection = vehicle_views.resolve_view(view, fields)
+
+    found: Dict[str, MongoBaseModel] = {}
+    if projection is vehicle_views.FULL:
+        # Detalhes ja em cache (GET /vehicles/{id}) nao voltam ao banco
+        for vehicle_id in requested:
+            cached = vehicle_cache.details.get(vehicle_id)
+            if cached is not None:
+                found[vehicle_id] = cached
+
+    pending = [ObjectId(vehicle_id) for vehicle_id in requested if vehicle_id not in found]
+    if pending:
+        documents = await catalog(db).find(
+            {"_id": {"$in": pending}}, projection.projection, max_time_ms=admission.remaining_ms()
+        ).to_list(length=len(pending))
+        for document in documents:
+            found[str(document["_id"])] = serialize_item(document, projection)
+
+    return VehicleBatchResponse(
+        items=[found[vehicle_id] for vehicle_id in requested if vehicle_id in found],
+        missing=[vehicle_id for vehicle_id in requested if vehicle_id not in found],
+    )
+
+
 async def create_vehicle(db: AsyncIOMotorDatabase, payload: VehicleCreate, *, owner_id: str | None) -> VehiclePublic:
-    now = datetime.now(timezone.utc)
+    now = utc_now()
     document = payload.model_dump(exclude_none=True)
     seller_id = owner_id or payload.seller_id
     if seller_id and ObjectId.is_valid(seller_id):
         document["seller_id"] = ObjectId(seller_id)
-    document.update({"created_at": now, "updated_at": now})
+    document.update({"created_at": now, "updated_at": now, "favorite_count": 0, **normalized_fields(document)})
 
     result = await db.vehicles.insert_one(document)
-    stored = await db.vehicles.find_one({"_id": result.inserted_id})
+    # O documento inserido ja e o estado no banco: nada de reler
+    stored = {**document, "_id": result.inserted_id}
+    await search_service.index_vehicle(db, stored)
+    await facet_service.update_counters(db, None, stored)
+    recommendation_index.upsert(stored)
+    vehicle_cache.invalidate_vehicle(None, stored)
     return serialize_vehicle(stored)
 
 
@@ -118,32 +450,107 @@ async def update_vehicle(
     db: AsyncIOMotorDatabase,
     vehicle_id: str,
     payload: VehicleUpdate,
+    *,
+    actor: UserInDB,
 ) -> VehiclePublic:
     if not ObjectId.is_valid(vehicle_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador inv?lido")
 
     update_data = payload.model_dump(exclude_none=True)
     if not update_data:
-        return await get_vehicle(db, vehicle_id)
+        vehicle = await get_vehicle(db, vehicle_id)
+        ensure_can_edit(vehicle.seller_id, actor)
+        return vehicle
 
-    update_data["updated_at"] = datetime.now(timezone.utc)
+    update_data.update(normalized_fields(update_data))
+    update_data["updated_at"] = utc_now()
 
-    result = await db.vehicles.find_one_and_update(
-        {"_id": ObjectId(vehicle_id)},
+    # A permissao vai no proprio filtro; o documento anterior da o delta dos contadores de faceta
+    before = await db.vehicles.find_one_and_update(
+        {"_id": ObjectId(vehicle_id), **seller_filter(actor)},
         {"$set": update_data},
-        return_document=ReturnDocument.AFTER,
+        return_document=ReturnDocument.BEFORE,
     )
-    if not result:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ve?culo n?o encontrado")
+    if not before:
+        await explain_write_miss(db, vehicle_id, actor)
+    result = {**before, **update_data}
+    if update_data.keys() & search_service.SEARCH_FIELDS.keys():
+        await search_service.reindex_vehicle(db, result)
+    if update_data.keys() & {*facet_service.FACET_FIELDS, "price"}:
+        await facet_service.update_counters(db, before, result)
+    if update_data.keys() & set(recommendation_index.FEATURE_FIELDS):
+        recommendation_index.upsert(result)
+    vehicle_cache.invalidate_vehicle(before, result)
     return serialize_vehicle(result)
 
 
-async def delete_vehicle(db: AsyncIOMotorDatabase, vehicle_id: str) -> None:
+async def delete_vehicle(db: AsyncIOMotorDatabase, vehicle_id: str, *, actor: UserInDB) -> None:
     if not ObjectId.is_valid(vehicle_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador inv?lido")
-    delete_result = await db.vehicles.delete_one({"_id": ObjectId(vehicle_id)})
-    if delete_result.deleted_count == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ve?culo n?o encontrado")
+    deleted = await db.vehicles.find_one_and_delete({"_id": ObjectId(vehicle_id), **seller_filter(actor)})
+    if not deleted:
+        await explain_write_miss(db, vehicle_id, actor)
+    await search_service.unindex_vehicle(db, deleted["_id"])
+    await facet_service.update_counters(db, deleted, None)
+    recommendation_index.remove(deleted["_id"])
+    vehicle_cache.invalidate_vehicle(deleted, None)
+
+
+async def add_vehicle_image(
+    db: AsyncIOMotorDatabase,
+    vehicle_id: str,
+    upload: UploadFile,
+    *,
+    actor: UserInDB,
+) -> VehiclePublic:
+    if not ObjectId.is_valid(vehicle_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador inv?lido")
+    # Permissao conferida antes de gastar CPU com o redimensionamento; a escrita filtra de novo
+    vehicle = await db.vehicles.find_one({"_id": ObjectId(vehicle_id)}, {"seller_id": 1})
+    if not vehicle:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Veiculo nao encontrado")
+    ensure_can_edit(vehicle.get("seller_id"), actor)
+
+    entry = await media_service.store_image(await media_service.read_upload(upload))
+    # $addToSet: reenviar a mesma foto (mesmo hash, mesma entrada) nao duplica
+    after = await db.vehicles.find_one_and_update(
+        {"_id": ObjectId(vehicle_id), **seller_filter(actor)},
+        {"$addToSet": {"media": entry}, "$set": {"updated_at": utc_now()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not after:
+        await explain_write_miss(db, vehicle_id, actor)
+    vehicle_cache.invalidate_vehicle(None, after)
+    return serialize_vehicle(after)
+
+
+def seller_filter(user: UserInDB) -> Dict[str, Any]:
+    """Extra write condition: admins edit anything, others only their own or unowned vehicles."""
+    if "admin" in user.roles:
+        return {}
+    owners: List[Any] = [None]
+    if user.id:
+        owners.append(str(user.id))
+        if ObjectId.is_valid(str(user.id)):
+            owners.append(ObjectId(str(user.id)))
+    return {"seller_id": {"$in": owners}}
+
+
+def ensure_can_edit(seller_id: Any, user: UserInDB) -> None:
+    if seller_id is None or "admin" in user.roles:
+        return
+    if not user.id or str(seller_id) != str(user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Sem permissao")
+
+
+async def explain_write_miss(db: AsyncIOMotorDatabase, vehicle_id: str, user: UserInDB) -> None:
+    """A filtered write matched nothing: tell 404 (no vehicle) from 403 (not the owner)."""
+    vehicle = await db.vehicles.find_one({"_id": ObjectId(vehicle_id)}, {"seller_id": 1})
+    if not vehicle:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Veiculo nao encontrado")
+    ensure_can_edit(vehicle.get("seller_id"), user)
+    # Dono confirmado agora: o veiculo mudou de dono ou foi recriado entre as duas leituras
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Veiculo alterado durante a operacao")
 
 
 async def get_recommendations(
@@ -151,30 +558,71 @@ async def get_recommendations(
     vehicle_id: str,
     *,
     limit: int = 6,
-) -> List[VehiclePublic]:
+    view: ViewName = "full",
+    fields: str | None = None,
+) -> List[MongoBaseModel]:
     if not ObjectId.is_valid(vehicle_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identificador inv?lido")
+    projection = vehicle_views.resolve_view(view, fields)
+
+    tags: set[str] = set()
 
-    base = await db.vehicles.find_one({"_id": ObjectId(vehicle_id)})
+    async def load() -> List[MongoBaseModel]:
+        items, used_tags = await load_recommendations(db, vehicle_id, limit=limit, projection=projection)
+        tags.update(used_tags)
+        return items
+
+    return await vehicle_cache.recommendations.get_or_load(
+        (str(ObjectId(vehicle_id)), limit, projection.key),
+        load,
+        tags=lambda _: tags,
+    )
+
+
+async def load_recommendations(
+    db: AsyncIOMotorDatabase,
+    vehicle_id: str,
+    *,
+    limit: int,
+    projection: VehicleProjection = vehicle_views.FULL,
+) -> tuple[List[MongoBaseModel], set[str]]:
+    """Compute recommendations and the cache tags that invalidate them."""
+    neighbours = recommendation_index.nearest(ObjectId(vehicle_id), limit)
+    if neighbours is not None:
+        documents = await catalog(db).find(
+            {"_id": {"$in": neighbours}}, projection.projection, max_time_ms=admission.remaining_ms()
+        ).to_list(length=limit)
+        by_id = {doc["_id"]: doc for doc in documents}
+        items = [serialize_item(by_id[neighbour], projection) for neighbour in neighbours if neighbour in by_id]
+        return items, {vehicle_id, vehicle_cache.INDEX_TAG, *vehicle_cache.item_tags(items)}
+
+    # Indice ainda carregando (ou veiculo criado em outro worker): regra por marca e preco
+    base = await catalog(db).find_one(
+        {"_id": ObjectId(vehicle_id)}, {"brand": 1, "price": 1}, max_time_ms=admission.remaining_ms()
+    )
     if not base:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ve?culo n?o encontrado")
 
+    tags: set[str] = set()
     query: Dict[str, Any] = {"_id": {"$ne": base["_id"]}}
     brand = base.get("brand")
-    if brand:
-        query["brand"] = brand
+    if fold_text(brand):
+        query["brand_norm"] = fold_text(brand)
 
     price = base.get("price")
     if isinstance(price, (int, float)):
         margin = max(price * 0.2, 5000)
         query["price"] = {"$gte": max(price - margin, 0), "$lte": price + margin}
 
-    cursor = db.vehicles.find(query).sort([("updated_at", -1)])
+    cursor = catalog(db).find(query, projection.projection, max_time_ms=admission.remaining_ms()).sort(
+        [("updated_at", -1)]
+    )
     documents = await cursor.to_list(length=limit)
 
     if len(documents) < limit:
         fallback_cursor = (
-            db.vehicles.find({"_id": {"$ne": base["_id"]}})
+            catalog(db)
+            .find({"_id": {"$ne": base["_id"]}}, projection.projection, max_time_ms=admission.remaining_ms())
             .sort([("updated_at", -1)])
             .limit(limit)
         )
@@ -182,8 +630,11 @@ async def get_recommendations(
         ids = {doc["_id"] for doc in documents}
         documents.extend([doc for doc in fallback_docs if doc["_id"] not in ids])
         documents = documents[:limit]
+        tags.add(vehicle_cache.FALLBACK_TAG)
 
-    return [serialize_vehicle(doc) for doc in documents]
+    items = [serialize_item(doc, projection) for doc in documents]
+    tags.update([str(base["_id"]), vehicle_cache.brand_tag(brand), *vehicle_cache.item_tags(items)])
+    return items, tags
 
 
 def serialize_vehicle(document: dict | None) -> VehiclePublic:
@@ -194,3 +645,10 @@ def serialize_vehicle(document: dict | None) -> VehiclePublic:
     if seller_id:
         data["seller_id"] = str(seller_id)
     return VehiclePublic.model_validate(data)
+
+
+def serialize_item(document: dict, projection: VehicleProjection) -> MongoBaseModel:
+    """Serialize a list item read with ``projection``."""
+    if projection is vehicle_views.FULL:
+        return serialize_vehicle(document)
+    return vehicle_views.serialize_projected(document, projection)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import create_model
+
+from ..models.vehicle import VehicleFieldset, VehiclePublic, VehicleSummary
+from ..utils.object_id import MongoBaseModel, object_id_to_str
+
+# Representacoes dos veiculos em listas: "full" (documento completo), "summary"
+# (campos do card, padrao das listas) ou um conjunto explicito via ?fields=.
+# A projecao e enviada ao Mongo, entao campos nao pedidos nem saem do banco.
+
+ViewName = Literal["summary", "full"]
+
+PUBLIC_FIELDS: Tuple[str, ...] = tuple(VehiclePublic.model_fields)
+SUMMARY_FIELDS: Tuple[str, ...] = tuple(name for name in VehicleSummary.model_fields if name not in ("id", "thumbnail"))
+# Lidos em toda projecao, mesmo fora da view: a versao de cada item (ETag) sai das mesmas linhas do corpo
+VERSION_PROJECTION: Dict[str, int] = {"updated_at": 1, "favorite_count": 1}
+
+
+@dataclass(frozen=True)
+class VehicleProjection:
+    key: str
+    projection: Dict[str, Any] | None
+    model: Type[MongoBaseModel]
+
+    def project_stage(self) -> Dict[str, Any]:
+        """The projection as a ``$project`` stage (aggregations need the array form of ``$slice``)."""
+        stage: Dict[str, Any] = {}
+        for name, value in (self.projection or {}).items():
+            if isinstance(value, dict) and "$slice" in value:
+                value = {"$slice": [f"${name}", value["$slice"]]}
+            stage[name] = value
+        return {"$project": stage}
+
+    def embedded_stages(self, prefix: str, keep: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """Stages projecting the embedded ``prefix`` document (e.g. a joined vehicle) plus ``keep``."""
+        # $slice vira $addFields antes do $project de inclusao: expressoes em caminhos com ponto
+        # dentro do $project nao sao aceitas do mesmo jeito por todas as versoes do servidor
+        slices = {
+            f"{prefix}.{name}": {"$slice": [f"${prefix}.{name}", value["$slice"]]}
+            for name, value in (self.projection or {}).items()
+            if isinstance(value, dict) and "$slice" in value
+        }
+        # Subcampos projetados nao trazem o _id embutido por padrao
+        included = {f"{prefix}.{name}": 1 for name in dict.fromkeys(("_id", *(self.projection or {})))}
+        stages: List[Dict[str, Any]] = [{"$addFields": slices}] if slices else []
+        return [*stages, {"$project": {**included, **{name: 1 for name in keep}}}]
+
+
+FULL = VehicleProjection("full", None, VehiclePublic)
+SUMMARY = VehicleProjection(
+    "summary",
+    # Miniatura do card: variante "card" da primeira foto enviada, senao a primeira URL externa
+    {**{name: 1 for name in SUMMARY_FIELDS}, **VERSION_PROJECTION, "images": {"$slice": 1}, "media": {"$slice": 1}},
+    VehicleSummary,
+)
+
+
+def resolve_view(view: ViewName = "full", fields: str | None = None) -> VehicleProjection:
+    """Pick the representation of a list request; ``fields`` wins over ``view``."""
+    if fields is not None:
+        return fieldset_projection(parse_fields(fields))
+    return SUMMARY if view == "summary" else FULL
+
+
+def parse_fields(fields: str) -> Tuple[str, ...]:
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(PUBLIC_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos invalidos: {', '.join(unknown)}",
+        )
+    # Ordem canonica: ?fields=price,title e ?fields=title,price compartilham modelo e cache
+    return tuple(name for name in PUBLIC_FIELDS if name in requested or name == "id")
+
+
+@lru_cache(maxsize=256)
+def fieldset_projection(fields: Tuple[str, ...]) -> VehicleProjection:
+    projection: Dict[str, Any] = {"_id": 1, **{name: 1 for name in fields if name != "id"}, **VERSION_PROJECTION}
+    definitions: Dict[str, Any] = {
+        name: (Optional[VehiclePublic.model_fields[name].annotation], None) for name in fields if name != "id"
+    }
+    model = create_model("VehicleFields", __base__=VehicleFieldset, **definitions)
+    return VehicleProjection(f"fields={','.join(fields)}", projection, model)
+
+
+def serialize_projected(document: Dict[str, Any], view: VehicleProjection) -> MongoBaseModel:
+    """Validate a document read with ``view.projection`` (not used for the full view)."""
+    data = object_id_to_str(document)
+    if view.model is VehicleSummary:
+        images = data.pop("images", None) or []
+        media = data.pop("media", None) or []
+        data["thumbnail"] = media[0]["card"] if media else images[0] if images else None
+    seller_id = data.get("seller_id")
+    if seller_id:
+        data["seller_id"] = str(seller_id)
+    item = view.model.model_validate(data)
+    # Campos de versao fora da view sao descartados pelo modelo, mas ficam guardados no item
+    item._version = (document.get("updated_at"), document.get("favorite_count") or 0)
+    return item
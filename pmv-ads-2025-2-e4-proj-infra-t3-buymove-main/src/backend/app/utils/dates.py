@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+
+def utc_now() -> datetime:
+    """Current UTC time exactly as MongoDB stores and returns it (naive, millisecond precision).
+
+    Respostas montadas a partir do documento recem-inserido ficam identicas a uma leitura posterior.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, NamedTuple
+
+from fastapi import Request, Response, status
+
+from ..core import encoding
+from ..core.config import settings
+
+# GET condicional: ETag (sempre fraco, o corpo pode variar na compressao/serializacao)
+# e Last-Modified quando existe uma data que cobre a resposta inteira (detalhe do veiculo).
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: datetime | None = None
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def representation_etag(etag: str) -> str:
+    # JSON e MessagePack da mesma versao sao representacoes diferentes (Vary: Accept)
+    fmt = encoding.current_format()
+    return etag if fmt == "json" else f'{etag[:-1]}-{fmt}"'
+
+
+def http_date(value: datetime) -> str:
+    # Datas do banco sao UTC sem fuso (utc_now)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """RFC 9110: If-None-Match (weak comparison) wins over If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or representation_etag(validators.etag).removeprefix("W/") in candidates
+    since = parse_http_date(request.headers.get("if-modified-since"))
+    if since is None or validators.last_modified is None:
+        return False
+    return validators.last_modified.replace(microsecond=0) <= since
+
+
+def cache_headers(validators: Validators) -> Dict[str, str]:
+    headers = {
+        "ETag": representation_etag(validators.etag),
+        # max-age 0 (padrao): o cliente guarda a resposta mas revalida a cada uso (304 sem corpo)
+        "Cache-Control": f"public, max-age={settings.http_cache_max_age_seconds}, must-revalidate",
+    }
+    if validators.last_modified is not None:
+        headers["Last-Modified"] = http_date(validators.last_modified)
+    return headers
+
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(validators))
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Serialize a keyset position into an opaque, URL-safe token."""
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, ValueError, UnicodeError) as exc:
+        raise invalid_cursor() from exc
+    if not isinstance(payload, dict):
+        raise invalid_cursor()
+    return payload
+
+
+def datetime_to_millis(value: datetime) -> int:
+    # O Mongo guarda datas em UTC com precisao de milissegundos (datas "naive" ja estao em UTC)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(milliseconds=1)
+
+
+def millis_to_datetime(value: int) -> datetime:
+    return _EPOCH + timedelta(milliseconds=value)
+
+
+def keyset_cursor(document: Dict[str, Any], field: str) -> str:
+    """Build the cursor pointing right after ``document`` for a ``(field, _id)`` descending sort."""
+    value = document.get(field)
+    if isinstance(value, datetime):
+        value = datetime_to_millis(value)
+    return encode_cursor({"k": field, "v": value, "i": str(document["_id"])})
+
+
+def keyset_filter(cursor: str, field: str) -> Dict[str, Any]:
+    """Translate a cursor into the filter selecting documents after it in ``(field, _id)`` descending order."""
+    payload = decode_cursor(cursor)
+    if payload.get("k") != field or not ObjectId.is_valid(payload.get("i")):
+        raise invalid_cursor()
+
+    value = payload.get("v")
+    if field.endswith("_at"):
+        if not isinstance(value, int):
+            raise invalid_cursor()
+        value = millis_to_datetime(value)
+
+    last_id = ObjectId(payload["i"])
+    return {
+        "$or": [
+            {field: {"$lt": value}},
+            {field: value, "_id": {"$lt": last_id}},
+        ]
+    }
+
+
+def offset_cursor(offset: int) -> str:
+    """Cursor for result sets that are ranked in memory (e.g. search relevance)."""
+    return encode_cursor({"k": "offset", "o": offset})
+
+
+def cursor_offset(cursor: str) -> int:
+    payload = decode_cursor(cursor)
+    offset = payload.get("o")
+    if payload.get("k") != "offset" or not isinstance(offset, int) or offset < 0:
+        raise invalid_cursor()
+    return offset
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor invalido")
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Mapping, Tuple
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from ..core import encoding
+from ..core.config import settings
+
+
+@lru_cache(maxsize=None)
+def type_adapter(annotation: Any) -> TypeAdapter[Any]:
+    """Precompiled (and cached) pydantic adapter for a response type."""
+    return TypeAdapter(annotation)
+
+
+class EncodedBodies:
+    """
+    Encoded (and compressed) bodies of recently served objects, keyed by identity.
+
+    Cached reads (vehicle_cache) hand out the same model instance until invalidated,
+    so repeated hits reuse the bytes instead of serializing and compressing again.
+    Entries keep a reference to the object, which makes the identity check safe.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str, str], Tuple[Any, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, value: Any, key: Tuple[str, str]) -> Tuple[bytes, str] | None:
+        with self._lock:
+            entry = self._entries.get((id(value), *key))
+            if entry is None or entry[0] is not value:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((id(value), *key))
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, value: Any, key: Tuple[str, str], body: bytes, content_encoding: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(id(value), *key)] = (value, body, content_encoding)
+            self._entries.move_to_end((id(value), *key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        return {"name": "encoded_bodies", "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+encoded_bodies = EncodedBodies(settings.encoded_body_cache_entries)
+
+
+def encode_body(value: Any, annotation: Any) -> Tuple[bytes, str]:
+    """Body of ``value`` in the negotiated format, pre-compressed when large enough."""
+    key = (encoding.current_format(), encoding.current_encoding())
+    cached = encoded_bodies.get(value, key)
+    if cached is not None:
+        return cached
+
+    adapter = type_adapter(annotation)
+    if key[0] == "msgpack":
+        body = encoding.pack(adapter.dump_python(value, mode="json", by_alias=True))
+    else:
+        body = adapter.dump_json(value, by_alias=True)
+    if key[1] == "identity" or len(body) < settings.compression_minimum_size:
+        return body, "identity"
+    # Somente corpos grandes o bastante para comprimir entram no cache (os pequenos custam pouco)
+    compressed = encoding.compress(body, key[1])
+    encoded_bodies.set(value, key, compressed, key[1])
+    return compressed, key[1]
+
+
+def json_response(
+    value: Any,
+    annotation: Any,
+    *,
+    status_code: int = 200,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """
+    Serialize already validated models straight to bytes (JSON or the negotiated MessagePack).
+
+    Returning a Response makes FastAPI skip the response_model round trip
+    (dump -> validate -> serialize); response_model stays on the route only for
+    the OpenAPI docs. The bytes match what FastAPI would send for the same value.
+    """
+    body, content_encoding = encode_body(value, annotation)
+    response = Response(content=body, status_code=status_code, headers=headers, media_type=encoding.media_type())
+    if content_encoding != "identity":
+        response.headers["Content-Encoding"] = content_encoding
+    return response
+
+
+class NegotiatedResponse(JSONResponse):
+    """Default response class: JSON, or MessagePack when the request asked for it."""
+
+    def __init__(self, content: Any, *args: Any, **kwargs: Any) -> None:
+        self.media_type = encoding.media_type()
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == encoding.MEDIA_TYPES["msgpack"]:
+            return encoding.pack(content)
+        return super().render(content)
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Palavras muito frequentes em anuncios que nao ajudam a ranquear resultados
+STOPWORDS = frozenset(
+    {
+        "a", "ao", "as", "com", "da", "das", "de", "do", "dos", "e", "em", "na", "nas",
+        "no", "nos", "o", "os", "ou", "para", "por", "sem", "um", "uma",
+    }
+)
+
+
+def fold_text(value: str | None) -> str:
+    """Lowercase, strip accents and trim (``"Citroën "`` -> ``"citroen"``)."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def tokenize(value: str | None) -> List[str]:
+    """Split text into folded search terms, dropping stopwords."""
+    return [
+        token
+        for token in _TOKEN_RE.findall(fold_text(value))
+        if token not in STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
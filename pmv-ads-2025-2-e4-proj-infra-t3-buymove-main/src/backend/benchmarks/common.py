@@ -0,0 +1,78 @@
+"""Utilitarios compartilhados pelos benchmarks (python -m benchmarks.<nome>)."""
+
+from __future__ import annotations
+
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core import admission
+from app.core.config import settings
+from app.core.database import get_database
+from app.main import app
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summarize(latencies: Iterable[float], *, elapsed: float | None = None) -> Dict[str, Any]:
+    """Latency summary in milliseconds (and throughput when ``elapsed`` is given)."""
+    values = [value * 1000 for value in latencies]
+    summary: Dict[str, Any] = {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(max(values), 3) if values else 0.0,
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(values) / elapsed, 2)
+    return summary
+
+
+def open_database(memory: bool) -> AsyncIOMotorDatabase:
+    """Configured MongoDB, or an in-memory stand-in (mongomock-motor) when ``memory`` is set."""
+    if not memory:
+        return get_database()
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError as exc:  # pragma: no cover - depende do ambiente
+        raise SystemExit(
+            'Instale as dependencias dos benchmarks para usar --memory (pip install -e ".[bench]")'
+        ) from exc
+    return AsyncMongoMockClient()["buymove_bench"]
+
+
+@asynccontextmanager
+async def app_client(db: AsyncIOMotorDatabase, base_url: str | None = None) -> AsyncIterator[httpx.AsyncClient]:
+    """HTTP client against a running server (``base_url``) or the app in-process on the same event loop."""
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            yield client
+        return
+
+    app.state.db = db
+    # Todas as sessoes em processo chegam do mesmo endereco: o rate limit por IP mediria so os 429
+    settings.rate_limits = ""
+    admission.rate_limits.cache_clear()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+        yield client
+
+
+class Timer:
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.elapsed = time.perf_counter() - self.started
@@ -0,0 +1,305 @@
+"""Gerador de massa de dados realista para benchmarks (veiculos, usuarios e favoritos).
+
+Escalas prontas: 10k, 100k e 1M veiculos (com 1 usuario para cada 5 veiculos e
+~5 favoritos por usuario, concentrados nos anuncios populares). Os atributos
+sao deterministicos para a mesma --seed (os ObjectIds nao). favorite_count ja
+sai calculado; depois da carga o indice de busca e as facetas sao recriados:
+
+    python -m benchmarks.dataset --scale 100k --drop
+    python -m benchmarks.dataset --scale 10k --memory   # so mede a geracao
+
+Todos os usuarios usam a senha PASSWORD e o e-mail de user_email(n).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core import indexes
+from app.core.security import hash_password
+from app.services import co_favorite_service, facet_service, search_service
+from app.services.vehicle_service import normalized_fields
+from app.utils.dates import utc_now
+
+from .common import Timer, open_database
+
+PASSWORD = "benchmark-password"
+EMAIL_DOMAIN = "bench.buymove.dev"
+COLLECTIONS = ("users", "vehicles", "favorites", "favorite_removals", "favorite_pairs", "vehicle_co_favorites")
+
+
+@dataclass(frozen=True)
+class Scale:
+    vehicles: int
+    users: int
+    favorites_per_user: float
+
+
+SCALES: Dict[str, Scale] = {
+    "1k": Scale(1_000, 200, 5.0),
+    "10k": Scale(10_000, 2_000, 5.0),
+    "100k": Scale(100_000, 20_000, 5.0),
+    "1M": Scale(1_000_000, 200_000, 5.0),
+}
+
+# marca -> [(modelo, versoes, preco de um 0 km, portas)]
+CATALOG: Dict[str, List[Tuple[str, List[str], float, int]]] = {
+    "Fiat": [("Argo", ["1.0 Drive", "1.3 Trekking"], 95000, 4), ("Mobi", ["1.0 Like"], 72000, 4),
+             ("Toro", ["1.3 Turbo Volcano", "2.0 Diesel Ranch"], 170000, 4), ("Uno", ["1.0 Way"], 60000, 2)],
+    "Volkswagen": [("Gol", ["1.0 MPI", "1.6 MSI"], 75000, 4), ("Polo", ["1.0 TSI Highline", "GTS"], 110000, 4),
+                   ("T-Cross", ["200 TSI", "Highline"], 150000, 4), ("Amarok", ["V6 Extreme"], 300000, 4)],
+    "Chevrolet": [("Onix", ["1.0 LT", "1.0 Turbo Premier"], 95000, 4), ("Tracker", ["1.2 Turbo LTZ"], 145000, 4),
+                  ("S10", ["2.8 High Country"], 270000, 4), ("Spin", ["1.8 Premier"], 125000, 4)],
+    "Toyota": [("Corolla", ["2.0 Altis", "2.0 XEi", "Hybrid"], 160000, 4), ("Yaris", ["1.5 XLS"], 105000, 4),
+               ("Hilux", ["2.8 SRX"], 320000, 4), ("Corolla Cross", ["XRE", "Hybrid"], 185000, 4)],
+    "Honda": [("Civic", ["1.5 Touring", "2.0 EXL"], 180000, 4), ("City", ["1.5 EXL"], 120000, 4),
+              ("HR-V", ["1.5 Turbo Touring", "EXL"], 170000, 4), ("Fit", ["1.5 EX"], 90000, 4)],
+    "Hyundai": [("HB20", ["1.0 Sense", "1.0 Turbo Platinum"], 90000, 4), ("Creta", ["1.0 Turbo Limited"], 150000, 4),
+                ("Tucson", ["1.6 Turbo GLS"], 175000, 4)],
+    "Renault": [("Kwid", ["1.0 Zen"], 70000, 4), ("Sandero", ["1.6 Stepway"], 85000, 4),
+                ("Duster", ["1.6 Iconic"], 120000, 4)],
+    "Jeep": [("Renegade", ["1.3 Turbo Longitude"], 140000, 4), ("Compass", ["1.3 Turbo Limited", "2.0 Diesel"], 190000, 4)],
+    "Ford": [("Ka", ["1.0 SE"], 65000, 4), ("Ranger", ["3.2 Limited"], 250000, 4), ("EcoSport", ["1.5 Titanium"], 95000, 4)],
+    "Nissan": [("Kicks", ["1.6 SV", "Exclusive"], 125000, 4), ("Versa", ["1.6 Advance"], 105000, 4),
+               ("Frontier", ["2.3 Attack"], 230000, 4)],
+    "BMW": [("320i", ["2.0 M Sport"], 320000, 4), ("X1", ["sDrive20i"], 290000, 4)],
+    "Citroën": [("C3", ["1.0 Live", "1.6 Feel"], 80000, 4), ("C4 Cactus", ["1.6 Shine"], 110000, 4)],
+}
+# Participacao aproximada de cada marca nos anuncios
+BRAND_SHARE = {"Fiat": 16, "Volkswagen": 15, "Chevrolet": 15, "Toyota": 10, "Honda": 8, "Hyundai": 9,
+               "Renault": 7, "Jeep": 6, "Ford": 6, "Nissan": 4, "BMW": 2, "Citroën": 2}
+COLORS = (["Branco", "Prata", "Preto", "Cinza", "Vermelho", "Azul", "Marrom", "Verde"],
+          [26, 22, 20, 15, 7, 6, 2, 2])
+FUELS = (["Flex", "Gasolina", "Diesel", "Hibrido", "Eletrico"], [70, 15, 10, 4, 1])
+TRANSMISSIONS = (["Manual", "Automatico", "CVT"], [40, 45, 15])
+LOCATIONS = (
+    ["Belo Horizonte - MG", "Contagem - MG", "Betim - MG", "Sao Paulo - SP", "Campinas - SP", "Santos - SP",
+     "Rio de Janeiro - RJ", "Niteroi - RJ", "Curitiba - PR", "Porto Alegre - RS", "Florianopolis - SC",
+     "Salvador - BA", "Recife - PE", "Fortaleza - CE", "Goiania - GO", "Brasilia - DF", "Uberlandia - MG",
+     "Juiz de Fora - MG", "Ribeirao Preto - SP", "Vitoria - ES"],
+    [9, 4, 3, 16, 6, 3, 10, 3, 6, 5, 3, 5, 4, 4, 4, 5, 3, 3, 2, 2],
+)
+FEATURES = ["Ar-condicionado", "Direcao eletrica", "Bancos em couro", "Central multimidia", "Camera de re",
+            "Sensor de estacionamento", "Piloto automatico", "Teto solar", "Rodas de liga leve", "6 airbags",
+            "Chave presencial", "Carregador por inducao"]
+DESCRIPTIONS = ["Revisoes em dia, unico dono, chave reserva.", "Otimo estado, economico, IPVA pago.",
+                "Top de linha, pneus novos.", "Laudo cautelar aprovado, aceito troca.",
+                "Carro de garagem, manual e nota fiscal.", "Financiamento facilitado, garantia de motor e cambio."]
+# Popularidade dos anuncios (lei de Zipf): poucos veiculos concentram a maioria dos favoritos
+POPULARITY_EXPONENT = 0.9
+CATALOG_DAYS = 365
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@{EMAIL_DOMAIN}"
+
+
+def weights(values: List[float]) -> np.ndarray:
+    array = np.asarray(values, dtype=np.float64)
+    return array / array.sum()
+
+
+async def insert_batches(collection: Any, documents: List[Dict[str, Any]]) -> None:
+    if documents:
+        await collection.insert_many(documents, ordered=False)
+
+
+async def generate_users(db: AsyncIOMotorDatabase, scale: Scale, now: datetime, batch_size: int) -> List[ObjectId]:
+    # Um unico hash bcrypt para todos: gerar 200k hashes levaria horas
+    hashed = hash_password(PASSWORD)
+    ids = [ObjectId() for _ in range(scale.users)]
+    for start in range(0, scale.users, batch_size):
+        batch = [
+            {
+                "_id": ids[index],
+                "email": user_email(index),
+                "full_name": f"Usuario {index}",
+                "roles": ["customer"],
+                "hashed_password": hashed,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for index in range(start, min(start + batch_size, scale.users))
+        ]
+        await insert_batches(db.users, batch)
+    return ids
+
+
+def sample_favorites(rng: np.random.Generator, scale: Scale) -> Tuple[np.ndarray, np.ndarray]:
+    """(user index, vehicle index) pairs, unique per user, skewed towards popular vehicles."""
+    per_user = rng.poisson(scale.favorites_per_user, size=scale.users)
+    ranks = np.arange(1, scale.vehicles + 1, dtype=np.float64)
+    popularity = ranks ** -POPULARITY_EXPONENT
+    # A popularidade nao segue a ordem de insercao: anuncios populares espalhados pelo catalogo
+    popularity = popularity[rng.permutation(scale.vehicles)]
+    vehicles = rng.choice(scale.vehicles, size=int(per_user.sum()), p=popularity / popularity.sum())
+    users = np.repeat(np.arange(scale.users, dtype=np.int64), per_user)
+    pairs = np.unique(users * scale.vehicles + vehicles)
+    return pairs // scale.vehicles, pairs % scale.vehicles
+
+
+async def generate(
+    db: AsyncIOMotorDatabase,
+    scale: Scale,
+    *,
+    seed: int = 42,
+    batch_size: int = 5000,
+    drop: bool = False,
+    co_favorites: bool = False,
+) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    now = utc_now()
+    timings: Dict[str, float] = {}
+
+    if drop:
+        # Indice de busca e facetas sao recriados do zero no final
+        await asyncio.gather(*(db[name].drop() for name in COLLECTIONS))
+    await indexes.apply(db)
+
+    with Timer() as timer:
+        user_ids = await generate_users(db, scale, now, batch_size)
+    timings["users_s"] = timer.elapsed
+
+    # Atributos sorteados em bloco (vetorizado); os documentos sao montados lote a lote
+    brands = list(CATALOG)
+    brand_idx = rng.choice(len(brands), size=scale.vehicles, p=weights([BRAND_SHARE[b] for b in brands]))
+    model_pick = rng.random(scale.vehicles)
+    version_pick = rng.random(scale.vehicles)
+    age = np.minimum(rng.gamma(2.0, 2.5, size=scale.vehicles).astype(np.int64), 20)
+    price_noise = rng.lognormal(0.0, 0.12, size=scale.vehicles)
+    mileage = np.maximum(rng.normal(age * 12000 + 3000, 9000), 0).astype(np.int64)
+    color_idx = rng.choice(len(COLORS[0]), size=scale.vehicles, p=weights(COLORS[1]))
+    fuel_idx = rng.choice(len(FUELS[0]), size=scale.vehicles, p=weights(FUELS[1]))
+    transmission_idx = rng.choice(len(TRANSMISSIONS[0]), size=scale.vehicles, p=weights(TRANSMISSIONS[1]))
+    location_idx = rng.choice(len(LOCATIONS[0]), size=scale.vehicles, p=weights(LOCATIONS[1]))
+    image_counts = rng.integers(0, 5, size=scale.vehicles)
+    feature_masks = rng.random((scale.vehicles, len(FEATURES))) < 0.3
+    description_idx = rng.integers(0, len(DESCRIPTIONS), size=scale.vehicles)
+    # 1 em cada 10 usuarios anuncia; 5% dos anuncios sem vendedor (importados)
+    sellers = max(scale.users // 10, 1)
+    seller_idx = rng.integers(0, sellers, size=scale.vehicles)
+    no_seller = rng.random(scale.vehicles) < 0.05
+    created_offset = rng.random(scale.vehicles) * CATALOG_DAYS * 86400
+    updated_offset = created_offset * rng.random(scale.vehicles)
+
+    with Timer() as timer:
+        favorite_users, favorite_vehicles = sample_favorites(rng, scale)
+        favorite_count = np.bincount(favorite_vehicles, minlength=scale.vehicles)
+    timings["favorites_sampling_s"] = timer.elapsed
+
+    vehicle_ids = [ObjectId() for _ in range(scale.vehicles)]
+    created_at = [now - timedelta(seconds=float(offset)) for offset in created_offset]
+    current_year = now.year
+    with Timer() as timer:
+        for start in range(0, scale.vehicles, batch_size):
+            batch = []
+            for index in range(start, min(start + batch_size, scale.vehicles)):
+                brand = brands[brand_idx[index]]
+                models = CATALOG[brand]
+                model, versions, new_price, doors = models[int(model_pick[index] * len(models))]
+                version = versions[int(version_pick[index] * len(versions))]
+                years_old = int(age[index])
+                price = new_price * 0.88**years_old * float(price_noise[index])
+                vehicle_id = vehicle_ids[index]
+                document: Dict[str, Any] = {
+                    "_id": vehicle_id,
+                    "title": f"{brand} {model} {version}",
+                    "brand": brand,
+                    "model": model,
+                    "version": version,
+                    "year": current_year - years_old,
+                    "price": round(price / 100) * 100.0,
+                    "mileage": int(mileage[index]),
+                    "color": COLORS[0][color_idx[index]],
+                    "fuel_type": FUELS[0][fuel_idx[index]],
+                    "transmission": TRANSMISSIONS[0][transmission_idx[index]],
+                    "doors": doors,
+                    "location": LOCATIONS[0][location_idx[index]],
+                    "description": DESCRIPTIONS[description_idx[index]],
+                    "images": [
+                        f"https://images.example.com/vehicles/{vehicle_id}/{n}.jpg" for n in range(image_counts[index])
+                    ],
+                    "features": [name for name, on in zip(FEATURES, feature_masks[index]) if on],
+                    "favorite_count": int(favorite_count[index]),
+                    "created_at": created_at[index],
+                    "updated_at": now - timedelta(seconds=float(updated_offset[index])),
+                }
+                document.update(normalized_fields(document))
+                if not no_seller[index]:
+                    document["seller_id"] = user_ids[seller_idx[index]]
+                batch.append(document)
+            await insert_batches(db.vehicles, batch)
+    timings["vehicles_s"] = timer.elapsed
+
+    with Timer() as timer:
+        # Favorito sempre depois do anuncio: instante sorteado entre a criacao do veiculo e agora
+        favorited_offset = created_offset[favorite_vehicles] * rng.random(favorite_vehicles.size)
+        for start in range(0, favorite_vehicles.size, batch_size):
+            batch = [
+                {
+                    "user_id": user_ids[favorite_users[index]],
+                    "vehicle_id": vehicle_ids[favorite_vehicles[index]],
+                    "created_at": now - timedelta(seconds=float(favorited_offset[index])),
+                }
+                for index in range(start, min(start + batch_size, favorite_vehicles.size))
+            ]
+            await insert_batches(db.favorites, batch)
+    timings["favorites_s"] = timer.elapsed
+
+    with Timer() as timer:
+        await search_service.rebuild_index(db, batch_size=batch_size)
+    timings["search_index_s"] = timer.elapsed
+    with Timer() as timer:
+        await facet_service.rebuild_counters(db, batch_size=batch_size)
+    timings["facets_s"] = timer.elapsed
+    if co_favorites:
+        with Timer() as timer:
+            # O job ignora favoritos mais novos que SETTLE_SECONDS; a massa inteira ja e "antiga"
+            await co_favorite_service.refresh(db, full=True, batch_size=batch_size)
+        timings["co_favorites_s"] = timer.elapsed
+
+    return {
+        "scale": asdict(scale),
+        "seed": seed,
+        "users": scale.users,
+        "vehicles": scale.vehicles,
+        "favorites": int(favorite_vehicles.size),
+        "timings": {name: round(value, 3) for name, value in timings.items()},
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--drop", action="store_true", help="apaga usuarios, veiculos e favoritos antes da carga")
+    parser.add_argument("--co-favorites", action="store_true", help="roda o job de co-favoritos ao final")
+    parser.add_argument("--memory", action="store_true", help="usa um Mongo em memoria (mongomock-motor)")
+    args = parser.parse_args(argv)
+
+    async def run() -> Dict[str, Any]:
+        db = open_database(args.memory)
+        return await generate(
+            db,
+            SCALES[args.scale],
+            seed=args.seed,
+            batch_size=args.batch_size,
+            drop=args.drop,
+            co_favorites=args.co_favorites,
+        )
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Teste de carga HTTP assincrono cobrindo todos os routers (vehicles, favorites, auth, users).
+
+Cada worker sorteia o proximo cenario pela mistura (--mix nome=peso,...) e o
+relatorio traz vazao e p50/p95/p99 por endpoint em JSON, para comparar execucoes:
+
+    python -m benchmarks.load --memory --generate 1k --requests 3000 --concurrency 16
+    python -m benchmarks.load --base-url http://localhost:8000 --duration 60 --output runs/antes.json
+    python -m benchmarks.load --base-url http://localhost:8000 --duration 60 --baseline runs/antes.json
+
+Sem --base-url o app roda no proprio processo (httpx.ASGITransport). A massa de
+dados vem de benchmarks.dataset (--generate <escala>); os usuarios de carga
+entram com as credenciais do dataset e sao cadastrados se ainda nao existirem.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+from app.services import recommendation_index
+
+from . import dataset
+from .common import Timer, app_client, open_database, summarize
+
+
+@dataclass
+class LoadContext:
+    vehicle_ids: List[str]
+    sessions: List[Dict[str, str]]
+    brands: List[str]
+    search_terms: List[str]
+    # Veiculos criados durante a carga, por sessao (alvos de PATCH sem esbarrar em permissao)
+    owned: Dict[int, List[str]] = field(default_factory=dict)
+    # Favoritos adicionados durante a carga, por sessao (alvos de DELETE /favorites)
+    favorited: Dict[int, List[str]] = field(default_factory=dict)
+
+
+@dataclass
+class Worker:
+    client: httpx.AsyncClient
+    context: LoadContext
+    rng: random.Random
+    session: int
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.context.sessions[self.session]
+
+    def vehicle_id(self) -> str:
+        return self.rng.choice(self.context.vehicle_ids)
+
+
+Scenario = Callable[[Worker], Awaitable[httpx.Response]]
+
+
+async def vehicles_list(worker: Worker) -> httpx.Response:
+    params = {"page": worker.rng.randint(1, 5), "sort": worker.rng.choice(["recent", "popular"])}
+    return await worker.client.get("/vehicles", params=params)
+
+
+async def vehicles_filter(worker: Worker) -> httpx.Response:
+    params: Dict[str, Any] = {"brand": worker.rng.choice(worker.context.brands)}
+    if worker.rng.random() < 0.5:
+        params["max_price"] = worker.rng.choice([60000, 90000, 150000])
+    return await worker.client.get("/vehicles", params=params)
+
+
+async def vehicles_search(worker: Worker) -> httpx.Response:
+    return await worker.client.get("/vehicles", params={"q": worker.rng.choice(worker.context.search_terms)})
+
+
+async def vehicles_facets(worker: Worker) -> httpx.Response:
+    params = {"brand": worker.rng.choice(worker.context.brands)} if worker.rng.random() < 0.5 else {}
+    return await worker.client.get("/vehicles/facets", params=params)
+
+
+async def vehicles_detail(worker: Worker) -> httpx.Response:
+    return await worker.client.get(f"/vehicles/{worker.vehicle_id()}")
+
+
+async def vehicles_batch(worker: Worker) -> httpx.Response:
+    ids = {worker.vehicle_id() for _ in range(10)}
+    return await worker.client.get("/vehicles:batch", params={"ids": ",".join(ids)})
+
+
+async def vehicles_recommendations(worker: Worker) -> httpx.Response:
+    return await worker.client.get(f"/vehicles/{worker.vehicle_id()}/recommendations")
+
+
+async def vehicles_also_favorited(worker: Worker) -> httpx.Response:
+    return await worker.client.get(f"/vehicles/{worker.vehicle_id()}/also-favorited")
+
+
+async def vehicles_create(worker: Worker) -> httpx.Response:
+    body = {
+        "title": "Fiat Argo 1.0 Drive",
+        "brand": "Fiat",
+        "model": "Argo",
+        "year": worker.rng.randint(2015, 2025),
+        "price": worker.rng.randint(50, 120) * 1000,
+        "mileage": worker.rng.randint(0, 120) * 1000,
+        "location": "Belo Horizonte - MG",
+    }
+    response = await worker.client.post("/vehicles", json=body, headers=worker.headers)
+    if response.status_code == 201:
+        worker.context.owned.setdefault(worker.session, []).append(response.json()["id"])
+    return response
+
+
+async def vehicles_update(worker: Worker) -> httpx.Response:
+    owned = worker.context.owned.get(worker.session)
+    if not owned:
+        return await vehicles_create(worker)
+    body = {"price": worker.rng.randint(50, 120) * 1000}
+    return await worker.client.patch(f"/vehicles/{worker.rng.choice(owned)}", json=body, headers=worker.headers)
+
+
+async def favorites_list(worker: Worker) -> httpx.Response:
+    return await worker.client.get("/favorites", headers=worker.headers)
+
+
+async def favorites_add(worker: Worker) -> httpx.Response:
+    vehicle_id = worker.vehicle_id()
+    response = await worker.client.post("/favorites", json={"vehicle_id": vehicle_id}, headers=worker.headers)
+    if response.status_code == 201:
+        worker.context.favorited.setdefault(worker.session, []).append(vehicle_id)
+    return response
+
+
+async def favorites_remove(worker: Worker) -> httpx.Response:
+    favorited = worker.context.favorited.get(worker.session)
+    # Sem favorito conhecido, um id qualquer (normalmente 404): tambem faz parte da mistura
+    if favorited:
+        vehicle_id = favorited.pop(worker.rng.randrange(len(favorited)))
+    else:
+        vehicle_id = worker.vehicle_id()
+    return await worker.client.delete(f"/favorites/{vehicle_id}", headers=worker.headers)
+
+
+async def favorites_status(worker: Worker) -> httpx.Response:
+    ids = list({worker.vehicle_id() for _ in range(20)})
+    return await worker.client.post("/favorites/status", json={"vehicle_ids": ids}, headers=worker.headers)
+
+
+async def auth_login(worker: Worker) -> httpx.Response:
+    email = dataset.user_email(worker.session)
+    return await worker.client.post("/auth/login", data={"username": email, "password": dataset.PASSWORD})
+
+
+async def auth_me(worker: Worker) -> httpx.Response:
+    return await worker.client.get("/auth/me", headers=worker.headers)
+
+
+async def users_me(worker: Worker) -> httpx.Response:
+    return await worker.client.get("/users/me", headers=worker.headers)
+
+
+# Mistura padrao: leitura de catalogo domina, escritas e login (bcrypt) sao raros
+SCENARIOS: Dict[str, tuple[Scenario, float]] = {
+    "vehicles.list": (vehicles_list, 20),
+    "vehicles.filter": (vehicles_filter, 12),
+    "vehicles.search": (vehicles_search, 10),
+    "vehicles.facets": (vehicles_facets, 5),
+    "vehicles.detail": (vehicles_detail, 20),
+    "vehicles.batch": (vehicles_batch, 3),
+    "vehicles.recommendations": (vehicles_recommendations, 6),
+    "vehicles.also_favorited": (vehicles_also_favorited, 3),
+    "vehicles.create": (vehicles_create, 0.5),
+    "vehicles.update": (vehicles_update, 0.5),
+    "favorites.list": (favorites_list, 6),
+    "favorites.add": (favorites_add, 3),
+    "favorites.remove": (favorites_remove, 2),
+    "favorites.status": (favorites_status, 4),
+    "auth.login": (auth_login, 1),
+    "auth.me": (auth_me, 2),
+    "users.me": (users_me, 2),
+}
+
+
+def parse_mix(value: str | None) -> Dict[str, float]:
+    """``nome=peso,...`` over the defaults; ``nome=0`` disables a scenario."""
+    mix = {name: weight for name, (_, weight) in SCENARIOS.items()}
+    if not value:
+        return mix
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Cenario desconhecido: {name} (disponiveis: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+async def open_sessions(client: httpx.AsyncClient, count: int) -> List[Dict[str, str]]:
+    async def login(index: int) -> Dict[str, str]:
+        credentials = {"username": dataset.user_email(index), "password": dataset.PASSWORD}
+        response = await client.post("/auth/login", data=credentials)
+        if response.status_code == 401:
+            await client.post("/auth/register", json={"email": credentials["username"], "password": dataset.PASSWORD})
+            response = await client.post("/auth/login", data=credentials)
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return list(await asyncio.gather(*(login(index) for index in range(count))))
+
+
+async def sample_vehicles(client: httpx.AsyncClient, pages: int) -> tuple[List[str], List[str], List[str]]:
+    """Ids, brands and search terms taken from the catalog through the API itself."""
+    ids: List[str] = []
+    brands: set[str] = set()
+    terms: set[str] = set()
+    cursor = None
+    for _ in range(pages):
+        params: Dict[str, Any] = {"page_size": 60, "fields": "brand,model"}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/vehicles", params=params)
+        response.raise_for_status()
+        body = response.json()
+        for item in body["items"]:
+            ids.append(item["id"])
+            brands.add(item["brand"])
+            terms.add(item["model"].lower())
+        cursor = body.get("next_cursor")
+        if not cursor:
+            break
+    if not ids:
+        raise SystemExit("Catalogo vazio: gere a massa com --generate <escala> (ou python -m benchmarks.dataset)")
+    return ids, sorted(brands), sorted(terms)
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    context: LoadContext,
+    mix: Dict[str, float],
+    *,
+    concurrency: int,
+    requests: int | None,
+    duration: float | None,
+    seed: int,
+) -> tuple[Dict[str, List[float]], Dict[str, Counter[int]], float]:
+    names, weights = list(mix), list(mix.values())
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, Counter[int]] = {name: Counter() for name in names}
+    remaining = requests
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def run_worker(index: int) -> None:
+        nonlocal remaining
+        worker = Worker(client, context, random.Random(seed + index), index % len(context.sessions))
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            name = worker.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await SCENARIOS[name][0](worker)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies[name].append(time.perf_counter() - started)
+            statuses[name][status] += 1
+
+    with Timer() as timer:
+        await asyncio.gather(*(run_worker(index) for index in range(concurrency)))
+    return latencies, statuses, timer.elapsed
+
+
+def build_report(
+    latencies: Dict[str, List[float]],
+    statuses: Dict[str, Counter[int]],
+    elapsed: float,
+    config: Dict[str, Any],
+) -> Dict[str, Any]:
+    endpoints: Dict[str, Any] = {}
+    for name, values in sorted(latencies.items()):
+        if not values:
+            continue
+        endpoints[name] = {
+            **summarize(values, elapsed=elapsed),
+            "errors": sum(count for status, count in statuses[name].items() if status == 0 or status >= 500),
+            "status": {str(status): count for status, count in sorted(statuses[name].items())},
+        }
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "config": config,
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(everything, elapsed=elapsed),
+        "endpoints": endpoints,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Percentage change of p50/p95/p99 and throughput per endpoint against an earlier report."""
+
+    def delta(current: float, previous: float) -> float | None:
+        return round((current - previous) / previous * 100, 1) if previous else None
+
+    changes: Dict[str, Any] = {}
+    for name, current in {"total": report["total"], **report["endpoints"]}.items():
+        previous = baseline["total"] if name == "total" else baseline.get("endpoints", {}).get(name)
+        if previous:
+            changes[name] = {
+                f"{metric}_pct": delta(current[metric], previous[metric])
+                for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+                if metric in current and metric in previous
+            }
+    return changes
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    db = None if args.base_url else open_database(args.memory)
+    generated = None
+    if args.generate:
+        if db is None:
+            raise SystemExit("--generate precisa do app em processo (sem --base-url); use benchmarks.dataset antes")
+        generated = await dataset.generate(db, dataset.SCALES[args.generate], seed=args.seed, drop=True)
+    if db is not None:
+        # Sem servidor nao ha lifespan: o indice de recomendacoes e montado aqui
+        await recommendation_index.rebuild(db)
+
+    async with app_client(db, args.base_url) as client:
+        ids, brands, terms = await sample_vehicles(client, args.sample_pages)
+        sessions = await open_sessions(client, args.users)
+        context = LoadContext(ids, sessions, brands, terms)
+        if args.warmup:
+            await drive(client, context, mix, concurrency=args.concurrency, requests=args.warmup, duration=None, seed=0)
+        latencies, statuses, elapsed = await drive(
+            client,
+            context,
+            mix,
+            concurrency=args.concurrency,
+            requests=None if args.duration else args.requests,
+            duration=args.duration,
+            seed=args.seed,
+        )
+
+    config = {
+        "target": args.base_url or ("in-process/memory" if args.memory else "in-process"),
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "mix": mix,
+        "sampled_vehicles": len(ids),
+    }
+    report = build_report(latencies, statuses, elapsed, config)
+    if generated:
+        report["dataset"] = generated
+    if args.baseline:
+        report["vs_baseline"] = compare(report, json.loads(Path(args.baseline).read_text()))
+    return report
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="total de requisicoes (ignorado com --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="segundos de carga")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20, help="sessoes autenticadas distintas")
+    parser.add_argument("--mix", default=None, help="pesos por cenario, ex.: vehicles.list=50,auth.login=0")
+    parser.add_argument("--warmup", type=int, default=200, help="requisicoes descartadas antes da medicao")
+    parser.add_argument("--sample-pages", type=int, default=20, help="paginas de 60 ids usadas como alvo")
+    parser.add_argument("--generate", choices=list(dataset.SCALES), default=None, help="gera a massa antes da carga")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--memory", action="store_true", help="usa um Mongo em memoria (mongomock-motor)")
+    parser.add_argument("--base-url", default=None, help="mede um servidor ja em execucao em vez do app em processo")
+    parser.add_argument("--output", default=None, help="grava o relatorio JSON neste arquivo")
+    parser.add_argument("--baseline", default=None, help="relatorio anterior para calcular a variacao")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
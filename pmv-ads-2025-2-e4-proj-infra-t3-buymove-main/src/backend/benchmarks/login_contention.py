@@ -0,0 +1,118 @@
+"""Latencia do catalogo enquanto logins (bcrypt) rodam em paralelo.
+
+Mede o p50/p95/p99 de GET /vehicles sozinho e com N logins concorrentes, para
+mostrar quanto o hashing de senha trava o event loop. Compare os executores:
+
+    python -m benchmarks.login_contention --memory --executor inline
+    python -m benchmarks.login_contention --memory --executor thread
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+from app.core import security
+from app.core.config import settings
+from app.models.user import UserCreate
+from app.models.vehicle import VehicleCreate
+from app.services import user_service, vehicle_service
+
+from .common import Timer, app_client, open_database, summarize
+
+PASSWORD = "benchmark-password"
+
+
+async def seed(db: Any, vehicles: int) -> str:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    await user_service.create_user(db, UserCreate(email=email, password=PASSWORD))
+    if await db.vehicles.estimated_document_count() < vehicles:
+        for index in range(vehicles):
+            payload = VehicleCreate(
+                title=f"Veiculo {index}",
+                brand="Fiat",
+                model="Argo",
+                year=2020,
+                price=60000 + index,
+                mileage=10000,
+            )
+            await vehicle_service.create_vehicle(db, payload, owner_id=None)
+    return email
+
+
+async def catalog_load(client: httpx.AsyncClient, requests: int, concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+
+    async def worker() -> None:
+        while not queue.empty():
+            index = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get("/vehicles", params={"page": index % 5 + 1})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def login_loop(client: httpx.AsyncClient, email: str, stop: asyncio.Event, results: Dict[str, List[float]]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+        key = "ok" if response.status_code == 200 else str(response.status_code)
+        results.setdefault(key, []).append(time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    settings.password_hash_executor = args.executor
+    db = open_database(args.memory)
+    email = await seed(db, args.vehicles)
+
+    async with app_client(db, args.base_url) as client:
+        await catalog_load(client, 20, 4)  # aquecimento (caches, conexoes)
+
+        with Timer() as idle_timer:
+            idle = await catalog_load(client, args.requests, args.concurrency)
+
+        stop = asyncio.Event()
+        logins: Dict[str, List[float]] = {}
+        login_tasks = [asyncio.create_task(login_loop(client, email, stop, logins)) for _ in range(args.logins)]
+        with Timer() as busy_timer:
+            busy = await catalog_load(client, args.requests, args.concurrency)
+        stop.set()
+        await asyncio.gather(*login_tasks)
+
+    security.shutdown_password_executor()
+    return {
+        "executor": args.executor,
+        "concurrent_logins": args.logins,
+        "catalog_idle": summarize(idle, elapsed=idle_timer.elapsed),
+        "catalog_with_logins": summarize(busy, elapsed=busy_timer.elapsed),
+        "logins": {status: summarize(values, elapsed=busy_timer.elapsed) for status, values in logins.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--executor", choices=["inline", "thread", "process"], default=settings.password_hash_executor)
+    parser.add_argument("--requests", type=int, default=400, help="requisicoes de catalogo por fase")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=8, help="logins simultaneos durante a segunda fase")
+    parser.add_argument("--vehicles", type=int, default=60)
+    parser.add_argument("--memory", action="store_true", help="usa um Mongo em memoria (mongomock-motor)")
+    parser.add_argument("--base-url", default=None, help="mede um servidor ja em execucao em vez do app em processo")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
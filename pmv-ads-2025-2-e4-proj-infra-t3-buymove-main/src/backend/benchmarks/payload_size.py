@@ -0,0 +1,115 @@
+"""Bytes e tempo de codificacao de paginas do catalogo por formato e compressao.
+
+Le paginas reais de GET /vehicles (summary e full, 12 e 60 itens) e mede, para
+JSON e MessagePack sem compressao, gzip e brotli: tamanho do corpo, tempo de
+serializacao + compressao no servidor e o tempo de transferencia estimado em
+links moveis lentos:
+
+    python -m benchmarks.payload_size --memory --generate 1k
+    python -m benchmarks.payload_size --repeat 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+from app.core import encoding
+from app.models.vehicle import VehicleListResponse
+from app.services import vehicle_service, vehicle_views
+from app.utils.responses import type_adapter
+
+from . import dataset
+from .common import open_database, summarize
+
+# Vazao efetiva aproximada (bits/s) de links moveis ruins
+LINKS = {"2g_edge": 200_000, "3g": 1_600_000, "4g_fraco": 6_000_000}
+PAGES = [(view, size) for view in ("summary", "full") for size in (12, 60)]
+
+
+def encoders() -> Dict[str, Any]:
+    adapter = type_adapter(VehicleListResponse)
+    return {
+        "json": lambda page: adapter.dump_json(page, by_alias=True),
+        "msgpack": lambda page: encoding.pack(adapter.dump_python(page, mode="json", by_alias=True)),
+    }
+
+
+def measure(page: VehicleListResponse, repeat: int) -> Dict[str, Any]:
+    compressions = ["identity", "gzip"] + (["br"] if encoding.brotli is not None else [])
+    results: Dict[str, Any] = {}
+    for fmt, encode in encoders().items():
+        for compression in compressions:
+            timings: List[float] = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = encoding.compress(encode(page), compression)  # type: ignore[arg-type]
+                timings.append(time.perf_counter() - started)
+            results[f"{fmt}+{compression}"] = {
+                "bytes": len(body),
+                "encode": summarize(timings),
+                "transfer_ms": {link: round(len(body) * 8 / bps * 1000, 1) for link, bps in LINKS.items()},
+            }
+
+    # Economia por requisicao contra JSON sem compressao: bytes e ms (transferencia menos o custo extra de codificar)
+    baseline = results["json+identity"]
+    for result in results.values():
+        extra_encode_ms = result["encode"]["p50_ms"] - baseline["encode"]["p50_ms"]
+        result["bytes_saved"] = baseline["bytes"] - result["bytes"]
+        result["ms_saved"] = {
+            link: round(baseline["transfer_ms"][link] - result["transfer_ms"][link] - extra_encode_ms, 1)
+            for link in LINKS
+        }
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    db = open_database(args.memory)
+    if args.generate:
+        await dataset.generate(db, dataset.SCALES[args.generate], seed=args.seed, drop=True)
+    if not await db.vehicles.estimated_document_count():
+        raise SystemExit("Catalogo vazio: gere a massa com --generate <escala> (ou python -m benchmarks.dataset)")
+
+    report: Dict[str, Any] = {"repeat": args.repeat, "brotli": encoding.brotli is not None, "pages": {}}
+    for view, size in PAGES:
+        page = await vehicle_service.load_vehicle_list(
+            db,
+            q=None,
+            brand=None,
+            color=None,
+            doors=None,
+            location=None,
+            min_price=None,
+            max_price=None,
+            page=1,
+            page_size=size,
+            cursor=None,
+            include_total=True,
+            projection=vehicle_views.resolve_view(view),
+        )
+        report["pages"][f"{view}_{size}"] = measure(page, args.repeat)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memory", action="store_true", help="Usa mongomock-motor no lugar do MONGODB_URI")
+    parser.add_argument("--generate", choices=list(dataset.SCALES), default=None, help="gera a massa antes de medir")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=200, help="Codificacoes por combinacao (para o p50/p95)")
+    parser.add_argument("--output", default=None, help="Grava o relatorio JSON neste arquivo")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
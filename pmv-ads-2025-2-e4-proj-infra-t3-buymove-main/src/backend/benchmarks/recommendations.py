@@ -0,0 +1,87 @@
+"""Latencia do indice de recomendacoes em memoria por tamanho de catalogo.
+
+Monta o indice com veiculos sinteticos e mede nearest() (somente a conta
+vetorizada, sem banco) e o custo de upsert/remove incrementais:
+
+    python -m benchmarks.recommendations --vehicles 100000 --queries 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+from app.services.recommendation_index import RecommendationIndex
+
+from .common import Timer, summarize
+
+BRANDS = ["Fiat", "Volkswagen", "Chevrolet", "Toyota", "Honda", "Hyundai", "Renault", "Jeep", "Ford", "Nissan"]
+FUELS = ["Flex", "Gasolina", "Diesel", "Eletrico", "Hibrido"]
+TRANSMISSIONS = ["Manual", "Automatico", "CVT"]
+
+
+def synthetic_vehicle(rng: random.Random) -> Dict[str, Any]:
+    year = rng.randint(2005, 2025)
+    return {
+        "_id": ObjectId(),
+        "price": round(rng.lognormvariate(11.2, 0.5), 2),
+        "year": year,
+        "mileage": max(int(rng.gauss((2026 - year) * 12000, 15000)), 0),
+        "brand": rng.choice(BRANDS),
+        "fuel_type": rng.choice(FUELS),
+        "transmission": rng.choice(TRANSMISSIONS),
+        "doors": rng.choice([2, 4, 4, 4]),
+    }
+
+
+def run(vehicles: int, queries: int, k: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    documents = [synthetic_vehicle(rng) for _ in range(vehicles)]
+
+    index = RecommendationIndex()
+    with Timer() as build:
+        for document in documents:
+            index.upsert(document)
+
+    ids = [document["_id"] for document in documents]
+    latencies: List[float] = []
+    for _ in range(queries):
+        vehicle_id = rng.choice(ids)
+        started = time.perf_counter()
+        index.nearest(vehicle_id, k)
+        latencies.append(time.perf_counter() - started)
+
+    updates: List[float] = []
+    for _ in range(min(queries, vehicles)):
+        document = rng.choice(documents)
+        started = time.perf_counter()
+        index.remove(document["_id"])
+        index.upsert(document)
+        updates.append(time.perf_counter() - started)
+
+    return {
+        "vehicles": vehicles,
+        "k": k,
+        "build_s": round(build.elapsed, 3),
+        "nearest": summarize(latencies),
+        "remove_upsert": summarize(updates),
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.vehicles, args.queries, args.k, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Tempo de subida de um worker: import de app.main ate o lifespan liberar requisicoes.
+
+Cada execucao roda num processo novo (como um worker do uvicorn), com
+STARTUP_INDEX_CHECK em cada modo pedido, e mede o import, o lifespan e o total:
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --memory --modes skip,verify,apply
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+MODES = ("skip", "verify", "apply")
+
+
+async def measure_child(memory: bool) -> Dict[str, float]:
+    started = time.perf_counter()
+    from app.core import database
+    from app.main import app
+
+    imported = time.perf_counter()
+    if memory:
+        from mongomock_motor import AsyncMongoMockClient
+
+        database._client = AsyncMongoMockClient()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+    return {"import_s": imported - started, "lifespan_s": ready - imported, "ready_s": ready - started}
+
+
+def run_child(mode: str, memory: bool) -> Dict[str, float]:
+    env = {**os.environ, "STARTUP_INDEX_CHECK": mode}
+    command = [sys.executable, "-m", "benchmarks.startup", "--child"] + (["--memory"] if memory else [])
+    started = time.perf_counter()
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - started
+    # A ultima linha e o JSON da medicao; antes dela ficam os logs do lifespan
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_s"] = elapsed
+    return result
+
+
+def summarize_runs(runs: List[Dict[str, float]]) -> Dict[str, Any]:
+    # Importado aqui: benchmarks.common carrega app.main, o que o processo filho precisa medir
+    from .common import summarize
+
+    metrics = ("import_s", "lifespan_s", "ready_s", "process_s")
+    return {metric: summarize(run[metric] for run in runs) for metric in metrics}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default="verify,skip", help=f"Modos separados por virgula ({', '.join(MODES)})")
+    parser.add_argument("--memory", action="store_true", help="Usa mongomock-motor no lugar do MONGODB_URI")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure_child(args.memory))))
+        return
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"modos desconhecidos: {', '.join(sorted(unknown))}")
+    report = {
+        "runs": args.runs,
+        "memory": args.memory,
+        "modes": {mode: summarize_runs([run_child(mode, args.memory) for _ in range(args.runs)]) for mode in modes},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Confere os planos de execucao das consultas do buyMove em um banco populado.
+
+Monta todas as combinacoes de filtros que build_filters pode gerar (x ordenacao
+x pagina/cursor, mais count e facetas) e as consultas fixas dos servicos, roda
+explain("executionStats") em cada uma e aponta COLLSCAN, SORT em memoria e
+razao docsExamined/nReturned alta. Precisa de um mongod de verdade (o Mongo em
+memoria dos benchmarks nao implementa explain) com massa de dados, ex.:
+
+    python -m benchmarks.dataset --scale 100k --drop
+    python -m scripts.check_query_plans --write-baseline query_plans.json
+    python -m scripts.check_query_plans --baseline query_plans.json
+
+Com --baseline o comando sai com codigo 1 quando algum formato de consulta piora
+(novo COLLSCAN/SORT em memoria/razao alta, ou docsExamined multiplicado por mais
+de --tolerance); com --strict qualquer alerta reprova.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import close_client, get_database
+from app.services import facet_service, search_service
+from app.services.co_favorite_service import TOP_NEIGHBOURS
+from app.services.vehicle_service import SORT_FIELDS, build_filters, merge_filters
+from app.utils.pagination import keyset_cursor, keyset_filter
+from app.utils.text import fold_text, tokenize
+
+FILTER_PARAMS = ("brand", "color", "doors", "location", "min_price", "max_price")
+PAGE_SIZE = 12
+
+
+@dataclass
+class QueryShape:
+    name: str
+    collection: str
+    kind: str = "find"  # find | count | aggregate | distinct
+    filter: Dict[str, Any] = field(default_factory=dict)
+    sort: Dict[str, int] | None = None
+    projection: Dict[str, Any] | None = None
+    limit: int | None = None
+    pipeline: List[Dict[str, Any]] | None = None
+    key: str | None = None
+
+    def explain_command(self) -> Dict[str, Any]:
+        if self.kind == "count":
+            command: Dict[str, Any] = {"count": self.collection, "query": self.filter}
+        elif self.kind == "distinct":
+            command = {"distinct": self.collection, "key": self.key, "query": self.filter}
+        elif self.kind == "aggregate":
+            command = {"aggregate": self.collection, "pipeline": self.pipeline or [], "cursor": {}}
+        else:
+            command = {"find": self.collection, "filter": self.filter}
+            if self.sort:
+                command["sort"] = self.sort
+            if self.projection:
+                command["projection"] = self.projection
+            if self.limit:
+                command["limit"] = self.limit
+        return {"explain": command, "verbosity": "executionStats"}
+
+
+def filter_combinations(sample: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Every subset of the build_filters parameters, valued from a real vehicle."""
+    price = float(sample.get("price") or 50000)
+    values = {
+        "brand": sample.get("brand"),
+        "color": sample.get("color"),
+        "doors": sample.get("doors"),
+        "location": sample.get("location"),
+        "min_price": round(price * 0.8),
+        "max_price": round(price * 1.2),
+    }
+    for size in range(len(FILTER_PARAMS) + 1):
+        for names in itertools.combinations(FILTER_PARAMS, size):
+            if all(values[name] is not None for name in names):
+                yield {name: values[name] for name in names}
+
+
+def catalog_shapes(sample: Dict[str, Any]) -> Iterator[QueryShape]:
+    """GET /vehicles (find + count) and GET /vehicles/facets for each filter combination."""
+    for params in filter_combinations(sample):
+        label = "+".join(params) or "sem_filtro"
+        query = build_filters(**{name: params.get(name) for name in FILTER_PARAMS})
+        yield QueryShape(f"vehicles.count[{label}]", "vehicles", "count", query)
+        for sort, sort_field in SORT_FIELDS.items():
+            order = {sort_field: -1, "_id": -1}
+            yield QueryShape(
+                f"vehicles.list[{label}|{sort}]", "vehicles", filter=query, sort=order, limit=PAGE_SIZE + 1
+            )
+            after = merge_filters(query, keyset_filter(keyset_cursor(sample, sort_field), sort_field))
+            yield QueryShape(
+                f"vehicles.list[{label}|{sort}|cursor]", "vehicles", filter=after, sort=order, limit=PAGE_SIZE + 1
+            )
+        # Facetas com 0 ou 1 filtro de atributo vem dos contadores; o resto agrega sobre vehicles
+        attributes = [name for name in params if name in ("brand", "color", "doors", "location")]
+        if len(attributes) > 1 or "min_price" in params or "max_price" in params:
+            yield QueryShape(
+                f"vehicles.facets[{label}]",
+                "vehicles",
+                "aggregate",
+                pipeline=[{"$match": query}, {"$group": {"_id": "$brand", "count": {"$sum": 1}}}],
+            )
+
+
+def service_shapes(samples: Dict[str, Dict[str, Any]]) -> Iterator[QueryShape]:
+    """Fixed-shape queries issued by the services (one per code path)."""
+    vehicle = samples["vehicle"]
+    vehicle_id = vehicle["_id"]
+    yield QueryShape("vehicles.detail", "vehicles", filter={"_id": vehicle_id})
+    yield QueryShape("vehicles.batch", "vehicles", filter={"_id": {"$in": [vehicle_id]}})
+    yield QueryShape(
+        "vehicles.export",
+        "vehicles",
+        filter={"_id": {"$gt": vehicle_id}},
+        sort={"_id": 1},
+        limit=1000,
+    )
+    price = float(vehicle.get("price") or 50000)
+    margin = max(price * 0.2, 5000)
+    yield QueryShape(
+        "vehicles.recommendations.fallback",
+        "vehicles",
+        filter={
+            "_id": {"$ne": vehicle_id},
+            "brand_norm": fold_text(vehicle.get("brand")),
+            "price": {"$gte": price - margin, "$lte": price + margin},
+        },
+        sort={"updated_at": -1},
+        limit=6,
+    )
+
+    term = tokenize(str(vehicle.get("model") or vehicle.get("brand") or "carro"))[0]
+    yield QueryShape("search.terms", "search_terms", filter={"_id": {"$in": [term]}, "df": {"$gt": 0}})
+    yield QueryShape(
+        "search.terms.prefix",
+        "search_terms",
+        filter={"_id": {"$regex": f"^{term[:search_service.MIN_PREFIX_LENGTH]}"}, "df": {"$gt": 0}},
+        limit=search_service.PREFIX_EXPANSIONS,
+    )
+    yield QueryShape(
+        "search.postings",
+        "search_postings",
+        filter={"term": term},
+        projection={"_id": 0, "vehicle_id": 1, "impact": 1},
+        sort={"impact": -1},
+        limit=search_service.POSTINGS_PER_TERM,
+    )
+    yield QueryShape(
+        "search.postings.filtered",
+        "search_postings",
+        filter={"vehicle_id": {"$in": [vehicle_id]}, "term": {"$in": [term]}},
+        projection={"_id": 0, "term": 1, "vehicle_id": 1, "impact": 1},
+    )
+    yield QueryShape("facets.counters", "vehicle_facets", filter={"scope": facet_service.scope_for(), "count": {"$gt": 0}})
+    yield QueryShape(
+        "co_favorites.top",
+        "favorite_pairs",
+        filter={"a": vehicle_id},
+        sort={"count": -1, "b": 1},
+        limit=TOP_NEIGHBOURS,
+    )
+
+    user = samples.get("user")
+    if user:
+        yield QueryShape("users.by_email", "users", filter={"email": user["email"]})
+
+    favorite = samples.get("favorite")
+    if favorite:
+        user_id = favorite["user_id"]
+        key = {"user_id": user_id, "vehicle_id": favorite["vehicle_id"]}
+        yield QueryShape("favorites.by_key", "favorites", filter=key)
+        yield QueryShape(
+            "favorites.status",
+            "favorites",
+            filter={"user_id": user_id, "vehicle_id": {"$in": [favorite["vehicle_id"]]}},
+            projection={"_id": 0, "vehicle_id": 1},
+        )
+        order = {"created_at": -1, "_id": -1}
+        after = keyset_filter(keyset_cursor(favorite, "created_at"), "created_at")
+        for label, match in (
+            ("favorites.list", {"user_id": user_id}),
+            ("favorites.list.cursor", {"$and": [{"user_id": user_id}, after]}),
+        ):
+            yield QueryShape(
+                label,
+                "favorites",
+                "aggregate",
+                pipeline=[{"$match": match}, {"$sort": order}, {"$limit": 21}],
+            )
+        yield QueryShape(
+            "co_favorites.changed_users",
+            "favorites",
+            "distinct",
+            filter={"created_at": {"$gt": favorite["created_at"]}},
+            key="user_id",
+        )
+
+
+@dataclass
+class PlanReport:
+    plan: str
+    indexes: List[str]
+    docs_examined: int
+    keys_examined: int
+    returned: int
+    flags: List[str]
+
+    @property
+    def ratio(self) -> float:
+        return round(self.docs_examined / max(self.returned, 1), 2)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "plan": self.plan,
+            "indexes": self.indexes,
+            "docs_examined": self.docs_examined,
+            "keys_examined": self.keys_examined,
+            "returned": self.returned,
+            "ratio": self.ratio,
+            "flags": self.flags,
+        }
+
+
+def cursor_section(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """The find-layer part of an explain (aggregations nest it under ``$cursor``)."""
+    if "queryPlanner" in explain:
+        return explain
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]
+    return explain
+
+
+def plan_stages(node: Dict[str, Any] | None) -> Iterator[Dict[str, Any]]:
+    if not node:
+        return
+    # Mongo 7+ com SBE embrulha o plano em queryPlan
+    node = node.get("queryPlan", node)
+    yield node
+    yield from plan_stages(node.get("inputStage"))
+    for child in node.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+def analyze(explain: Dict[str, Any], *, max_ratio: float, min_examined: int) -> PlanReport:
+    section = cursor_section(explain)
+    stages = list(plan_stages(section.get("queryPlanner", {}).get("winningPlan")))
+    names = [stage.get("stage", "?") for stage in stages]
+    indexes = [stage["indexName"] for stage in stages if stage.get("indexName")]
+    stats = section.get("executionStats", {})
+    returned = stats.get("nReturned", 0)
+    execution = stats.get("executionStages", {})
+    if "nCounted" in execution:
+        returned = execution["nCounted"]
+
+    report = PlanReport(
+        plan=" <- ".join(
+            f"{name}({stage['indexName']})" if stage.get("indexName") else name for name, stage in zip(names, stages)
+        ),
+        indexes=indexes,
+        docs_examined=stats.get("totalDocsExamined", 0),
+        keys_examined=stats.get("totalKeysExamined", 0),
+        returned=returned,
+        flags=[],
+    )
+    if "COLLSCAN" in names:
+        report.flags.append("collscan")
+    # SORT e a ordenacao em memoria; quando o indice entrega a ordem o estagio nem aparece
+    if "SORT" in names:
+        report.flags.append("in_memory_sort")
+    if report.docs_examined >= min_examined and report.ratio > max_ratio:
+        report.flags.append("high_ratio")
+    return report
+
+
+def regressions(current: Dict[str, Any], baseline: Dict[str, Any], *, tolerance: float, min_examined: int) -> List[str]:
+    problems = []
+    for name, report in current.items():
+        before = baseline.get(name)
+        if before is None:
+            if report["flags"]:
+                problems.append(f"{name}: formato novo com {', '.join(report['flags'])}")
+            continue
+        added = [flag for flag in report["flags"] if flag not in before["flags"]]
+        if added:
+            problems.append(f"{name}: {', '.join(added)} (antes: {before['plan']}; agora: {report['plan']})")
+        elif (
+            report["docs_examined"] >= min_examined
+            and report["docs_examined"] > before["docs_examined"] * tolerance
+        ):
+            problems.append(f"{name}: docsExamined {before['docs_examined']} -> {report['docs_examined']}")
+    return problems
+
+
+async def load_samples(db: AsyncIOMotorDatabase) -> Dict[str, Dict[str, Any]]:
+    # Um veiculo com todos os atributos filtraveis; o mais favoritado tende a ter os pares e favoritos
+    vehicle = await db.vehicles.find_one(
+        {name: {"$ne": None} for name in ("brand", "color", "doors", "location", "price")},
+        sort=[("favorite_count", -1)],
+    )
+    if not vehicle:
+        raise SystemExit("Banco sem veiculos com todos os atributos: popule antes (python -m benchmarks.dataset)")
+    samples = {"vehicle": vehicle}
+    favorite = await db.favorites.find_one({"vehicle_id": vehicle["_id"]}) or await db.favorites.find_one()
+    if favorite:
+        samples["favorite"] = favorite
+    user = await db.users.find_one({}, {"email": 1})
+    if user:
+        samples["user"] = user
+    return samples
+
+
+async def collect(db: AsyncIOMotorDatabase, args: argparse.Namespace) -> Dict[str, Any]:
+    samples = await load_samples(db)
+    shapes = [*catalog_shapes(samples["vehicle"]), *service_shapes(samples)]
+    reports: Dict[str, Any] = {}
+    for shape in shapes:
+        explain = await db.command(shape.explain_command())
+        reports[shape.name] = analyze(explain, max_ratio=args.max_ratio, min_examined=args.min_examined).as_dict()
+    return reports
+
+
+async def run(args: argparse.Namespace) -> int:
+    try:
+        reports = await collect(get_database(), args)
+    finally:
+        await close_client()
+
+    flagged = {name: report for name, report in reports.items() if report["flags"]}
+    for name, report in reports.items():
+        status = "ALERTA" if report["flags"] else "ok"
+        print(
+            f"{status:<6} {name:<60} {report['plan']:<50} "
+            f"docs={report['docs_examined']} retornados={report['returned']} {','.join(report['flags'])}",
+            file=sys.stderr,
+        )
+    print(f"{len(reports)} consultas, {len(flagged)} com alerta", file=sys.stderr)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=2, sort_keys=True) + "\n")
+    if args.write_baseline:
+        Path(args.write_baseline).write_text(json.dumps(reports, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline gravado em {args.write_baseline}", file=sys.stderr)
+
+    failed = False
+    if args.baseline:
+        problems = regressions(
+            reports,
+            json.loads(Path(args.baseline).read_text()),
+            tolerance=args.tolerance,
+            min_examined=args.min_examined,
+        )
+        for problem in problems:
+            print(f"REGRESSAO {problem}", file=sys.stderr)
+        failed = bool(problems)
+    if args.strict and flagged:
+        failed = True
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.check_query_plans",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--baseline", help="relatorio salvo; sai com codigo 1 se algum plano piorar")
+    parser.add_argument("--write-baseline", help="grava o relatorio atual como baseline")
+    parser.add_argument("--output", help="grava o relatorio JSON completo")
+    parser.add_argument("--strict", action="store_true", help="reprova com qualquer alerta, mesmo sem baseline")
+    parser.add_argument("--max-ratio", type=float, default=10.0, help="docsExamined/nReturned aceito")
+    parser.add_argument("--min-examined", type=int, default=100, help="ignora razoes abaixo deste docsExamined")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="fator de aumento de docsExamined tolerado")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Confere quantos comandos cada caminho de escrita do buyMove envia ao MongoDB.
+
+Cadastra um usuario, cria/edita/remove um veiculo e favorita/desfavorita num banco
+descartavel (--db, apagado no fim), cada passo dentro de assert_max_commands com o
+orcamento de WRITE_BUDGETS, e sai com codigo 1 quando algum passa do limite. Precisa
+de um mongod de verdade (o Mongo em memoria dos benchmarks nao emite eventos de comando):
+
+    python -m scripts.check_round_trips
+    python -m scripts.check_round_trips --db buymove_round_trips
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import uuid
+from typing import Any, Awaitable, Dict, List, TypeVar
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core import indexes
+from app.core.database import close_client, get_client
+from app.core.mongo_monitoring import assert_max_commands
+from app.models.favorite import FavoriteCreate
+from app.models.user import UserCreate
+from app.models.vehicle import VehicleCreate, VehicleUpdate
+from app.services import favorite_service, user_service, vehicle_service
+
+T = TypeVar("T")
+
+# Comandos por caminho (um bulk_write ou insert_many conta como um comando)
+WRITE_BUDGETS: Dict[str, int] = {
+    "users.create": 1,
+    # insert + indice de busca (search_stats, search_postings, search_terms) + contadores de faceta
+    "vehicles.create": 5,
+    # Campo fora da busca e das facetas: so o find_one_and_update com a permissao no filtro
+    "vehicles.update": 1,
+    # Upsert do favorito + $inc de favorite_count (repetido: upsert + leitura do veiculo)
+    "favorites.add": 2,
+    "favorites.add.repeat": 2,
+    # find_one_and_delete + $inc + registro em favorite_removals (job de co-favoritos)
+    "favorites.remove": 3,
+    # find_one_and_delete + remocao do indice de busca (4) + contadores de faceta
+    "vehicles.delete": 6,
+}
+
+
+async def check(name: str, action: Awaitable[T], failures: List[str]) -> T | None:
+    budget = WRITE_BUDGETS[name]
+    result: T | None = None
+    try:
+        with assert_max_commands(budget) as log:
+            result = await action
+    except AssertionError as exc:
+        failures.append(name)
+        print(f"FALHA {name:<22} {exc}", file=sys.stderr)
+    else:
+        print(f"ok    {name:<22} {len(log)}/{budget} {','.join(log.commands)}", file=sys.stderr)
+    return result
+
+
+async def collect(db: AsyncIOMotorDatabase) -> List[str]:
+    failures: List[str] = []
+    # Indices unicos fazem parte dos caminhos (DuplicateKeyError, upsert do favorito)
+    await indexes.apply(db)
+
+    email = f"round-trips-{uuid.uuid4().hex[:8]}@example.com"
+    user = await check(
+        "users.create",
+        user_service.create_user(db, UserCreate(email=email, full_name="Round Trips", password="round-trips")),
+        failures,
+    )
+    actor = await user_service.get_user_by_email(db, email)
+    if user is None or actor is None:
+        return failures
+
+    payload: Dict[str, Any] = {
+        "title": "Corolla XEi 2.0",
+        "brand": "Toyota",
+        "model": "Corolla",
+        "year": 2022,
+        "price": 129900.0,
+        "mileage": 10000,
+        "color": "Prata",
+        "doors": 4,
+        "location": "Belo Horizonte - MG",
+    }
+    vehicle = await check(
+        "vehicles.create", vehicle_service.create_vehicle(db, VehicleCreate(**payload), owner_id=user.id), failures
+    )
+    if vehicle is None:
+        return failures
+
+    await check(
+        "vehicles.update",
+        vehicle_service.update_vehicle(db, vehicle.id, VehicleUpdate(mileage=12000), actor=actor),
+        failures,
+    )
+    favorite = FavoriteCreate(vehicle_id=vehicle.id)
+    await check("favorites.add", favorite_service.add_favorite(db, user.id, favorite), failures)
+    await check("favorites.add.repeat", favorite_service.add_favorite(db, user.id, favorite), failures)
+    await check("favorites.remove", favorite_service.remove_favorite(db, user.id, vehicle.id), failures)
+    await check("vehicles.delete", vehicle_service.delete_vehicle(db, vehicle.id, actor=actor), failures)
+    return failures
+
+
+async def run(args: argparse.Namespace) -> int:
+    client = get_client()
+    try:
+        await client.drop_database(args.db)
+        failures = await collect(client[args.db])
+    finally:
+        await client.drop_database(args.db)
+        await close_client()
+    print(f"{len(WRITE_BUDGETS)} caminhos, {len(failures)} acima do orcamento", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.check_round_trips",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--db", default="buymove_round_trips", help="banco descartavel (apagado antes e depois)")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Comandos de manutencao do banco do buyMove.
+
+Uso (a partir de src/backend):
+    python -m scripts.manage rebuild-search-index
+    python -m scripts.manage rebuild-facets
+    python -m scripts.manage refresh-co-favorites [--full]
+    python -m scripts.manage recount-favorites
+    python -m scripts.manage backfill-normalized-fields
+    python -m scripts.manage migrate-indexes [--dry-run] [--drop-extra]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.core import indexes
+from app.core.database import close_client, get_database
+from app.services import co_favorite_service, facet_service, favorite_service, search_service, vehicle_service
+
+
+async def rebuild_search_index(args: argparse.Namespace) -> None:
+    indexed = await search_service.rebuild_index(get_database(), batch_size=args.batch_size)
+    print(f"Indice de busca reconstruido: {indexed} veiculos")
+
+
+async def rebuild_facets(args: argparse.Namespace) -> None:
+    counted = await facet_service.rebuild_counters(get_database(), batch_size=args.batch_size)
+    print(f"Contadores de faceta recalculados: {counted} veiculos")
+
+
+async def refresh_co_favorites(args: argparse.Namespace) -> None:
+    result = await co_favorite_service.refresh(get_database(), full=args.full, batch_size=args.batch_size)
+    print(f"Co-favoritos atualizados: {result['users']} usuarios, {result['vehicles']} veiculos")
+
+
+async def recount_favorites(args: argparse.Namespace) -> None:
+    counted = await favorite_service.recount_favorites(get_database(), batch_size=args.batch_size)
+    print(f"favorite_count recalculado: {counted} veiculos com favoritos")
+
+
+async def backfill_normalized_fields(args: argparse.Namespace) -> None:
+    changed = await vehicle_service.backfill_normalized_fields(get_database(), batch_size=args.batch_size)
+    print(f"Campos normalizados (brand_norm, color_norm, location_norm) atualizados: {changed} veiculos")
+
+
+async def migrate_indexes(args: argparse.Namespace) -> None:
+    result = await indexes.apply(get_database(), drop_extra=args.drop_extra, dry_run=args.dry_run)
+    pending = result.as_dict()
+    prefix = "Pendentes" if args.dry_run else "Aplicados"
+    print(f"{prefix}: {len(pending['missing'])} novos, {len(pending['changed'])} recriados")
+    for kind, names in pending.items():
+        for name in names:
+            print(f"  {kind:8} {name}")
+    if pending["extra"] and not args.drop_extra:
+        print("Indices fora da definicao foram mantidos (use --drop-extra para remove-los)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m scripts.manage", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("rebuild-search-index", help="Recria o indice invertido usado pelo parametro q")
+    search.add_argument("--batch-size", type=int, default=1000)
+    search.set_defaults(handler=rebuild_search_index)
+
+    facets = commands.add_parser("rebuild-facets", help="Recalcula os contadores usados em GET /vehicles/facets")
+    facets.add_argument("--batch-size", type=int, default=1000)
+    facets.set_defaults(handler=rebuild_facets)
+
+    co_favorites = commands.add_parser(
+        "refresh-co-favorites",
+        help="Atualiza 'quem favoritou tambem favoritou' com os favoritos alterados desde a ultima execucao",
+    )
+    co_favorites.add_argument("--full", action="store_true", help="Recalcula tudo a partir de todos os favoritos")
+    co_favorites.add_argument("--batch-size", type=int, default=1000)
+    co_favorites.set_defaults(handler=refresh_co_favorites)
+
+    recount = commands.add_parser(
+        "recount-favorites",
+        help="Recalcula favorite_count dos veiculos a partir dos favoritos (use apos o deploy para preencher o campo)",
+    )
+    recount.add_argument("--batch-size", type=int, default=1000)
+    recount.set_defaults(handler=recount_favorites)
+
+    backfill = commands.add_parser(
+        "backfill-normalized-fields",
+        help="Preenche brand_norm, color_norm e location_norm dos veiculos (use apos o deploy, antes dos filtros novos)",
+    )
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.set_defaults(handler=backfill_normalized_fields)
+
+    migrate = commands.add_parser(
+        "migrate-indexes",
+        help="Cria/recria os indices definidos em app/core/indexes.py comparando com os existentes (rode a cada deploy)",
+    )
+    migrate.add_argument("--dry-run", action="store_true", help="Somente mostra a diferenca")
+    migrate.add_argument(
+        "--drop-extra", action="store_true", help="Remove indices que nao estao na definicao (ex.: brand_1, location_1)"
+    )
+    migrate.set_defaults(handler=migrate_indexes)
+
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        await args.handler(args)
+    finally:
+        await close_client()
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()